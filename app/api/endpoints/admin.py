@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
 from app.api.deps import get_current_user, get_db, get_user_by_type
+from app.core.database import SessionLocal
 from app.models.utilisateur import Utilisateur
 from app.schemas.admin_stats import (
     StatistiquesGlobales, StatistiquesTemporelles, StatistiquesEntreprises,
     StatistiquesSecteurs, UtilisateurDetaille
 )
 from app.services.admin_stats_service import AdminStatsService
+from app.services.daily_stats_service import DailyStatsService
+from app.services.recommendation_refresh_service import RecommendationRefreshService
+from app.services.recommendation_service import recommendation_cache
 
 router = APIRouter()
 
@@ -22,12 +27,23 @@ def get_statistiques_globales(
 
 @router.get("/stats/evolution", response_model=List[StatistiquesTemporelles])
 def get_evolution_temporelle(
+    response: Response,
     mois: int = Query(12, ge=1, le=24, description="Nombre de mois à récupérer"),
+    granularite: str = Query("month", pattern="^(month|week|day)$", description="month, week ou day"),
+    periodes: Optional[int] = Query(None, ge=1, le=366, description="Nombre de périodes (remplace mois)"),
     db: Session = Depends(get_db),
     current_user: Utilisateur = Depends(get_user_by_type("admin"))
 ):
-    """Obtenir l'évolution temporelle des métriques."""
-    return AdminStatsService.obtenir_evolution_temporelle(db, mois)
+    """Obtenir l'évolution temporelle des métriques.
+    
+    Rollup journalier jusqu'à son dernier rattrapage, comptes en direct ensuite :
+    les en-têtes X-Rollup-* indiquent ce dernier calcul et s'il est périmé (plus
+    vieux que DAILY_STATS_MAX_AGE_SECONDS, la part calculée en direct grandit).
+    """
+    etat = DailyStatsService.etat(db)
+    response.headers["X-Rollup-Calcule-Le"] = etat["calcule_le"] or ""
+    response.headers["X-Rollup-Perime"] = "true" if etat["perime"] else "false"
+    return AdminStatsService.obtenir_evolution_temporelle(db, periodes or mois, granularite)
 
 @router.get("/stats/entreprises", response_model=List[StatistiquesEntreprises])
 def get_stats_entreprises(
@@ -53,12 +69,14 @@ def get_utilisateurs_details(
     actif_filtre: Optional[bool] = Query(None, description="Filtrer par statut actif"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    apres_created_at: Optional[datetime] = Query(None, description="created_at de la dernière ligne de la page précédente"),
+    apres_id: Optional[int] = Query(None, description="id de la dernière ligne de la page précédente"),
     db: Session = Depends(get_db),
     current_user: Utilisateur = Depends(get_user_by_type("admin"))
 ):
-    """Obtenir la liste détaillée des utilisateurs."""
+    """Obtenir la liste détaillée des utilisateurs (pagination par clé avec apres_created_at/apres_id)."""
     return AdminStatsService.obtenir_utilisateurs_details(
-        db, type_filtre, actif_filtre, skip, limit
+        db, type_filtre, actif_filtre, skip, limit, apres_created_at, apres_id
     )
 
 @router.patch("/utilisateurs/{user_id}/toggle-status")
@@ -91,3 +109,55 @@ def toggle_user_status(
         "user_id": user.id,
         "nouveau_statut": user.actif
     }
+
+def _refresh_recommendations_job(full: bool):
+    """Exécuter le rafraîchissement avec sa propre session (hors requête)."""
+    db = SessionLocal()
+    try:
+        RecommendationRefreshService.refresh(db, full=full)
+    except Exception as e:
+        print(f"❌ Erreur rafraîchissement recommandations: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+@router.post("/recommendations/refresh", status_code=status.HTTP_202_ACCEPTED)
+def refresh_recommendations(
+    background_tasks: BackgroundTasks,
+    full: bool = Query(False, description="Recalcul complet au lieu d'incrémental"),
+    current_user: Utilisateur = Depends(get_user_by_type("admin"))
+):
+    """Lancer le rafraîchissement des recommandations pré-calculées."""
+    background_tasks.add_task(_refresh_recommendations_job, full)
+    return {"message": "Rafraîchissement des recommandations lancé", "complet": full}
+
+def _refresh_daily_stats_job(backfill: bool):
+    """Rattraper le rollup journalier avec sa propre session (hors requête)."""
+    db = SessionLocal()
+    try:
+        if backfill:
+            DailyStatsService.backfill(db)
+        else:
+            DailyStatsService.rattraper(db)
+    except Exception as e:
+        print(f"❌ Erreur rattrapage rollup journalier: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+@router.post("/stats/daily/refresh", status_code=status.HTTP_202_ACCEPTED)
+def refresh_daily_stats(
+    background_tasks: BackgroundTasks,
+    backfill: bool = Query(False, description="Recalculer tout l'historique"),
+    current_user: Utilisateur = Depends(get_user_by_type("admin"))
+):
+    """Lancer le rattrapage du rollup journalier (ou son backfill complet)."""
+    background_tasks.add_task(_refresh_daily_stats_job, backfill)
+    return {"message": "Rattrapage du rollup journalier lancé", "backfill": backfill}
+
+@router.get("/recommendations/cache")
+def get_recommendation_cache_stats(
+    current_user: Utilisateur = Depends(get_user_by_type("admin"))
+):
+    """Statistiques du cache des recommandations du processus qui répond (entrées, hits, misses)."""
+    return recommendation_cache.stats()
@@ -19,6 +19,7 @@ from app.core.file_storage import save_cv_file
 from sqlalchemy.orm import joinedload
 
 from app.models.stage import Stage
+from app.services.market_snapshot_service import market_snapshot
 
 router = APIRouter()
 
@@ -63,6 +64,7 @@ async def create_candidature(
     db.add(candidature)
     db.commit()
     db.refresh(candidature)
+    market_snapshot.mark_stale()
     return candidature
 
 # @router.get("/mes-candidatures", response_model=List[CandidatureResponse])
@@ -176,6 +178,7 @@ def traiter_candidature(
 
     db.commit()
     db.refresh(candidature)
+    market_snapshot.mark_stale()
     return candidature
 
 @router.post("/{candidature_id}/upload-cv")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
@@ -9,6 +9,11 @@ from app.models.utilisateur import Utilisateur
 from app.models.recruteur import Recruteur
 from app.models.candidature import Candidature
 from app.schemas.offre import OffreCreate, OffreUpdate, Offre as OffreSchema, OffreSearchResult
+from app.services.recommendation_service import RecommendationService
+from app.services.recommendation_refresh_service import RecommendationRefreshService
+from app.services.competence_catalogue_service import CompetenceCatalogueService
+from app.services.market_snapshot_service import market_snapshot
+from app.services.recommendation_stats import RecommendationStatsService
 
 router = APIRouter()
 
@@ -16,6 +21,7 @@ router = APIRouter()
 def create_offre(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     offre_in: OffreCreate,
     current_user: Utilisateur = Depends(get_user_by_type("recruteur"))
 ):
@@ -35,8 +41,13 @@ def create_offre(
         recruteur_id=current_user.id
     )
     db.add(offre)
+    CompetenceCatalogueService.sync_offre(db, offre)
     db.commit()
     db.refresh(offre)
+    RecommendationService.notify_offre_changed(offre.id)
+    market_snapshot.mark_stale()
+    RecommendationStatsService.invalidate_competences_demand()
+    background_tasks.add_task(RecommendationRefreshService.run_offre_change, offre.id)
     return offre
 
 @router.get("/", response_model=OffreSearchResult)
@@ -111,6 +122,7 @@ def read_offre(
 def update_offre(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     offre_id: int,
     offre_in: OffreUpdate,
     current_user: Utilisateur = Depends(get_user_by_type("recruteur"))
@@ -135,10 +147,16 @@ def update_offre(
     update_data = offre_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(offre, field, value)
+    if "competences_requises" in update_data:
+        CompetenceCatalogueService.sync_offre(db, offre)
     
     db.add(offre)
     db.commit()
     db.refresh(offre)
+    RecommendationService.notify_offre_changed(offre.id)
+    market_snapshot.mark_stale()
+    RecommendationStatsService.invalidate_competences_demand()
+    background_tasks.add_task(RecommendationRefreshService.run_offre_change, offre.id)
     return offre
 
 # @router.delete("/{offre_id}", response_model=OffreSchema)
@@ -195,6 +213,7 @@ def update_offre(
 def delete_offre(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     offre_id: int,
     current_user: Utilisateur = Depends(get_user_by_type("recruteur"))
 ):
@@ -212,6 +231,10 @@ def delete_offre(
         # Soft delete
         offre.est_active = False
         db.commit()
+        RecommendationService.notify_offre_changed(offre.id)
+        market_snapshot.mark_stale()
+        RecommendationStatsService.invalidate_competences_demand()
+        background_tasks.add_task(RecommendationRefreshService.run_offre_change, offre.id)
         return OffreSchema.from_orm(offre)
     else:
         # Suppression physique
@@ -219,6 +242,10 @@ def delete_offre(
         response_data = OffreSchema.from_orm(offre)
         db.delete(offre)
         db.commit()
+        RecommendationService.notify_offre_changed(offre_id)
+        market_snapshot.mark_stale()
+        RecommendationStatsService.invalidate_competences_demand()
+        background_tasks.add_task(RecommendationRefreshService.run_offre_change, offre_id)
         return response_data
 
 
@@ -226,6 +253,7 @@ def delete_offre(
 def publier_offre(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     offre_id: int,
     current_user: Utilisateur = Depends(get_user_by_type("recruteur"))
 ):
@@ -250,12 +278,17 @@ def publier_offre(
     db.add(offre)
     db.commit()
     db.refresh(offre)
+    RecommendationService.notify_offre_changed(offre.id)
+    market_snapshot.mark_stale()
+    RecommendationStatsService.invalidate_competences_demand()
+    background_tasks.add_task(RecommendationRefreshService.run_offre_change, offre.id)
     return offre
 
 @router.put("/{offre_id}/fermer", response_model=OffreSchema)
 def fermer_offre(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     offre_id: int,
     current_user: Utilisateur = Depends(get_user_by_type("recruteur"))
 ):
@@ -280,4 +313,8 @@ def fermer_offre(
     db.add(offre)
     db.commit()
     db.refresh(offre)
+    RecommendationService.notify_offre_changed(offre.id)
+    market_snapshot.mark_stale()
+    RecommendationStatsService.invalidate_competences_demand()
+    background_tasks.add_task(RecommendationRefreshService.run_offre_change, offre.id)
     return offre
\ No newline at end of file
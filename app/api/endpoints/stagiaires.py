@@ -1,5 +1,6 @@
 # app/api/endpoints/stagiaires.py - NOUVEAU FICHIER
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 
@@ -12,6 +13,8 @@ from app.schemas.stagiaire import (
 )
 from app.core.file_storage import save_photo_file, save_cv_file, delete_file
 from app.core.security import get_password_hash
+from app.services.competence_catalogue_service import CompetenceCatalogueService
+from app.services.cohort_aggregates import cohort_aggregates
 
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session, joinedload
@@ -67,8 +70,12 @@ def update_stagiaire_profile(
             print(f"  - {field}: {value}")
     
     try:
+        if "competences_manuelles" in update_data:
+            CompetenceCatalogueService.sync_stagiaire(db, stagiaire)
         db.commit()
         db.refresh(stagiaire)
+        if {"specialite", "niveau_etudes", "competences_manuelles"} & update_data.keys():
+            cohort_aggregates.update_stagiaire(stagiaire)
         print(f"✅ Profil mis à jour pour: {stagiaire.email}")
         return stagiaire
     except Exception as e:
@@ -457,7 +464,7 @@ def test_match_with_offer(
 ):
     """Tester le niveau de correspondance avec une offre spécifique."""
     
-    from app.services.recommendation_service import RecommendationService
+    from app.services.scoring_engine import score_offres_for_stagiaire
     from app.models.offre import Offre
     
     # Récupérer l'offre
@@ -477,25 +484,12 @@ def test_match_with_offer(
     # Calculer les scores
     stagiaire_competences = stagiaire.get_all_competences()
     
-    competence_score = RecommendationService.calculate_competence_match_score(
-        stagiaire_competences, offre.competences_requises or ""
-    )
-    
-    secteur_score = RecommendationService.calculate_secteur_match_score(
-        stagiaire.specialite or "", offre.secteur
-    )
-    
-    experience_score = RecommendationService.calculate_experience_match_score(
-        stagiaire.niveau_etudes or "", offre.description
-    )
-    
-    location_score = RecommendationService.calculate_location_match_score(
-        stagiaire.ville or "", offre.localisation or ""
-    )
-    
-    overall_score = RecommendationService.calculate_overall_match_score(
-        competence_score, secteur_score, experience_score, location_score
-    )
+    scores = score_offres_for_stagiaire(stagiaire, [offre], stagiaire_competences, db)[0]
+    competence_score = scores["competence"]
+    secteur_score = scores["secteur"]
+    experience_score = scores["experience"]
+    location_score = scores["location"]
+    overall_score = scores["overall"]
     
     # Évaluation qualitative
     if overall_score >= 80:
@@ -542,15 +536,13 @@ def get_market_insights(
     
     try:
         from app.services.recommendation_stats import RecommendationStatsService
+        from app.services.market_snapshot_service import market_snapshot
         
-        # Insights généraux du marché
-        market_insights = RecommendationStatsService.get_market_insights(db)
-        
-        # Analyse de la demande en compétences
-        competences_analysis = RecommendationStatsService.get_competences_demand_analysis(db)
-        
-        # Patterns de succès
-        success_patterns = RecommendationStatsService.get_success_patterns(db)
+        # Insights généraux, demande en compétences et patterns de succès : instantané global
+        snapshot = market_snapshot.get(db)
+        market_insights = snapshot["market_overview"]
+        competences_analysis = snapshot["competences_demand"]
+        success_patterns = snapshot["success_insights"]
         
         # Position personnalisée du stagiaire
         personal_position = RecommendationStatsService.get_personalized_market_position(
@@ -563,6 +555,7 @@ def get_market_insights(
             "success_insights": success_patterns,
             "your_position": personal_position,
             "generated_at": datetime.now().isoformat(),
+            "market_snapshot_generated_at": snapshot["generated_at"],
             "summary": {
                 "total_opportunities": market_insights["stats_generales"]["total_offres_actives"],
                 "most_demanded_skill": competences_analysis["competences_les_plus_demandees"][0]["competence"] if competences_analysis["competences_les_plus_demandees"] else "N/A",
@@ -580,20 +573,48 @@ def get_market_insights(
 
 @router.get("/recommendations/bulk-analyze")
 def bulk_analyze_recommendations(
-    limit: int = 20,
+    limit: Optional[int] = None,
     min_score: float = 30.0,
     export_format: str = "json",
     db: Session = Depends(get_db),
     current_user: Utilisateur = Depends(get_user_by_type("stagiaire"))
 ):
-    """Analyser en masse toutes les offres disponibles avec scores détaillés."""
+    """Analyser en masse toutes les offres disponibles avec scores détaillés.
+
+    json (défaut) : les `limit` (20 par défaut) meilleures offres par score
+    décroissant ; les statistiques de correspondance portent sur ces offres.
+    
+    export_format=ndjson|csv : les offres au-dessus de `min_score` sont
+    diffusées au fil du scoring, dans l'ordre des ids et non par score (toutes
+    par défaut, au plus `limit` sinon), suivies d'un enregistrement "summary".
+    Ses statistiques portent sur toutes les offres au-dessus de `min_score`,
+    y compris celles au-delà de `limit`.
+    """
     
     try:
-        from app.services.recommendation_service import RecommendationService
+        from app.services.scoring_engine import OFFRE_SCORING_COLUMNS, select_top_offres
+        from app.services.recommendation_export import analysis_item, iter_bulk_analysis, to_csv, to_ndjson
         from app.models.offre import Offre
         
-        # Récupérer toutes les offres actives
-        all_offers = db.query(Offre).options(joinedload(Offre.entreprise)).filter(
+        if export_format in ("ndjson", "csv"):
+            stagiaire = db.query(Stagiaire).filter(Stagiaire.id == current_user.id).first()
+            if not stagiaire:
+                raise HTTPException(status_code=404, detail="Profil non trouvé")
+            
+            profil = (stagiaire.get_all_competences(), stagiaire.specialite, stagiaire.niveau_etudes,
+                      stagiaire.ville, stagiaire.ville_id)
+            records = iter_bulk_analysis(profil, limit or 0, min_score)
+            if export_format == "csv":
+                return StreamingResponse(
+                    to_csv(records), media_type="text/csv",
+                    headers={"Content-Disposition": "attachment; filename=bulk-analyze.csv"}
+                )
+            return StreamingResponse(to_ndjson(records), media_type="application/x-ndjson")
+        
+        limit = 20 if limit is None else limit
+        
+        # Récupérer toutes les offres actives (colonnes de scoring uniquement)
+        all_offers = db.query(*OFFRE_SCORING_COLUMNS).filter(
             Offre.est_active == True,
             Offre.date_fin >= datetime.now().date()
         ).all()
@@ -604,50 +625,25 @@ def bulk_analyze_recommendations(
         
         stagiaire_competences = stagiaire.get_all_competences()
         
-        detailed_analysis = []
-        
-        for offre in all_offers:
-            # Calculer tous les scores
-            competence_score = RecommendationService.calculate_competence_match_score(
-                stagiaire_competences, offre.competences_requises or ""
-            )
-            secteur_score = RecommendationService.calculate_secteur_match_score(
-                stagiaire.specialite or "", offre.secteur
-            )
-            experience_score = RecommendationService.calculate_experience_match_score(
-                stagiaire.niveau_etudes or "", offre.description
-            )
-            location_score = RecommendationService.calculate_location_match_score(
-                stagiaire.ville or "", offre.localisation or ""
+        # Scores vectorisés + sélection top-K : seules les gagnantes sont détaillées
+        gagnants = select_top_offres(stagiaire, all_offers, limit, min_score, stagiaire_competences, db)
+        offres_gagnantes = {
+            offre.id: offre for offre in db.query(Offre).options(joinedload(Offre.entreprise)).filter(
+                Offre.id.in_([offre_id for offre_id, _ in gagnants])
             )
-            overall_score = RecommendationService.calculate_overall_match_score(
-                competence_score, secteur_score, experience_score, location_score
-            )
-            
-            if overall_score >= min_score:
-                detailed_analysis.append({
-                    "offre_id": offre.id,
-                    "titre": offre.titre,
-                    "entreprise": offre.entreprise.raison_social if offre.entreprise else "N/A",
-                    "secteur": offre.secteur,
-                    "localisation": offre.localisation,
-                    "scores": {
-                        "global": overall_score,
-                        "competences": competence_score,
-                        "secteur": secteur_score,
-                        "experience": experience_score,
-                        "localisation": location_score
-                    },
-                    "ranking": "A" if overall_score >= 80 else "B" if overall_score >= 60 else "C",
-                    "urgency": "High" if offre.date_fin <= (datetime.now().date() + timedelta(days=7)) else "Medium",
-                    "competition_level": "High" if overall_score >= 70 else "Medium"  # Estimation simple
-                })
+        } if gagnants else {}
         
-        # Trier par score global
-        detailed_analysis.sort(key=lambda x: x["scores"]["global"], reverse=True)
+        detailed_analysis = []
         
-        # Limiter les résultats
-        detailed_analysis = detailed_analysis[:limit]
+        for offre_id, scores in gagnants:
+            offre = offres_gagnantes.get(offre_id)
+            if offre is None:
+                continue
+            
+            detailed_analysis.append(analysis_item(
+                offre.id, offre.titre, offre.entreprise.raison_social if offre.entreprise else None,
+                offre.secteur, offre.localisation, offre.date_fin, scores
+            ))
         
         # Statistiques de l'analyse
         total_analyzed = len(all_offers)
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Cache mémoire LRU avec durée de vie des entrées et compteurs hits/misses.
+
+    Propre au processus : chaque worker a ses entrées et ses compteurs. Les
+    clés doivent donc porter une version lue en base pour rester cohérentes
+    entre workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flight_lock = threading.Lock()
+        self._inflight: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Valeur associée à la clé, ou None si absente ou expirée."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expire_le, value = entry
+                if expire_le > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Valeur en cache, sinon calculée par `factory`.
+
+        Un seul calcul par clé à la fois : les appels concurrents attendent son
+        résultat au lieu de recalculer chacun de leur côté.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._flight_lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+                value = factory()
+                self.set(key, value)
+                return value
+        finally:
+            with self._flight_lock:
+                if self._inflight.get(key) is key_lock and not key_lock.locked():
+                    del self._inflight[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
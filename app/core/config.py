@@ -24,6 +24,32 @@ class Settings(BaseSettings):
     # CORS Configuration
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
+    # Recommandations pré-calculées
+    RECOMMANDATION_TOP_N: int = int(os.getenv("RECOMMANDATION_TOP_N", "50"))
+    RECOMMANDATION_MAX_AGE_HOURS: int = int(os.getenv("RECOMMANDATION_MAX_AGE_HOURS", "24"))
+    RECOMMANDATION_CACHE_TTL_SECONDS: int = int(os.getenv("RECOMMANDATION_CACHE_TTL_SECONDS", "300"))
+    RECOMMANDATION_CACHE_MAX_ENTRIES: int = int(os.getenv("RECOMMANDATION_CACHE_MAX_ENTRIES", "1000"))
+    # "index", "sql" ou "none". index/sql ne scorent que les offres partageant une compétence (ou un
+    # secteur/une ville proche) : une offre sans ce point commun n'est plus recommandée, même si ses
+    # sous-scores neutres dépassent min_score. "none" score tout le catalogue (résultats exhaustifs).
+    RECOMMANDATION_PREFILTER: str = os.getenv("RECOMMANDATION_PREFILTER", "index")
+    RECOMMANDATION_PARALLEL_THRESHOLD: int = int(os.getenv("RECOMMANDATION_PARALLEL_THRESHOLD", "5000"))  # offres candidates
+    # Pool de processus opt-in : 1 = désactivé (défaut, adapté au serverless Vercel), 0 = nombre de cœurs
+    RECOMMANDATION_PARALLEL_WORKERS: int = int(os.getenv("RECOMMANDATION_PARALLEL_WORKERS", "1"))
+    COMPETENCE_SCORER: str = os.getenv("COMPETENCE_SCORER", "keywords")  # "keywords" ou "tfidf"
+    LOCATION_SCORER: str = os.getenv("LOCATION_SCORER", "villes")  # "villes" ou "distance"
+    LOCATION_DISTANCE_HALF_LIFE_KM: float = float(os.getenv("LOCATION_DISTANCE_HALF_LIFE_KM", "100"))
+    # Vide = pas de snapshot (défaut sur Vercel, dont le système de fichiers est en lecture seule)
+    CO_APPLICATION_SNAPSHOT_PATH: str = os.getenv(
+        "CO_APPLICATION_SNAPSHOT_PATH", "" if os.getenv("VERCEL") else "data/co_applications.json"
+    )
+    CO_APPLICATION_SNAPSHOT_INTERVAL_SECONDS: int = int(os.getenv("CO_APPLICATION_SNAPSHOT_INTERVAL_SECONDS", "300"))
+    COHORT_AGGREGATE_TTL_SECONDS: int = int(os.getenv("COHORT_AGGREGATE_TTL_SECONDS", "900"))
+    COMPETENCE_DEMAND_REFRESH_SECONDS: int = int(os.getenv("COMPETENCE_DEMAND_REFRESH_SECONDS", "300"))
+    MARKET_SNAPSHOT_MAX_AGE_SECONDS: int = int(os.getenv("MARKET_SNAPSHOT_MAX_AGE_SECONDS", "600"))
+    ADMIN_STATS_CACHE_TTL_SECONDS: int = int(os.getenv("ADMIN_STATS_CACHE_TTL_SECONDS", "60"))
+    DAILY_STATS_MAX_AGE_SECONDS: int = int(os.getenv("DAILY_STATS_MAX_AGE_SECONDS", "3600"))
+    
     # Ajouter cette ligne pour gérer DATABASE_URL
     database_url: str = None
     
@@ -0,0 +1,151 @@
+# Gazetteer hors ligne : villes marocaines et grandes villes francophones avec coordonnées
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+class Ville(NamedTuple):
+    id: int
+    nom: str
+    pays: str
+    latitude: float
+    longitude: float
+
+
+# (id, nom, pays, latitude, longitude, variantes d'écriture)
+# Les ids sont stockés en base (offre.ville_id, stagiaire.ville_id) : ne jamais les renuméroter.
+_VILLES = [
+    # Maroc
+    (1, "Casablanca", "Maroc", 33.5731, -7.5898, ["casa", "dar el beida", "dar el beïda"]),
+    (2, "Rabat", "Maroc", 34.0209, -6.8416, []),
+    (3, "Salé", "Maroc", 34.0531, -6.7985, []),
+    (4, "Témara", "Maroc", 33.9287, -6.9063, []),
+    (5, "Kénitra", "Maroc", 34.2610, -6.5802, []),
+    (6, "Mohammedia", "Maroc", 33.6866, -7.3830, ["mohammadia"]),
+    (7, "El Jadida", "Maroc", 33.2316, -8.5007, ["jadida"]),
+    (8, "Settat", "Maroc", 33.0010, -7.6166, []),
+    (9, "Berrechid", "Maroc", 33.2655, -7.5875, []),
+    (10, "Marrakech", "Maroc", 31.6295, -7.9811, ["marrakesh"]),
+    (11, "Safi", "Maroc", 32.2994, -9.2372, []),
+    (12, "Essaouira", "Maroc", 31.5085, -9.7595, []),
+    (13, "Agadir", "Maroc", 30.4278, -9.5981, []),
+    (14, "Inezgane", "Maroc", 30.3558, -9.5370, []),
+    (15, "Tiznit", "Maroc", 29.6974, -9.7316, []),
+    (16, "Laâyoune", "Maroc", 27.1253, -13.1625, ["laayoune", "el aaiun"]),
+    (17, "Dakhla", "Maroc", 23.6848, -15.9580, []),
+    (18, "Guelmim", "Maroc", 28.9870, -10.0574, []),
+    (19, "Ouarzazate", "Maroc", 30.9189, -6.8934, []),
+    (20, "Errachidia", "Maroc", 31.9314, -4.4244, []),
+    (21, "Fès", "Maroc", 34.0181, -5.0078, ["fez"]),
+    (22, "Meknès", "Maroc", 33.8935, -5.5473, []),
+    (23, "Ifrane", "Maroc", 33.5228, -5.1109, []),
+    (24, "Taza", "Maroc", 34.2100, -4.0100, []),
+    (25, "Oujda", "Maroc", 34.6814, -1.9086, []),
+    (26, "Nador", "Maroc", 35.1681, -2.9335, []),
+    (27, "Al Hoceïma", "Maroc", 35.2517, -3.9372, ["al hoceima", "hoceima"]),
+    (28, "Tanger", "Maroc", 35.7595, -5.8340, ["tangier", "tangiers"]),
+    (29, "Tétouan", "Maroc", 35.5785, -5.3684, ["tetuan"]),
+    (30, "Larache", "Maroc", 35.1932, -6.1557, []),
+    (31, "Ksar El Kébir", "Maroc", 35.0017, -5.9030, []),
+    (32, "Chefchaouen", "Maroc", 35.1688, -5.2636, ["chaouen"]),
+    (33, "Béni Mellal", "Maroc", 32.3373, -6.3498, []),
+    (34, "Khouribga", "Maroc", 32.8811, -6.9063, []),
+    (35, "Khémisset", "Maroc", 33.8240, -6.0663, []),
+    (36, "Sidi Kacem", "Maroc", 34.2260, -5.7070, []),
+    (37, "Sidi Slimane", "Maroc", 34.2600, -5.9260, []),
+    (38, "Taroudant", "Maroc", 30.4703, -8.8770, []),
+    (39, "Fnideq", "Maroc", 35.8490, -5.3570, []),
+    (40, "Benguerir", "Maroc", 32.2360, -7.9540, ["ben guerir"]),
+    # Grandes villes francophones
+    (101, "Paris", "France", 48.8566, 2.3522, []),
+    (102, "Lyon", "France", 45.7640, 4.8357, []),
+    (103, "Marseille", "France", 43.2965, 5.3698, []),
+    (104, "Toulouse", "France", 43.6047, 1.4442, []),
+    (105, "Nice", "France", 43.7102, 7.2620, []),
+    (106, "Nantes", "France", 47.2184, -1.5536, []),
+    (107, "Strasbourg", "France", 48.5734, 7.7521, []),
+    (108, "Montpellier", "France", 43.6108, 3.8767, []),
+    (109, "Bordeaux", "France", 44.8378, -0.5792, []),
+    (110, "Lille", "France", 50.6292, 3.0573, []),
+    (111, "Rennes", "France", 48.1173, -1.6778, []),
+    (112, "Grenoble", "France", 45.1885, 5.7245, []),
+    (121, "Bruxelles", "Belgique", 50.8503, 4.3517, ["brussels", "brussel"]),
+    (122, "Liège", "Belgique", 50.6326, 5.5797, []),
+    (131, "Genève", "Suisse", 46.2044, 6.1432, ["geneva"]),
+    (132, "Lausanne", "Suisse", 46.5197, 6.6323, []),
+    (141, "Luxembourg", "Luxembourg", 49.6116, 6.1319, []),
+    (151, "Montréal", "Canada", 45.5017, -73.5673, []),
+    (152, "Québec", "Canada", 46.8139, -71.2080, ["quebec city"]),
+    (161, "Dakar", "Sénégal", 14.7167, -17.4677, []),
+    (162, "Abidjan", "Côte d'Ivoire", 5.3600, -4.0083, []),
+    (163, "Tunis", "Tunisie", 36.8065, 10.1815, []),
+    (164, "Alger", "Algérie", 36.7538, 3.0588, ["algiers"]),
+    (165, "Oran", "Algérie", 35.6971, -0.6308, []),
+    (166, "Nouakchott", "Mauritanie", 18.0735, -15.9582, []),
+]
+
+VILLES: Dict[int, Ville] = {
+    ville_id: Ville(ville_id, nom, pays, latitude, longitude)
+    for ville_id, nom, pays, latitude, longitude, _ in _VILLES
+}
+
+RAYON_TERRE_KM = 6371.0
+MAX_MOTS_NOM = 3
+
+_NON_ALPHANUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_city_text(texte: Optional[str]) -> str:
+    """Minuscules, sans accents ni ponctuation ("Fès, Maroc" -> "fes maroc")."""
+    sans_accents = unicodedata.normalize("NFKD", texte or "").encode("ascii", "ignore").decode("ascii")
+    return _NON_ALPHANUM.sub(" ", sans_accents.lower()).strip()
+
+
+# Forme normalisée (nom ou variante) -> id
+ALIAS_INDEX: Dict[str, int] = {}
+for _ville_id, _nom, _pays, _lat, _lon, _variantes in _VILLES:
+    for _forme in [_nom] + _variantes:
+        ALIAS_INDEX[normalize_city_text(_forme)] = _ville_id
+
+
+@lru_cache(maxsize=8192)
+def resolve_ville_id(texte: Optional[str]) -> Optional[int]:
+    """Id de la première ville du gazetteer citée dans le texte (None si aucune)."""
+    mots = normalize_city_text(texte).split()
+    for debut in range(len(mots)):
+        # Nom le plus long d'abord : "sidi kacem" avant un éventuel "sidi"
+        for taille in range(min(MAX_MOTS_NOM, len(mots) - debut), 0, -1):
+            ville_id = ALIAS_INDEX.get(" ".join(mots[debut:debut + taille]))
+            if ville_id is not None:
+                return ville_id
+    return None
+
+
+def get_ville(ville_id: Optional[int]) -> Optional[Ville]:
+    return VILLES.get(ville_id) if ville_id is not None else None
+
+
+@lru_cache(maxsize=16384)
+def distance_km(ville_a: int, ville_b: int) -> float:
+    """Distance orthodromique (haversine) entre deux villes du gazetteer."""
+    a, b = VILLES[ville_a], VILLES[ville_b]
+    lat_a, lat_b = math.radians(a.latitude), math.radians(b.latitude)
+    delta_lat = lat_b - lat_a
+    delta_lon = math.radians(b.longitude - a.longitude)
+    h = math.sin(delta_lat / 2) ** 2 + math.cos(lat_a) * math.cos(lat_b) * math.sin(delta_lon / 2) ** 2
+    return 2 * RAYON_TERRE_KM * math.asin(math.sqrt(h))
+
+
+def bounding_box(ville_id: int, rayon_km: float) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lon_min, lon_max) englobant le cercle de `rayon_km` autour de la ville."""
+    ville = VILLES[ville_id]
+    angle = rayon_km / RAYON_TERRE_KM
+    delta_lat = math.degrees(angle)
+    cos_lat = math.cos(math.radians(ville.latitude))
+    # Écart de longitude maximal du cercle (atteint hors du parallèle de la ville)
+    delta_lon = math.degrees(math.asin(math.sin(angle) / cos_lat)) if cos_lat > math.sin(angle) else 180.0
+    return (ville.latitude - delta_lat, ville.latitude + delta_lat,
+            ville.longitude - delta_lon, ville.longitude + delta_lon)
+
@@ -35,4 +35,8 @@ from app.models.contact import (StatusContact , TypeMessage , Contact)
 
 from app.models.admin import Admin
 
+from app.models.recommandation import RecommandationOffre, RecommandationEtat, ExecutionRecommandations
+from app.models.competence import Competence, CompetenceAlias, offre_competence, stagiaire_competence
+from app.models.daily_platform_stats import DailyPlatformStats
+
 # Importer d'autres modèles selon besoin
\ No newline at end of file
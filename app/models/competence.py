@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Table
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from app.models.base import BaseModel
+
+# Tables d'association offre <-> compétence et stagiaire <-> compétence
+offre_competence = Table('offre_competence', Base.metadata,
+    Column('offre_id', Integer, ForeignKey('offre.id', ondelete="CASCADE"), primary_key=True),
+    Column('competence_id', Integer, ForeignKey('competence.id', ondelete="CASCADE"), primary_key=True, index=True)
+)
+
+stagiaire_competence = Table('stagiaire_competence', Base.metadata,
+    Column('stagiaire_id', Integer, ForeignKey('stagiaire.id', ondelete="CASCADE"), primary_key=True),
+    Column('competence_id', Integer, ForeignKey('competence.id', ondelete="CASCADE"), primary_key=True, index=True),
+    Column('source', String, primary_key=True)  # manuelle, extraite
+)
+
+class Competence(BaseModel):
+    """Compétence du catalogue normalisé (libellé canonique)."""
+
+    nom = Column(String, unique=True, index=True, nullable=False)
+
+    # Relations
+    alias = relationship("CompetenceAlias", back_populates="competence", cascade="all, delete-orphan")
+
+class CompetenceAlias(BaseModel):
+    """Forme compacte d'un libellé ("nodejs", "node") rattachée à une compétence."""
+    __tablename__ = 'competence_alias'
+
+    alias = Column(String, unique=True, index=True, nullable=False)
+    competence_id = Column(Integer, ForeignKey("competence.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Relations
+    competence = relationship("Competence", back_populates="alias")
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime
+from sqlalchemy.sql import func
+from app.models.base import BaseModel
+
+class DailyPlatformStats(BaseModel):
+    """Compteurs journaliers de la plateforme (rollup des tables transactionnelles)."""
+    __tablename__ = 'daily_platform_stats'
+
+    jour = Column(Date, nullable=False, unique=True, index=True)
+
+    nouvelles_inscriptions = Column(Integer, nullable=False, default=0)
+    nouvelles_offres = Column(Integer, nullable=False, default=0)
+
+    # Candidatures créées ce jour, réparties selon leur statut actuel
+    nouvelles_candidatures = Column(Integer, nullable=False, default=0)
+    candidatures_en_attente = Column(Integer, nullable=False, default=0)
+    candidatures_en_cours = Column(Integer, nullable=False, default=0)
+    candidatures_acceptees = Column(Integer, nullable=False, default=0)
+    candidatures_refusees = Column(Integer, nullable=False, default=0)
+    candidatures_retirees = Column(Integer, nullable=False, default=0)
+
+    stages_commences = Column(Integer, nullable=False, default=0)  # date_debut_reel
+    stages_termines = Column(Integer, nullable=False, default=0)   # date_fin_reel
+
+    # Évaluations créées ce jour (somme et nombre des notes pour les moyennes)
+    nouvelles_evaluations = Column(Integer, nullable=False, default=0)
+    evaluations_notees = Column(Integer, nullable=False, default=0)
+    somme_notes_evaluations = Column(Float, nullable=False, default=0.0)
+
+    nouveaux_certificats = Column(Integer, nullable=False, default=0)
+
+    calcule_le = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Date, Boolean, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, ForeignKey, Date, Boolean, Text, Float, Index
+from sqlalchemy.orm import relationship, validates
 from app.models.base import BaseModel
 
 class Offre(BaseModel):
@@ -10,10 +10,14 @@ class Offre(BaseModel):
     type_stage = Column(String, nullable=False)  # Présentiel, télétravail, hybride
     remuneration = Column(Integer, nullable=True)
     localisation = Column(String, nullable=True)
+    ville_id = Column(Integer, nullable=True, index=True)  # Ville du gazetteer (app/core/gazetteer.py)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     secteur = Column(String, nullable=False)
     date_debut = Column(Date, nullable=False)
     date_fin = Column(Date, nullable=False)
     competences_requises = Column(Text, nullable=True)
+    competences_normalisees = Column(Text, nullable=True)  # " jeton1 jeton2 " pour le préfiltrage SQL
     est_active = Column(Boolean, default=True)
 
      # Clés étrangères
@@ -25,6 +29,34 @@ class Offre(BaseModel):
     recruteur = relationship("Recruteur", back_populates="offres")
     candidatures = relationship("Candidature", back_populates="offre")
 
+    __table_args__ = (
+        Index('idx_offre_latitude_longitude', 'latitude', 'longitude'),
+    )
+
+    @validates("competences_requises")
+    def _normaliser_competences(self, key, competences_requises):
+        """Tenir à jour les jetons de compétences utilisés par le préfiltrage SQL."""
+        self.competences_normalisees = self.normaliser_competences(competences_requises)
+        return competences_requises
+
+    @validates("localisation")
+    def _geolocaliser(self, key, localisation):
+        """Résoudre la ville de l'offre une fois, à l'écriture (lecture sans re-normalisation)."""
+        from app.core.gazetteer import get_ville, resolve_ville_id
+
+        ville = get_ville(resolve_ville_id(localisation))
+        self.ville_id = ville.id if ville else None
+        self.latitude = ville.latitude if ville else None
+        self.longitude = ville.longitude if ville else None
+        return localisation
+
+    @staticmethod
+    def normaliser_competences(competences_requises):
+        from app.services.offre_features import tokenize_competences
+
+        tokens = sorted(tokenize_competences(competences_requises))
+        return f" {' '.join(tokens)} " if tokens else ""
+
     def publier(self):
         """Publier l'offre."""
         self.est_active = True
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float, String, Boolean, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.models.base import BaseModel
+
+class RecommandationOffre(BaseModel):
+    """Recommandation pré-calculée (top-N) d'une offre pour un stagiaire."""
+    __tablename__ = 'recommandation_offre'
+
+    # Clés étrangères
+    stagiaire_id = Column(Integer, ForeignKey("stagiaire.id", ondelete="CASCADE"), nullable=False, index=True)
+    offre_id = Column(Integer, ForeignKey("offre.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Scores (0-100)
+    match_score = Column(Float, nullable=False)
+    competence_match = Column(Float, nullable=False)
+    secteur_match = Column(Float, nullable=False)
+    experience_match = Column(Float, nullable=False)
+    location_match = Column(Float, nullable=False)
+
+    calcule_le = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('stagiaire_id', 'offre_id', name='uq_recommandation_stagiaire_offre'),
+    )
+
+class RecommandationEtat(BaseModel):
+    """État du calcul des recommandations d'un stagiaire (empreinte du profil utilisé)."""
+    __tablename__ = 'recommandation_etat'
+
+    stagiaire_id = Column(Integer, ForeignKey("stagiaire.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    profil_hash = Column(String(64), nullable=False)
+    nombre_recommandations = Column(Integer, default=0)
+    calcule_le = Column(DateTime(timezone=True), server_default=func.now())
+
+class ExecutionRecommandations(BaseModel):
+    """Historique des exécutions du job de rafraîchissement des recommandations."""
+    __tablename__ = 'execution_recommandations'
+
+    debut = Column(DateTime(timezone=True), nullable=False)
+    fin = Column(DateTime(timezone=True), nullable=True)
+    complet = Column(Boolean, default=False)  # Recalcul complet ou incrémental
+    stagiaires_recalcules = Column(Integer, default=0)
+    offres_modifiees = Column(Integer, default=0)
+    signature_corpus = Column(String(64), nullable=True)  # Corpus des IDF utilisé (scorer tfidf)
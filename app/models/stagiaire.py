@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, ForeignKey, String, Date, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from app.models.utilisateur import Utilisateur
 
 class Stagiaire(Utilisateur):
@@ -16,6 +16,7 @@ class Stagiaire(Utilisateur):
     # Adresse
     adresse = Column(String(255), nullable=True)
     ville = Column(String(100), nullable=True)
+    ville_id = Column(Integer, nullable=True, index=True)  # Ville du gazetteer (app/core/gazetteer.py)
     code_postal = Column(String(10), nullable=True)
 
     # Formation et compétences
@@ -47,6 +48,14 @@ class Stagiaire(Utilisateur):
         'polymorphic_identity': 'stagiaire',
     }
 
+    @validates("ville")
+    def _geolocaliser(self, key, ville):
+        """Résoudre la ville du stagiaire une fois, à l'écriture."""
+        from app.core.gazetteer import resolve_ville_id
+
+        self.ville_id = resolve_ville_id(ville)
+        return ville
+
     def get_all_competences(self):
         """Récupère toutes les compétences (manuelles + extraites)."""
         competences = []
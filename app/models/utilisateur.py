@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, Integer, ForeignKey, Table
+from sqlalchemy import Boolean, Column, String, Integer, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 from app.core.database import Base
@@ -41,6 +41,11 @@ class Utilisateur(BaseModel):
         'polymorphic_on': type
     }
 
+    __table_args__ = (
+        # Pagination par clé (created_at, id) de la liste admin
+        Index('idx_utilisateur_created_at_id', 'created_at', 'id'),
+    )
+
 # Ces relations sont définies après la classe pour éviter les dépendances circulaires
 Utilisateur.messages_envoyes = relationship("Message", foreign_keys="Message.emetteur_id", back_populates="emetteur")
 Utilisateur.messages_recus = relationship("Message", foreign_keys="Message.destinataire_id", back_populates="destinataire")
\ No newline at end of file
@@ -33,11 +33,16 @@ class StatistiquesGlobales(BaseModel):
     taux_completion_stages: Optional[float] = None
     note_moyenne_globale: Optional[float] = None
 
+    # Instantané servi depuis le cache
+    genere_le: Optional[datetime] = None
+    age_snapshot_secondes: Optional[float] = None
+
 
 class StatistiquesTemporelles(BaseModel):
     """Évolution temporelle des métriques."""
     
-    mois: str  # Format: "2024-01", "2024-02", etc.
+    mois: str  # Libellé du bucket : "2024-01" (mois), "2024-W03" (semaine), "2024-01-15" (jour)
+    periode: Optional[str] = None  # Début du bucket (mois, semaine ou jour), format ISO
     nouvelles_inscriptions: int
     nouvelles_offres: int
     nouvelles_candidatures: int
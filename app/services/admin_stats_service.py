@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from typing import List
-from datetime import datetime, timedelta
+from sqlalchemy import func, extract, select, case, distinct, true, literal_column, DateTime, tuple_, union_all
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
 
 from app.models.utilisateur import Utilisateur
 from app.models.stagiaire import Stagiaire
@@ -13,160 +13,272 @@ from app.models.offre import Offre
 from app.models.candidature import Candidature, StatusCandidature
 from app.models.stage import Stage
 from app.models.evaluation import Evaluation , Certificat
+from app.models.daily_platform_stats import DailyPlatformStats
 from app.schemas.admin_stats import *
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Statistiques globales du tableau de bord admin (instantané unique)
+admin_stats_cache = TTLCache(maxsize=1, ttl=settings.ADMIN_STATS_CACHE_TTL_SECONDS)
+
+# Granularités de date_trunc acceptées pour les séries temporelles
+GRANULARITES = ("month", "week", "day")
 
 class AdminStatsService:
     """Service pour calculer les statistiques admin."""
     
     @staticmethod
     def obtenir_statistiques_globales(db: Session) -> StatistiquesGlobales:
-        """Calcule les statistiques globales de la plateforme."""
+        """Calcule les statistiques globales de la plateforme.
         
-        # Compter les utilisateurs par type
-        nombre_stagiaires = db.query(Stagiaire).count()
-        nombre_recruteurs = db.query(Recruteur).count()
-        nombre_rh = db.query(ResponsableRH).count()
-        nombre_admins = db.query(Admin).count()
-        nombre_total = nombre_stagiaires + nombre_recruteurs + nombre_rh + nombre_admins
+        Servies depuis un instantané de ADMIN_STATS_CACHE_TTL_SECONDS : un seul
+        calcul à la fois, les tableaux de bord concurrents attendent son résultat.
+        """
+        snapshot = admin_stats_cache.get_or_set(
+            "globales", lambda: AdminStatsService.calculer_statistiques_globales(db)
+        )
+        return snapshot.model_copy(update={
+            "age_snapshot_secondes": round((datetime.now() - snapshot.genere_le).total_seconds(), 1)
+        })
+    
+    @staticmethod
+    def calculer_statistiques_globales(db: Session) -> StatistiquesGlobales:
+        """Tous les compteurs en un aller-retour : un agrégat conditionnel par table, joints entre eux."""
         
-        # Entreprises
-        nombre_entreprises = db.query(Entreprise).count()
+        def compter(colonne):
+            return select(func.count(colonne)).scalar_subquery()
         
         # Calculer entreprises actives (qui ont au moins une offre dans les 6 derniers mois)
         six_mois_ago = datetime.now() - timedelta(days=180)
-        entreprises_actives = db.query(Entreprise.id).join(Offre).filter(
-            Offre.created_at >= six_mois_ago
-        ).distinct().count()
-        
-        # Offres
-        nombre_offres_total = db.query(Offre).count()
-        nombre_offres_actives = db.query(Offre).filter(Offre.est_active == True).count()
-        
-        # Candidatures
-        nombre_candidatures_total = db.query(Candidature).count()
-        nombre_candidatures_acceptees = db.query(Candidature).filter(
-            Candidature.status == StatusCandidature.ACCEPTEE
-        ).count()
-        
-        # Stages
-        nombre_stages_total = db.query(Stage).count()
-        nombre_stages_termines = db.query(Stage).filter(
-            Stage.status == "termine"
-        ).count()
-        
-        # Évaluations et certificats
-        nombre_evaluations_total = db.query(Evaluation).count()
-        nombre_certificats_generes = db.query(Certificat).count()
+        
+        offres = select(
+            func.count(Offre.id).label("total"),
+            func.coalesce(func.sum(case((Offre.est_active == True, 1), else_=0)), 0).label("actives"),
+            func.count(distinct(case((Offre.created_at >= six_mois_ago, Offre.entreprise_id)))).label("entreprises_actives")
+        ).subquery()
+        candidatures = select(
+            func.count(Candidature.id).label("total"),
+            func.coalesce(func.sum(case((Candidature.status == StatusCandidature.ACCEPTEE, 1), else_=0)), 0).label("acceptees")
+        ).subquery()
+        stages = select(
+            func.count(Stage.id).label("total"),
+            func.coalesce(func.sum(case((Stage.status == "termine", 1), else_=0)), 0).label("termines")
+        ).subquery()
+        evaluations = select(
+            func.count(Evaluation.id).label("total"),
+            func.avg(Evaluation.note_globale).label("note_moyenne")
+        ).subquery()
+        
+        ligne = db.execute(
+            select(
+                compter(Stagiaire.id).label("stagiaires"),
+                compter(Recruteur.id).label("recruteurs"),
+                compter(ResponsableRH.id).label("rh"),
+                compter(Admin.id).label("admins"),
+                compter(Entreprise.id).label("entreprises"),
+                compter(Certificat.id).label("certificats"),
+                offres.c.total.label("offres"),
+                offres.c.actives.label("offres_actives"),
+                offres.c.entreprises_actives,
+                candidatures.c.total.label("candidatures"),
+                candidatures.c.acceptees.label("candidatures_acceptees"),
+                stages.c.total.label("stages"),
+                stages.c.termines.label("stages_termines"),
+                evaluations.c.total.label("evaluations"),
+                evaluations.c.note_moyenne
+            ).select_from(
+                offres.join(candidatures, true()).join(stages, true()).join(evaluations, true())
+            )
+        ).one()
         
         # Calculs des taux
         taux_acceptation = None
-        if nombre_candidatures_total > 0:
-            taux_acceptation = round((nombre_candidatures_acceptees / nombre_candidatures_total) * 100, 2)
+        if ligne.candidatures > 0:
+            taux_acceptation = round((ligne.candidatures_acceptees / ligne.candidatures) * 100, 2)
         
         taux_completion = None
-        if nombre_stages_total > 0:
-            taux_completion = round((nombre_stages_termines / nombre_stages_total) * 100, 2)
+        if ligne.stages > 0:
+            taux_completion = round((ligne.stages_termines / ligne.stages) * 100, 2)
         
-        # Note moyenne globale
-        note_moyenne = db.query(func.avg(Evaluation.note_globale)).filter(
-            Evaluation.note_globale.isnot(None)
-        ).scalar()
-        note_moyenne = round(note_moyenne, 2) if note_moyenne else None
+        note_moyenne = round(float(ligne.note_moyenne), 2) if ligne.note_moyenne else None
         
         return StatistiquesGlobales(
-            nombre_total_utilisateurs=nombre_total,
-            nombre_stagiaires=nombre_stagiaires,
-            nombre_recruteurs=nombre_recruteurs,
-            nombre_rh=nombre_rh,
-            nombre_admins=nombre_admins,
-            nombre_entreprises=nombre_entreprises,
-            entreprises_actives=entreprises_actives,
-            nombre_offres_total=nombre_offres_total,
-            nombre_offres_actives=nombre_offres_actives,
-            nombre_candidatures_total=nombre_candidatures_total,
-            nombre_candidatures_acceptees=nombre_candidatures_acceptees,
-            nombre_stages_total=nombre_stages_total,
-            nombre_stages_termines=nombre_stages_termines,
-            nombre_evaluations_total=nombre_evaluations_total,
-            nombre_certificats_generes=nombre_certificats_generes,
+            nombre_total_utilisateurs=ligne.stagiaires + ligne.recruteurs + ligne.rh + ligne.admins,
+            nombre_stagiaires=ligne.stagiaires,
+            nombre_recruteurs=ligne.recruteurs,
+            nombre_rh=ligne.rh,
+            nombre_admins=ligne.admins,
+            nombre_entreprises=ligne.entreprises,
+            entreprises_actives=ligne.entreprises_actives,
+            nombre_offres_total=ligne.offres,
+            nombre_offres_actives=ligne.offres_actives,
+            nombre_candidatures_total=ligne.candidatures,
+            nombre_candidatures_acceptees=ligne.candidatures_acceptees,
+            nombre_stages_total=ligne.stages,
+            nombre_stages_termines=ligne.stages_termines,
+            nombre_evaluations_total=ligne.evaluations,
+            nombre_certificats_generes=ligne.certificats,
             taux_acceptation_candidatures=taux_acceptation,
             taux_completion_stages=taux_completion,
-            note_moyenne_globale=note_moyenne
+            note_moyenne_globale=note_moyenne,
+            genere_le=datetime.now()
         )
     
     @staticmethod
-    def obtenir_evolution_temporelle(db: Session, mois_nombre: int = 12) -> List[StatistiquesTemporelles]:
-        """Obtient l'évolution des métriques sur les derniers mois."""
+    def debut_periode(instant: datetime, granularite: str) -> date:
+        """Début du bucket calendaire contenant `instant` (comme date_trunc)."""
+        jour = instant.date() if isinstance(instant, datetime) else instant
+        if granularite == "month":
+            return jour.replace(day=1)
+        if granularite == "week":
+            return jour - timedelta(days=jour.weekday())  # Semaines ISO, lundi
+        return jour
+    
+    @staticmethod
+    def decaler_periode(debut: date, granularite: str, nombre: int) -> date:
+        """Début du bucket situé `nombre` périodes après (ou avant) `debut`."""
+        if granularite == "month":
+            index = debut.year * 12 + debut.month - 1 + nombre
+            return date(index // 12, index % 12 + 1, 1)
+        return debut + timedelta(days=nombre * (7 if granularite == "week" else 1))
+    
+    @staticmethod
+    def libelle_periode(debut: date, granularite: str) -> str:
+        """Libellé du bucket : "2024-01" (mois), "2024-W03" (semaine ISO) ou "2024-01-15" (jour)."""
+        if granularite == "month":
+            return debut.strftime("%Y-%m")
+        if granularite == "week":
+            annee, semaine, _ = debut.isocalendar()
+            return f"{annee}-W{semaine:02d}"
+        return debut.isoformat()
+    
+    @staticmethod
+    def compter_par_periode(db: Session, colonne, granularite: str, debut: date, fin: date) -> Dict[date, int]:
+        """Comptes de `colonne` par bucket date_trunc sur [debut, fin[, en une requête groupée."""
+        bucket = func.date_trunc(literal_column(f"'{granularite}'"), colonne, type_=DateTime)
+        lignes = db.query(bucket.label("periode"), func.count().label("count")).filter(
+            colonne >= debut,
+            colonne < fin
+        ).group_by(bucket).all()
+        return {AdminStatsService.debut_periode(ligne.periode, granularite): ligne.count for ligne in lignes}
+    
+    @staticmethod
+    def obtenir_evolution_temporelle(db: Session, mois_nombre: int = 12,
+                                     granularite: str = "month") -> List[StatistiquesTemporelles]:
+        """Obtient l'évolution des métriques sur les `mois_nombre` dernières périodes.
+        
+        Buckets calendaires exacts (mois, semaine ISO ou jour) regroupés en une
+        requête sur le rollup journalier jusqu'à son dernier rattrapage ; les
+        jours suivants (ou toute la période si le rollup n'a jamais été calculé)
+        sont comptés en direct sur les tables brutes. Les périodes sans activité
+        sont complétées à 0.
+        """
+        from app.services.daily_stats_service import DailyStatsService, SOURCES_COMPTEURS
+        
+        if granularite not in GRANULARITES:
+            raise ValueError(f"Granularité inconnue: {granularite}")
+        
+        fin = AdminStatsService.decaler_periode(AdminStatsService.debut_periode(datetime.now(), granularite), granularite, 1)
+        debut = AdminStatsService.decaler_periode(fin, granularite, -mois_nombre)
+        
+        # Jour du dernier rattrapage : le rollup couvre les jours précédents
+        calcule_le = DailyStatsService.dernier_calcul(db)
+        bascule = min(max(calcule_le.astimezone().date(), debut), fin) if calcule_le else debut
+        
+        series = ("nouvelles_inscriptions", "nouvelles_offres", "nouvelles_candidatures",
+                  "stages_commences", "stages_termines")
+        comptes: Dict[date, Dict[str, int]] = {}
+        
+        if bascule > debut:
+            bucket = func.date_trunc(literal_column(f"'{granularite}'"), DailyPlatformStats.jour, type_=DateTime)
+            for ligne in db.query(
+                bucket.label("periode"),
+                *[func.sum(getattr(DailyPlatformStats, nom)).label(nom) for nom in series]
+            ).filter(
+                DailyPlatformStats.jour >= debut,
+                DailyPlatformStats.jour < bascule
+            ).group_by(bucket):
+                compte = comptes.setdefault(AdminStatsService.debut_periode(ligne.periode, granularite), dict.fromkeys(series, 0))
+                for nom in series:
+                    compte[nom] += int(getattr(ligne, nom) or 0)
+        
+        if bascule < fin:
+            for nom in series:
+                for periode, count in AdminStatsService.compter_par_periode(
+                    db, SOURCES_COMPTEURS[nom], granularite, bascule, fin
+                ).items():
+                    comptes.setdefault(periode, dict.fromkeys(series, 0))[nom] += count
         
         stats = []
-        for i in range(mois_nombre):
-            # Calculer le premier et dernier jour du mois
-            date_fin = datetime.now().replace(day=1) - timedelta(days=i*30)
-            date_debut = date_fin.replace(day=1)
-            date_fin_mois = (date_debut + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            # Compter les nouvelles inscriptions
-            nouvelles_inscriptions = db.query(Utilisateur).filter(
-                Utilisateur.created_at >= date_debut,
-                Utilisateur.created_at <= date_fin_mois
-            ).count()
-            
-            # Nouvelles offres
-            nouvelles_offres = db.query(Offre).filter(
-                Offre.created_at >= date_debut,
-                Offre.created_at <= date_fin_mois
-            ).count()
-            
-            # Nouvelles candidatures
-            nouvelles_candidatures = db.query(Candidature).filter(
-                Candidature.created_at >= date_debut,
-                Candidature.created_at <= date_fin_mois
-            ).count()
-            
-            # Stages commencés (date_debut_reel dans ce mois)
-            stages_commences = db.query(Stage).filter(
-                Stage.date_debut_reel >= date_debut,
-                Stage.date_debut_reel <= date_fin_mois
-            ).count()
-            
-            # Stages terminés (date_fin_reel dans ce mois)
-            stages_termines = db.query(Stage).filter(
-                Stage.date_fin_reel >= date_debut,
-                Stage.date_fin_reel <= date_fin_mois
-            ).count()
-            
+        for i in range(mois_nombre):  # Du plus ancien au plus récent
+            periode = AdminStatsService.decaler_periode(debut, granularite, i)
             stats.append(StatistiquesTemporelles(
-                mois=date_debut.strftime("%Y-%m"),
-                nouvelles_inscriptions=nouvelles_inscriptions,
-                nouvelles_offres=nouvelles_offres,
-                nouvelles_candidatures=nouvelles_candidatures,
-                stages_commences=stages_commences,
-                stages_termines=stages_termines
+                mois=AdminStatsService.libelle_periode(periode, granularite),
+                periode=periode.isoformat(),
+                **comptes.get(periode, dict.fromkeys(series, 0))
             ))
         
-        return list(reversed(stats))  # Du plus ancien au plus récent
+        return stats
+    
+    @staticmethod
+    def agregats_par_entreprise():
+        """Une CTE par table enfant, agrégée séparément par entreprise_id.
+        
+        Joindre directement recruteurs, offres, candidatures, stages et
+        évaluations multiplie les lignes (produit cartésien par entreprise) :
+        chaque table est donc réduite à une ligne par entreprise avant la jointure.
+        """
+        recruteurs = select(
+            Recruteur.entreprise_id.label("entreprise_id"),
+            func.count(Recruteur.id).label("nombre")
+        ).group_by(Recruteur.entreprise_id).cte("recruteurs_par_entreprise")
+        
+        offres = select(
+            Offre.entreprise_id.label("entreprise_id"),
+            func.count(Offre.id).label("nombre")
+        ).group_by(Offre.entreprise_id).cte("offres_par_entreprise")
+        
+        candidatures = select(
+            Offre.entreprise_id.label("entreprise_id"),
+            func.count(Candidature.id).label("nombre")
+        ).join(Offre, Offre.id == Candidature.offre_id).group_by(Offre.entreprise_id).cte("candidatures_par_entreprise")
+        
+        stages = select(
+            Stage.entreprise_id.label("entreprise_id"),
+            func.count(Stage.id).label("nombre")
+        ).group_by(Stage.entreprise_id).cte("stages_par_entreprise")
+        
+        # Somme et nombre de notes (et non la moyenne) pour pouvoir regrouper par secteur
+        evaluations = select(
+            Stage.entreprise_id.label("entreprise_id"),
+            func.sum(Evaluation.note_globale).label("somme_notes"),
+            func.count(Evaluation.note_globale).label("nombre_notes")
+        ).join(Stage, Stage.id == Evaluation.stage_id).group_by(Stage.entreprise_id).cte("evaluations_par_entreprise")
+        
+        return recruteurs, offres, candidatures, stages, evaluations
     
     @staticmethod
     def obtenir_stats_entreprises(db: Session, limit: int = 20) -> List[StatistiquesEntreprises]:
         """Obtient les statistiques des principales entreprises."""
         
-        # Requête complexe pour obtenir toutes les stats en une fois
+        recruteurs, offres, candidatures, stages, evaluations = AdminStatsService.agregats_par_entreprise()
+        nombre_stages = func.coalesce(stages.c.nombre, 0)
+        
         entreprises_stats = db.query(
             Entreprise.id,
             Entreprise.raison_social,
             Entreprise.secteur_activite,
-            func.count(Recruteur.id).label('nombre_recruteurs'),
-            func.count(Offre.id).label('nombre_offres'),
-            func.count(Candidature.id).label('nombre_candidatures'),
-            func.count(Stage.id).label('nombre_stages'),
-            func.avg(Evaluation.note_globale).label('note_moyenne')
-        ).outerjoin(Recruteur, Entreprise.id == Recruteur.entreprise_id)\
-         .outerjoin(Offre, Entreprise.id == Offre.entreprise_id)\
-         .outerjoin(Candidature, Offre.id == Candidature.offre_id)\
-         .outerjoin(Stage, Entreprise.id == Stage.entreprise_id)\
-         .outerjoin(Evaluation, Stage.id == Evaluation.stage_id)\
-         .group_by(Entreprise.id, Entreprise.raison_social, Entreprise.secteur_activite)\
-         .order_by(func.count(Stage.id).desc())\
+            func.coalesce(recruteurs.c.nombre, 0).label('nombre_recruteurs'),
+            func.coalesce(offres.c.nombre, 0).label('nombre_offres'),
+            func.coalesce(candidatures.c.nombre, 0).label('nombre_candidatures'),
+            nombre_stages.label('nombre_stages'),
+            (evaluations.c.somme_notes / func.nullif(evaluations.c.nombre_notes, 0)).label('note_moyenne')
+        ).outerjoin(recruteurs, recruteurs.c.entreprise_id == Entreprise.id)\
+         .outerjoin(offres, offres.c.entreprise_id == Entreprise.id)\
+         .outerjoin(candidatures, candidatures.c.entreprise_id == Entreprise.id)\
+         .outerjoin(stages, stages.c.entreprise_id == Entreprise.id)\
+         .outerjoin(evaluations, evaluations.c.entreprise_id == Entreprise.id)\
+         .order_by(nombre_stages.desc(), Entreprise.id)\
          .limit(limit).all()
         
         return [
@@ -187,24 +299,27 @@ class AdminStatsService:
     def obtenir_stats_secteurs(db: Session) -> List[StatistiquesSecteurs]:
         """Obtient les statistiques par secteur d'activité."""
         
+        _, offres, _, stages, evaluations = AdminStatsService.agregats_par_entreprise()
+        nombre_entreprises = func.count(Entreprise.id)
+        
         secteurs_stats = db.query(
             Entreprise.secteur_activite,
-            func.count(Entreprise.id).label('nombre_entreprises'),
-            func.count(Offre.id).label('nombre_offres'),
-            func.count(Stage.id).label('nombre_stages'),
-            func.avg(Evaluation.note_globale).label('note_moyenne')
-        ).outerjoin(Offre, Entreprise.id == Offre.entreprise_id)\
-         .outerjoin(Stage, Entreprise.id == Stage.entreprise_id)\
-         .outerjoin(Evaluation, Stage.id == Evaluation.stage_id)\
+            nombre_entreprises.label('nombre_entreprises'),
+            func.coalesce(func.sum(offres.c.nombre), 0).label('nombre_offres'),
+            func.coalesce(func.sum(stages.c.nombre), 0).label('nombre_stages'),
+            (func.sum(evaluations.c.somme_notes) / func.nullif(func.sum(evaluations.c.nombre_notes), 0)).label('note_moyenne')
+        ).outerjoin(offres, offres.c.entreprise_id == Entreprise.id)\
+         .outerjoin(stages, stages.c.entreprise_id == Entreprise.id)\
+         .outerjoin(evaluations, evaluations.c.entreprise_id == Entreprise.id)\
          .group_by(Entreprise.secteur_activite)\
-         .order_by(func.count(Entreprise.id).desc()).all()
+         .order_by(nombre_entreprises.desc(), Entreprise.secteur_activite).all()
         
         return [
             StatistiquesSecteurs(
                 secteur=stat.secteur_activite or "Non spécifié",
                 nombre_entreprises=stat.nombre_entreprises or 0,
-                nombre_offres=stat.nombre_offres or 0,
-                nombre_stages=stat.nombre_stages or 0,
+                nombre_offres=int(stat.nombre_offres or 0),  # sum() : numeric sous PostgreSQL
+                nombre_stages=int(stat.nombre_stages or 0),
                 note_moyenne=round(stat.note_moyenne, 2) if stat.note_moyenne else None
             )
             for stat in secteurs_stats
@@ -216,9 +331,16 @@ class AdminStatsService:
         type_filtre: str = None, 
         actif_filtre: bool = None,
         skip: int = 0, 
-        limit: int = 50
+        limit: int = 50,
+        apres_created_at: Optional[datetime] = None,
+        apres_id: Optional[int] = None
     ) -> List[UtilisateurDetaille]:
-        """Obtient la liste détaillée des utilisateurs."""
+        """Obtient la liste détaillée des utilisateurs, triée par (created_at, id).
+        
+        Avec `apres_created_at`/`apres_id` (dernière ligne de la page précédente),
+        la page est lue par clé au lieu d'OFFSET. Les compteurs et entreprises
+        sont chargés en une requête par relation pour toute la page.
+        """
         
         query = db.query(Utilisateur)
         
@@ -228,7 +350,19 @@ class AdminStatsService:
         if actif_filtre is not None:
             query = query.filter(Utilisateur.actif == actif_filtre)
         
-        utilisateurs = query.offset(skip).limit(limit).all()
+        query = query.order_by(Utilisateur.created_at, Utilisateur.id)
+        if apres_created_at is not None and apres_id is not None:
+            query = query.filter(tuple_(Utilisateur.created_at, Utilisateur.id) > tuple_(apres_created_at, apres_id))
+        else:
+            query = query.offset(skip)
+        
+        utilisateurs = query.limit(limit).all()
+        
+        ids_par_type: Dict[str, List[int]] = {}
+        for user in utilisateurs:
+            ids_par_type.setdefault(user.type, []).append(user.id)
+        
+        enrichissement = AdminStatsService.enrichir_utilisateurs(db, ids_par_type)
         
         result = []
         for user in utilisateurs:
@@ -244,27 +378,45 @@ class AdminStatsService:
             
             # Ajouter des informations spécifiques selon le type
             if user.type == "stagiaire":
-                # Compter les candidatures
-                nb_candidatures = db.query(Candidature).filter(
-                    Candidature.stagiaire_id == user.id
-                ).count()
-                user_detail.nombre_candidatures = nb_candidatures
+                user_detail.nombre_candidatures = enrichissement["candidatures"].get(user.id, 0)
                 
             elif user.type in ["recruteur", "responsable_rh"]:
-                # Obtenir le nom de l'entreprise et compter les offres
-                if hasattr(user, 'entreprise_id') and user.entreprise_id:
-                    entreprise = db.query(Entreprise).filter(
-                        Entreprise.id == user.entreprise_id
-                    ).first()
-                    if entreprise:
-                        user_detail.entreprise_nom = entreprise.raison_social
+                user_detail.entreprise_nom = enrichissement["entreprises"].get(user.id)
                 
                 if user.type == "recruteur":
-                    nb_offres = db.query(Offre).filter(
-                        Offre.recruteur_id == user.id
-                    ).count()
-                    user_detail.nombre_offres = nb_offres
+                    user_detail.nombre_offres = enrichissement["offres"].get(user.id, 0)
             
             result.append(user_detail)
         
-        return result
\ No newline at end of file
+        return result
+    
+    @staticmethod
+    def enrichir_utilisateurs(db: Session, ids_par_type: Dict[str, List[int]]) -> Dict[str, Dict[int, object]]:
+        """Compteurs et noms d'entreprise d'une page d'utilisateurs, une requête par relation."""
+        
+        enrichissement: Dict[str, Dict[int, object]] = {"candidatures": {}, "offres": {}, "entreprises": {}}
+        
+        stagiaire_ids = ids_par_type.get("stagiaire")
+        if stagiaire_ids:
+            enrichissement["candidatures"] = dict(db.query(
+                Candidature.stagiaire_id, func.count(Candidature.id)
+            ).filter(Candidature.stagiaire_id.in_(stagiaire_ids)).group_by(Candidature.stagiaire_id).all())
+        
+        recruteur_ids = ids_par_type.get("recruteur")
+        if recruteur_ids:
+            enrichissement["offres"] = dict(db.query(
+                Offre.recruteur_id, func.count(Offre.id)
+            ).filter(Offre.recruteur_id.in_(recruteur_ids)).group_by(Offre.recruteur_id).all())
+        
+        # Entreprises des recruteurs et des RH en une seule requête
+        requetes = [
+            select(modele.id, Entreprise.raison_social).join(
+                Entreprise, Entreprise.id == modele.entreprise_id
+            ).where(modele.id.in_(ids))
+            for modele, ids in ((Recruteur, recruteur_ids), (ResponsableRH, ids_par_type.get("responsable_rh")))
+            if ids
+        ]
+        if requetes:
+            enrichissement["entreprises"] = dict(db.execute(union_all(*requetes)).all())
+        
+        return enrichissement
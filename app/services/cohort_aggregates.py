@@ -0,0 +1,241 @@
+# app/services/cohort_aggregates.py
+import threading
+import time
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.candidature import Candidature
+from app.models.offre import Offre
+from app.models.stagiaire import Stagiaire
+from app.services.competence_catalogue_service import CompetenceCatalogueService
+
+# (specialite, niveau_etudes)
+CohortKey = Tuple[Optional[str], Optional[str]]
+
+
+def cohort_key(specialite: Optional[str], niveau_etudes: Optional[str]) -> CohortKey:
+    return (specialite, niveau_etudes)
+
+
+def profil_competences(competences_manuelles: Optional[str], competences_extraites: Optional[str]) -> FrozenSet[str]:
+    """Compétences d'un profil, comme Stagiaire.get_all_competences."""
+    split = CompetenceCatalogueService.split_stagiaire_competences
+    return frozenset(split(competences_manuelles)) | frozenset(split(competences_extraites))
+
+
+class CohortAggregates:
+    """Agrégats par cohorte (specialite, niveau_etudes) pour la position sur le marché.
+
+    Pour chaque cohorte : nombre de profils, Counter des compétences (un profil
+    compte une fois par compétence) et nombre de candidatures sur des offres
+    actives. Les profils modifiés sont reportés par update_stagiaire ; les
+    nouveaux stagiaires, les nouvelles candidatures et les offres activées ou
+    fermées sont rattrapés par deltas, détectés par des signatures des tables.
+    Une reconstruction complète a lieu toutes les `ttl` secondes, pour les
+    profils modifiés dans un autre processus.
+    """
+
+    def __init__(self, ttl: float = 900):
+        self.ttl = ttl
+
+        self._lock = threading.RLock()
+        self._built_at: Optional[float] = None
+        self._signature: Optional[Tuple] = None
+
+        self._profils: Dict[int, Tuple[CohortKey, FrozenSet[str]]] = {}
+        self._candidatures_actives: Counter = Counter()  # stagiaire_id -> candidatures sur offres actives
+        self._offres_actives: Set[int] = set()
+        self._max_stagiaire_id = 0
+        self._max_candidature_id = 0
+
+        self._tailles: Counter = Counter()
+        self._competences: Dict[CohortKey, Counter] = {}
+        self._concurrence: Counter = Counter()
+
+    # ------------------------------------------------------------------
+    # Mise à jour des agrégats
+    # ------------------------------------------------------------------
+
+    def _add_profil(self, stagiaire_id: int, key: CohortKey, competences: FrozenSet[str]) -> None:
+        self._profils[stagiaire_id] = (key, competences)
+        self._tailles[key] += 1
+        self._competences.setdefault(key, Counter()).update(competences)
+        self._concurrence[key] += self._candidatures_actives[stagiaire_id]
+
+    def _remove_profil(self, stagiaire_id: int) -> None:
+        ancien = self._profils.pop(stagiaire_id, None)
+        if ancien is None:
+            return
+
+        key, competences = ancien
+        self._tailles[key] -= 1
+        compteur = self._competences[key]
+        for competence in competences:
+            compteur[competence] -= 1
+            if compteur[competence] <= 0:
+                del compteur[competence]
+        self._concurrence[key] -= self._candidatures_actives[stagiaire_id]
+        if self._tailles[key] <= 0:
+            del self._tailles[key]
+            self._competences.pop(key, None)
+            self._concurrence.pop(key, None)
+
+    def _add_candidatures(self, stagiaire_id: int, nombre: int) -> None:
+        self._candidatures_actives[stagiaire_id] += nombre
+        if self._candidatures_actives[stagiaire_id] <= 0:
+            del self._candidatures_actives[stagiaire_id]
+        profil = self._profils.get(stagiaire_id)
+        if profil is not None:
+            self._concurrence[profil[0]] += nombre
+
+    def _apply_profils(self, rows: Iterable) -> int:
+        count = 0
+        for row in rows:
+            self._remove_profil(row.id)
+            self._add_profil(row.id, cohort_key(row.specialite, row.niveau_etudes),
+                             profil_competences(row.competences_manuelles, row.competences_extraites))
+            self._max_stagiaire_id = max(self._max_stagiaire_id, row.id)
+            count += 1
+        return count
+
+    @staticmethod
+    def _profils_query(db: Session):
+        return db.query(
+            Stagiaire.id, Stagiaire.specialite, Stagiaire.niveau_etudes,
+            Stagiaire.competences_manuelles, Stagiaire.competences_extraites
+        )
+
+    @staticmethod
+    def _signature_of(db: Session) -> Tuple:
+        return tuple(db.query(
+            db.query(func.count(Stagiaire.id)).scalar_subquery(),
+            db.query(func.max(Stagiaire.id)).scalar_subquery(),
+            db.query(func.count(Candidature.id)).scalar_subquery(),
+            db.query(func.max(Candidature.id)).scalar_subquery(),
+            db.query(func.count(Offre.id)).scalar_subquery(),
+            db.query(func.max(Offre.updated_at)).scalar_subquery(),
+        ).one())
+
+    def _rebuild(self, db: Session) -> None:
+        self._profils = {}
+        self._tailles = Counter()
+        self._competences = {}
+        self._concurrence = Counter()
+        self._max_stagiaire_id = 0
+
+        self._offres_actives = {offre_id for offre_id, in db.query(Offre.id).filter(Offre.est_active == True)}
+        self._candidatures_actives = Counter(dict(db.query(
+            Candidature.stagiaire_id, func.count(Candidature.id)
+        ).join(Offre, Offre.id == Candidature.offre_id).filter(
+            Offre.est_active == True
+        ).group_by(Candidature.stagiaire_id).all()))
+        self._max_candidature_id = db.query(func.max(Candidature.id)).scalar() or 0
+
+        count = self._apply_profils(self._profils_query(db))
+        print(f"👥 Agrégats de cohortes reconstruits: {count} profils, {len(self._tailles)} cohortes")
+
+    def _sync_offres(self, db: Session) -> None:
+        """Reporter les offres activées, fermées ou supprimées sur les candidatures connues."""
+        actives = {offre_id for offre_id, in db.query(Offre.id).filter(Offre.est_active == True)}
+        for offre_ids, signe in ((actives - self._offres_actives, 1), (self._offres_actives - actives, -1)):
+            if not offre_ids:
+                continue
+            # Les candidatures plus récentes sont comptées par _catch_up_candidatures
+            for stagiaire_id, nombre in db.query(
+                Candidature.stagiaire_id, func.count(Candidature.id)
+            ).filter(
+                Candidature.offre_id.in_(offre_ids),
+                Candidature.id <= self._max_candidature_id
+            ).group_by(Candidature.stagiaire_id):
+                self._add_candidatures(stagiaire_id, signe * nombre)
+        self._offres_actives = actives
+
+    def _catch_up_candidatures(self, db: Session) -> None:
+        for candidature_id, stagiaire_id, offre_id in db.query(
+            Candidature.id, Candidature.stagiaire_id, Candidature.offre_id
+        ).filter(Candidature.id > self._max_candidature_id):
+            if offre_id in self._offres_actives:
+                self._add_candidatures(stagiaire_id, 1)
+            self._max_candidature_id = max(self._max_candidature_id, candidature_id)
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Construire les agrégats (ou les reconstruire après `ttl`) puis appliquer les derniers changements."""
+        signature = self._signature_of(db)
+        expired = self._built_at is None or time.monotonic() - self._built_at > self.ttl
+        if not expired and signature == self._signature:
+            return
+
+        with self._lock:
+            expired = self._built_at is None or time.monotonic() - self._built_at > self.ttl
+            if not expired and signature == self._signature:
+                return
+
+            precedente = self._signature
+            # Stagiaires ou candidatures supprimés : un delta ne suffit pas
+            if expired or signature[0] < precedente[0] or signature[2] < precedente[2]:
+                self._rebuild(db)
+                self._built_at = time.monotonic()
+            else:
+                if signature[:2] != precedente[:2]:
+                    self._apply_profils(self._profils_query(db).filter(Stagiaire.id > self._max_stagiaire_id))
+                if signature[4:] != precedente[4:]:
+                    self._sync_offres(db)
+                if signature[2:4] != precedente[2:4]:
+                    self._catch_up_candidatures(db)
+            self._signature = signature
+
+    def update_stagiaire(self, stagiaire: Stagiaire) -> None:
+        """Reporter un profil modifié (cohorte ou compétences), après commit."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove_profil(stagiaire.id)
+            self._add_profil(stagiaire.id, cohort_key(stagiaire.specialite, stagiaire.niveau_etudes),
+                             profil_competences(stagiaire.competences_manuelles, stagiaire.competences_extraites))
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def position_of(self, stagiaire: Stagiaire) -> Dict:
+        """Profils similaires, candidatures concurrentes et fréquence des compétences chez les autres.
+
+        Le stagiaire lui-même est retiré des agrégats de sa cohorte : seules
+        ses propres compétences sont parcourues. Sans spécialité ou sans niveau
+        d'études, le profil n'a pas de cohorte (aucun profil similaire).
+        """
+        key = cohort_key(stagiaire.specialite, stagiaire.niveau_etudes)
+        competences = stagiaire.get_all_competences()
+
+        if None in key:
+            return {
+                "profils_similaires": 0,
+                "candidatures_concurrentes": 0,
+                "competences_autres": dict.fromkeys(competences, 0),
+            }
+
+        with self._lock:
+            stocke_key, stocke_competences = self._profils.get(stagiaire.id, (None, frozenset()))
+            dans_cohorte = stagiaire.id in self._profils and stocke_key == key
+            if not dans_cohorte:
+                stocke_competences = frozenset()
+
+            compteur = self._competences.get(key, Counter())
+            return {
+                "profils_similaires": self._tailles[key] - dans_cohorte,
+                "candidatures_concurrentes": self._concurrence[key] - (
+                    self._candidatures_actives[stagiaire.id] if dans_cohorte else 0
+                ),
+                "competences_autres": {
+                    competence: compteur[competence] - (competence in stocke_competences)
+                    for competence in competences
+                },
+            }
+
+
+# Instance globale partagée par les requêtes du processus
+cohort_aggregates = CohortAggregates(ttl=settings.COHORT_AGGREGATE_TTL_SECONDS)
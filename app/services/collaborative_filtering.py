@@ -0,0 +1,284 @@
+# app/services/collaborative_filtering.py
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.candidature import Candidature, StatusCandidature
+
+# Poids d'une candidature dans la matrice selon son statut (absente si 0)
+STATUS_WEIGHTS = {
+    StatusCandidature.ACCEPTEE: 1.0,
+    StatusCandidature.EN_COURS: 0.5,
+    StatusCandidature.EN_ATTENTE: 0.5,
+}
+
+SNAPSHOT_VERSION = 1
+
+
+class CoApplicationMatrix:
+    """Matrice creuse stagiaire x offre des candidatures acceptées ou en attente.
+
+    Sert au filtrage collaboratif item-item : deux offres sont similaires
+    (cosinus) quand les mêmes stagiaires y ont candidaté. La matrice est tenue
+    à jour par deltas (candidatures créées ou dont le statut a changé depuis la
+    dernière synchronisation) et sauvegardée sur disque pour éviter une
+    reconstruction complète au redémarrage.
+
+    Toutes les lectures se font sous le verrou : les mises à jour par deltas
+    d'une autre requête ne sont jamais observées à moitié.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_interval: float = 300):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._signature: Optional[Tuple] = None
+        self._max_id = 0
+        self._watermark: Optional[datetime] = None
+        self._last_snapshot = 0.0
+
+        self._offres_par_stagiaire: Dict[int, Dict[int, float]] = {}
+        self._stagiaires_par_offre: Dict[int, Dict[int, float]] = {}
+        self._norms_sq: Dict[int, float] = {}
+        self._voisins: Dict[int, Dict[int, float]] = {}
+
+    # ------------------------------------------------------------------
+    # Mise à jour de la matrice
+    # ------------------------------------------------------------------
+
+    def _set(self, stagiaire_id: int, offre_id: int, poids: float) -> None:
+        offres = self._offres_par_stagiaire.get(stagiaire_id, {})
+        ancien = offres.get(offre_id, 0.0)
+        if ancien == poids:
+            return
+
+        # La norme de l'offre change : le cosinus de toute offre co-candidatée avec elle aussi
+        if self._voisins:
+            self._voisins.pop(offre_id, None)
+            for autre in offres:
+                self._voisins.pop(autre, None)
+            for autre_stagiaire in self._stagiaires_par_offre.get(offre_id, {}):
+                for autre in self._offres_par_stagiaire.get(autre_stagiaire, {}):
+                    self._voisins.pop(autre, None)
+
+        self._norms_sq[offre_id] = self._norms_sq.get(offre_id, 0.0) - ancien ** 2 + poids ** 2
+        if poids:
+            self._offres_par_stagiaire.setdefault(stagiaire_id, {})[offre_id] = poids
+            self._stagiaires_par_offre.setdefault(offre_id, {})[stagiaire_id] = poids
+        else:
+            offres.pop(offre_id, None)
+            if not offres:
+                self._offres_par_stagiaire.pop(stagiaire_id, None)
+            stagiaires = self._stagiaires_par_offre.get(offre_id, {})
+            stagiaires.pop(stagiaire_id, None)
+            if not stagiaires:
+                self._stagiaires_par_offre.pop(offre_id, None)
+                self._norms_sq.pop(offre_id, None)
+
+    @staticmethod
+    def _signature_of(db: Session) -> Tuple:
+        return tuple(db.query(
+            func.count(Candidature.id), func.max(Candidature.id), func.max(Candidature.updated_at)
+        ).one())
+
+    def _apply_rows(self, rows: Iterable) -> int:
+        count = 0
+        for row in rows:
+            self._set(row.stagiaire_id, row.offre_id, STATUS_WEIGHTS.get(row.status, 0.0))
+            self._max_id = max(self._max_id, row.id)
+            if row.updated_at is not None and (self._watermark is None or row.updated_at > self._watermark):
+                self._watermark = row.updated_at
+            count += 1
+        return count
+
+    def _rebuild(self, db: Session) -> None:
+        self._offres_par_stagiaire = {}
+        self._stagiaires_par_offre = {}
+        self._norms_sq = {}
+        self._voisins = {}
+        self._max_id = 0
+        self._watermark = None
+
+        count = self._apply_rows(db.query(
+            Candidature.id, Candidature.stagiaire_id, Candidature.offre_id,
+            Candidature.status, Candidature.updated_at
+        ))
+        print(f"🤝 Matrice de co-candidatures reconstruite: {count} candidatures, "
+              f"{len(self._stagiaires_par_offre)} offres")
+
+    def _catch_up(self, db: Session) -> int:
+        """Appliquer les candidatures créées ou modifiées depuis la dernière synchronisation."""
+        conditions = [Candidature.id > self._max_id]
+        if self._watermark is not None:
+            conditions.append(Candidature.updated_at >= self._watermark)
+        else:
+            # Aucune modification vue jusqu'ici : toute candidature modifiée est nouvelle
+            conditions.append(Candidature.updated_at.isnot(None))
+
+        return self._apply_rows(db.query(
+            Candidature.id, Candidature.stagiaire_id, Candidature.offre_id,
+            Candidature.status, Candidature.updated_at
+        ).filter(or_(*conditions)))
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Charger la matrice (snapshot ou base) puis appliquer les derniers changements."""
+        signature = self._signature_of(db)
+        if self._loaded and signature == self._signature:
+            return
+
+        with self._lock:
+            if self._loaded and signature == self._signature:
+                return
+
+            if not self._loaded:
+                if not self.load_snapshot():
+                    self._rebuild(db)
+                    self._signature = signature
+                    self._loaded = True
+                    self.save_snapshot()
+                    return
+                self._loaded = True
+
+            # Candidatures supprimées : un delta ne suffit pas
+            if self._signature is not None and signature[0] < self._signature[0]:
+                self._rebuild(db)
+                changes = 1
+            else:
+                changes = self._catch_up(db)
+            self._signature = signature
+
+            if changes and time.monotonic() - self._last_snapshot > self.snapshot_interval:
+                self.save_snapshot()
+
+    # ------------------------------------------------------------------
+    # Snapshot disque
+    # ------------------------------------------------------------------
+
+    def save_snapshot(self) -> bool:
+        if not self.snapshot_path:
+            return False
+
+        with self._lock:
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "max_id": self._max_id,
+                "candidatures": self._signature[0] if self._signature else None,
+                "watermark": self._watermark.isoformat() if self._watermark else None,
+                "interactions": [
+                    [stagiaire_id, offre_id, poids]
+                    for stagiaire_id, offres in self._offres_par_stagiaire.items()
+                    for offre_id, poids in offres.items()
+                ]
+            }
+
+        try:
+            dossier = os.path.dirname(self.snapshot_path)
+            if dossier:
+                os.makedirs(dossier, exist_ok=True)
+            temporaire = f"{self.snapshot_path}.tmp"
+            with open(temporaire, "w") as f:
+                json.dump(data, f)
+            os.replace(temporaire, self.snapshot_path)
+            self._last_snapshot = time.monotonic()
+            return True
+        except OSError as e:
+            print(f"⚠️ Snapshot co-candidatures non sauvegardé: {e}")
+            return False
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+            if data.get("version") != SNAPSHOT_VERSION:
+                return False
+
+            self._offres_par_stagiaire = {}
+            self._stagiaires_par_offre = {}
+            self._norms_sq = {}
+            self._voisins = {}
+            for stagiaire_id, offre_id, poids in data["interactions"]:
+                self._set(stagiaire_id, offre_id, poids)
+
+            self._max_id = data["max_id"]
+            if data.get("candidatures") is not None:
+                # Permet de détecter les suppressions survenues depuis le snapshot
+                self._signature = (data["candidatures"], None, None)
+            self._watermark = datetime.fromisoformat(data["watermark"]) if data["watermark"] else None
+            self._last_snapshot = time.monotonic()
+            print(f"🤝 Matrice de co-candidatures chargée depuis {self.snapshot_path}")
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Snapshot co-candidatures illisible, reconstruction: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Similarités et recommandations
+    # ------------------------------------------------------------------
+
+    def similar_offres(self, offre_id: int) -> Dict[int, float]:
+        """Offres co-candidatées avec `offre_id` et leur similarité cosinus (mise en cache)."""
+        with self._lock:
+            voisins = self._voisins.get(offre_id)
+            if voisins is not None:
+                return voisins
+
+            produits: Dict[int, float] = {}
+            for stagiaire_id, poids_i in self._stagiaires_par_offre.get(offre_id, {}).items():
+                for autre, poids_j in self._offres_par_stagiaire.get(stagiaire_id, {}).items():
+                    if autre != offre_id:
+                        produits[autre] = produits.get(autre, 0.0) + poids_i * poids_j
+
+            norm_i = math.sqrt(self._norms_sq.get(offre_id, 0.0))
+            voisins = {
+                autre: produit / (norm_i * math.sqrt(self._norms_sq[autre]))
+                for autre, produit in produits.items()
+                if norm_i and self._norms_sq.get(autre)
+            }
+            self._voisins[offre_id] = voisins
+        return voisins
+
+    def offres_of(self, stagiaire_id: int) -> Dict[int, float]:
+        with self._lock:
+            return dict(self._offres_par_stagiaire.get(stagiaire_id, {}))
+
+    def recommend_for_stagiaire(self, stagiaire_id: int, exclude: Set[int], limit: int) -> List[Tuple[int, float]]:
+        """Offres les plus similaires à celles auxquelles le stagiaire a candidaté."""
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for offre_id, poids in self.offres_of(stagiaire_id).items():
+                for autre, similarite in self.similar_offres(offre_id).items():
+                    if autre not in exclude:
+                        scores[autre] = scores.get(autre, 0.0) + poids * similarite
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def recommend_from_peers(self, peer_ids: Iterable[int], exclude: Set[int], limit: int) -> List[Tuple[int, float]]:
+        """Offres les plus plébiscitées par un groupe de profils (démarrage à froid)."""
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for peer_id in peer_ids:
+                for offre_id, poids in self._offres_par_stagiaire.get(peer_id, {}).items():
+                    if offre_id not in exclude:
+                        scores[offre_id] = scores.get(offre_id, 0.0) + poids
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+# Instance globale partagée par les requêtes du processus
+co_application_matrix = CoApplicationMatrix(
+    snapshot_path=settings.CO_APPLICATION_SNAPSHOT_PATH,
+    snapshot_interval=settings.CO_APPLICATION_SNAPSHOT_INTERVAL_SECONDS
+)
@@ -0,0 +1,202 @@
+# app/services/competence_catalogue_service.py
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import distinct, func, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.competence import Competence, CompetenceAlias, offre_competence, stagiaire_competence
+from app.models.offre import Offre
+from app.services.offre_features import MOTS_VIDES, KeywordScanner, parse_offre_competences
+
+# Séparateurs ignorés pour rapprocher les variantes d'écriture ("node.js" / "nodejs" / "node js")
+SEPARATEURS_PATTERN = re.compile(r"[\s.\-_/]+")
+
+# Alias usuels (forme compacte -> libellé canonique)
+DEFAULT_ALIASES = {
+    "node": "node.js",
+    "nodejs": "node.js",
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "reactjs": "react",
+    "vue": "vue.js",
+    "vuejs": "vue.js",
+    "angularjs": "angular",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "golang": "go",
+    "k8s": "kubernetes",
+    "csharp": "c#",
+    "cplusplus": "c++",
+    "ml": "machine learning",
+    "ia": "artificial intelligence",
+    "ai": "artificial intelligence",
+    "html5": "html",
+    "css3": "css",
+}
+
+MAX_LIBELLE = 100
+
+
+class CompetenceCatalogueService:
+    """Catalogue normalisé des compétences et tables d'association offre/stagiaire.
+
+    Les colonnes texte restent la source de vérité du scoring. Les tables
+    d'association sont tenues à jour dans la transaction des écritures
+    (offres, profil, analyse de CV) et lues par l'analyse de la demande en
+    compétences ;
+    migrate_competence_catalogue.py remplit l'historique.
+    """
+
+    @staticmethod
+    def normalize_label(libelle: Optional[str]) -> str:
+        """Libellé en minuscules, espaces réduits, ou "" s'il n'est pas exploitable."""
+        libelle = " ".join((libelle or "").lower().split()).strip(" .,;:-")
+        if len(libelle) <= 1 or len(libelle) > MAX_LIBELLE or libelle in MOTS_VIDES:
+            return ""
+        return libelle
+
+    @staticmethod
+    def compact_key(libelle: str) -> str:
+        return SEPARATEURS_PATTERN.sub("", libelle)
+
+    @classmethod
+    def canonical_label(cls, libelle: str) -> str:
+        return DEFAULT_ALIASES.get(cls.compact_key(libelle), libelle)
+
+    # ------------------------------------------------------------------
+    # Résolution des libellés
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _lookup(db: Session, cles: Set[str]) -> Dict[str, int]:
+        if not cles:
+            return {}
+        return dict(db.query(CompetenceAlias.alias, CompetenceAlias.competence_id).filter(
+            CompetenceAlias.alias.in_(cles)
+        ).all())
+
+    @classmethod
+    def _create(cls, db: Session, libelle: str, cles: Iterable[str], competence_id: Optional[int]) -> Optional[int]:
+        """Créer la compétence (si besoin) et ses alias dans un savepoint, tolérant aux insertions concurrentes."""
+        try:
+            with db.begin_nested():
+                if competence_id is None:
+                    competence = Competence(nom=libelle)
+                    db.add(competence)
+                    db.flush()
+                    competence_id = competence.id
+                for cle in cles:
+                    db.add(CompetenceAlias(alias=cle, competence_id=competence_id))
+                db.flush()
+        except IntegrityError:
+            # Créée entre-temps par une autre requête : relire le catalogue
+            existant = db.query(Competence.id).filter(Competence.nom == libelle).scalar()
+            trouves = cls._lookup(db, set(cles))
+            return next(iter(trouves.values()), existant)
+        return competence_id
+
+    @classmethod
+    def resolve_ids(cls, db: Session, libelles: Iterable[str], create: bool = True) -> List[int]:
+        """Ids des compétences correspondant aux libellés (alias compris), sans doublons."""
+        demandes: List[Tuple[str, str, str]] = []
+        for libelle in libelles:
+            libelle = cls.normalize_label(libelle)
+            if not libelle:
+                continue
+            canonique = cls.canonical_label(libelle)
+            cle, cle_canonique = cls.compact_key(libelle), cls.compact_key(canonique)
+            if cle and cle_canonique:
+                demandes.append((canonique, cle, cle_canonique))
+
+        connus = cls._lookup(db, {cle for _, cle, _ in demandes} | {cle for _, _, cle in demandes})
+
+        ids: List[int] = []
+        for canonique, cle, cle_canonique in demandes:
+            competence_id = connus.get(cle) or connus.get(cle_canonique)
+            nouvelles = {c for c in (cle, cle_canonique) if c not in connus}
+            if nouvelles and create:
+                if competence_id is None:
+                    competence_id = db.query(Competence.id).filter(Competence.nom == canonique).scalar()
+                competence_id = cls._create(db, canonique, nouvelles, competence_id)
+                if competence_id is not None:
+                    connus.update(dict.fromkeys(nouvelles, competence_id))
+            if competence_id is not None and competence_id not in ids:
+                ids.append(competence_id)
+        return ids
+
+    # ------------------------------------------------------------------
+    # Synchronisation des tables d'association
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def split_stagiaire_competences(texte: Optional[str]) -> List[str]:
+        """Même découpage que Stagiaire.get_all_competences (virgules)."""
+        return [c.strip() for c in (texte or "").split(',') if c.strip()]
+
+    @classmethod
+    def sync_offre(cls, db: Session, offre: Offre) -> int:
+        """Remplacer les compétences associées à l'offre (sans commit)."""
+        if offre.id is None:
+            db.flush()
+
+        competence_ids = cls.resolve_ids(db, parse_offre_competences(offre.competences_requises))
+        db.execute(offre_competence.delete().where(offre_competence.c.offre_id == offre.id))
+        if competence_ids:
+            db.execute(offre_competence.insert(), [
+                {"offre_id": offre.id, "competence_id": competence_id} for competence_id in competence_ids
+            ])
+        return len(competence_ids)
+
+    @classmethod
+    def sync_stagiaire(cls, db: Session, stagiaire) -> int:
+        """Remplacer les compétences manuelles et extraites associées au stagiaire (sans commit)."""
+        lignes = []
+        for source, texte in (("manuelle", stagiaire.competences_manuelles),
+                              ("extraite", stagiaire.competences_extraites)):
+            for competence_id in cls.resolve_ids(db, cls.split_stagiaire_competences(texte)):
+                lignes.append({"stagiaire_id": stagiaire.id, "competence_id": competence_id, "source": source})
+
+        db.execute(stagiaire_competence.delete().where(stagiaire_competence.c.stagiaire_id == stagiaire.id))
+        if lignes:
+            db.execute(stagiaire_competence.insert(), lignes)
+        return len(lignes)
+
+    # ------------------------------------------------------------------
+    # Requêtes par jointures entières
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def keyword_demand_counts(db: Session, scanner: KeywordScanner, limit: int = 15) -> List[Tuple[str, int]]:
+        """Offres actives par mot-clé (mot, nombre d'offres), par jointure entière sur le catalogue.
+
+        Les mots-clés sont cherchés une fois par libellé du catalogue (alias
+        regroupés) au lieu d'une fois par offre ; une offre compte une fois par
+        mot-clé même si plusieurs de ses compétences le contiennent.
+        """
+        correspondances = [
+            (competence_id, mot)
+            for competence_id, nom in db.query(Competence.id, Competence.nom)
+            for mot in scanner.scan(nom)
+        ]
+        if not correspondances:
+            return []
+
+        mots = union_all(*[
+            select(literal(competence_id).label("competence_id"), literal(mot).label("mot"))
+            for competence_id, mot in correspondances
+        ]).subquery("mots")
+        nombre = func.count(distinct(offre_competence.c.offre_id))
+        return [
+            (row.mot, row.nombre) for row in db.query(mots.c.mot, nombre.label("nombre"))
+            .join(offre_competence, offre_competence.c.competence_id == mots.c.competence_id)
+            .join(Offre, Offre.id == offre_competence.c.offre_id)
+            .filter(Offre.est_active == True, Offre.date_fin >= datetime.now().date())
+            .group_by(mots.c.mot)
+            .order_by(nombre.desc(), mots.c.mot)
+            .limit(limit)
+        ]
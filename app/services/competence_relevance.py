@@ -0,0 +1,243 @@
+# app/services/competence_relevance.py
+import hashlib
+import math
+import threading
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.offre import Offre
+from app.services.offre_features import offre_feature_cache, tokenize_competences
+
+
+class CompetenceRelevanceModel:
+    """Modèle TF-IDF de pertinence des compétences sur le corpus des offres actives.
+
+    Chaque offre est un document dont les termes sont ses jetons de compétences
+    (présence binaire). La table des IDF est maintenue de façon incrémentale :
+    seules les offres ajoutées, modifiées ou retirées depuis la dernière
+    synchronisation mettent à jour les fréquences documentaires.
+
+    Le score d'une offre pour un profil est le produit creux requête x offre
+    (somme des IDF des compétences couvertes), rapporté au poids IDF total de
+    l'offre : couvrir une compétence rare compte plus que couvrir "git" (0-100).
+
+    Les lectures prennent le même verrou que la synchronisation : une requête
+    ne voit jamais une table à moitié mise à jour par une autre.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+
+        self._doc_tokens: Dict[int, FrozenSet[str]] = {}
+        self._doc_versions: Dict[int, object] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+        self._idf: Dict[str, float] = {}
+        self._idf_dirty: Set[str] = set()
+        self._idf_corpus_size = 0
+        self._norms: Dict[int, float] = {}
+
+    # ------------------------------------------------------------------
+    # Synchronisation avec la base
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _active_filter():
+        return (Offre.est_active == True, Offre.date_fin >= datetime.now().date())
+
+    def ensure_fresh(self, db: Optional[Session] = None) -> None:
+        """Synchroniser le corpus si le catalogue des offres actives a changé."""
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            signature = tuple(db.query(
+                func.count(Offre.id), func.max(Offre.id), func.max(Offre.updated_at)
+            ).filter(*self._active_filter()).one())
+            if signature == self._signature:
+                return
+
+            with self._lock:
+                if signature != self._signature:
+                    self._sync(db)
+                    self._signature = signature
+        finally:
+            if own_session:
+                db.close()
+
+    def corpus_signature(self) -> Optional[str]:
+        """Empreinte du corpus synchronisé (donc des IDF), ou None avant la première synchronisation."""
+        signature = self._signature
+        if signature is None:
+            return None
+        return hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()
+
+    def invalidate(self) -> None:
+        """Forcer une synchronisation au prochain appel."""
+        with self._lock:
+            self._signature = None
+
+    def _sync(self, db: Session) -> None:
+        offres = db.query(
+            Offre.id, Offre.updated_at, Offre.competences_requises,
+            Offre.secteur, Offre.description, Offre.localisation, Offre.ville_id
+        ).filter(*self._active_filter()).all()
+
+        vues = set()
+        modifiees = 0
+        for offre in offres:
+            vues.add(offre.id)
+            if offre.id not in self._doc_tokens or self._doc_versions[offre.id] != offre.updated_at:
+                features = offre_feature_cache.get(offre)
+                self._upsert(offre.id, features.version, features.tokens)
+                modifiees += 1
+
+        retirees = [offre_id for offre_id in self._doc_tokens if offre_id not in vues]
+        for offre_id in retirees:
+            self._remove(offre_id)
+
+        if modifiees or retirees:
+            self._refresh_idf()
+            print(f"📚 Table IDF mise à jour: {modifiees} offres (ré)indexées, {len(retirees)} retirées, "
+                  f"{len(self._idf)} termes")
+
+    def _upsert(self, offre_id: int, version, tokens: FrozenSet[str]) -> None:
+        if offre_id in self._doc_tokens:
+            self._remove(offre_id)
+
+        self._doc_tokens[offre_id] = tokens
+        self._doc_versions[offre_id] = version
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(offre_id)
+        self._idf_dirty |= tokens
+
+    def _remove(self, offre_id: int) -> None:
+        tokens = self._doc_tokens.pop(offre_id, frozenset())
+        self._doc_versions.pop(offre_id, None)
+        for token in tokens:
+            offres = self._postings.get(token)
+            if offres is not None:
+                offres.discard(offre_id)
+                if not offres:
+                    del self._postings[token]
+        self._idf_dirty |= tokens
+
+    def _refresh_idf(self) -> None:
+        """Recalculer les IDF : termes modifiés seulement, sauf si la taille du corpus a changé."""
+        corpus_size = len(self._doc_tokens)
+        termes = self._postings.keys() if corpus_size != self._idf_corpus_size else self._idf_dirty
+
+        for token in list(termes):
+            df = len(self._postings.get(token, ()))
+            if df:
+                self._idf[token] = self._smooth_idf(corpus_size, df)
+            else:
+                self._idf.pop(token, None)
+        for token in self._idf_dirty:
+            if token not in self._postings:
+                self._idf.pop(token, None)
+
+        self._idf_dirty = set()
+        self._idf_corpus_size = corpus_size
+        self._norms = {}  # Les normes dépendent des IDF
+
+    @staticmethod
+    def _smooth_idf(corpus_size: int, df: int) -> float:
+        return math.log((corpus_size + 1) / (df + 1)) + 1
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _idf_of(self, token: str) -> float:
+        idf = self._idf.get(token)
+        if idf is None:
+            # Terme absent du corpus : aussi rare que possible
+            idf = self._smooth_idf(self._idf_corpus_size, 0)
+        return idf
+
+    def _norm(self, offre_id: int) -> float:
+        norm = self._norms.get(offre_id)
+        if norm is None:
+            norm = sum(self._idf_of(token) for token in self._doc_tokens.get(offre_id, ()))
+            self._norms[offre_id] = norm
+        return norm
+
+    @staticmethod
+    def query_tokens(stagiaire_competences: Iterable[str]) -> Set[str]:
+        tokens: Set[str] = set()
+        for competence in stagiaire_competences:
+            tokens |= tokenize_competences(competence)
+        return tokens
+
+    def _score_tokens(self, query: Set[str], tokens: FrozenSet[str]) -> Tuple[float, float]:
+        """(poids couvert, poids total) d'un ensemble de jetons, avec les IDF du corpus (sous verrou)."""
+        return (
+            sum(self._idf_of(token) for token in tokens & query),
+            sum(self._idf_of(token) for token in tokens)
+        )
+
+    def score_offres(self, stagiaire_competences: List[str], offre_ids: np.ndarray,
+                     offre_tokens: Optional[Sequence[FrozenSet[str]]] = None) -> np.ndarray:
+        """Scores (0-100) des offres, dans l'ordre de offre_ids.
+
+        Les offres hors corpus (inactives, expirées) ou pas encore synchronisées
+        sont scorées sur leurs propres jetons (offre_tokens) avec les IDF du corpus.
+        """
+        scores = np.zeros(len(offre_ids))
+        query = self.query_tokens(stagiaire_competences)
+        if not query or not len(offre_ids):
+            return scores
+
+        positions = {int(offre_id): i for i, offre_id in enumerate(offre_ids.tolist())}
+        brut = np.zeros(len(offre_ids))
+
+        with self._lock:
+            # Produit creux : on ne parcourt que les listes de postings des termes de la requête
+            for token in query:
+                offres = self._postings.get(token)
+                if not offres:
+                    continue
+                idf = self._idf_of(token)
+                for offre_id in offres:
+                    i = positions.get(offre_id)
+                    if i is not None:
+                        brut[i] += idf
+
+            norms = np.array([self._norm(int(offre_id)) for offre_id in offre_ids.tolist()])
+
+            if offre_tokens is not None:
+                for i, (offre_id, tokens) in enumerate(zip(offre_ids.tolist(), offre_tokens)):
+                    if self._doc_tokens.get(offre_id) != tokens:
+                        brut[i], norms[i] = self._score_tokens(query, tokens)
+        has_norm = norms > 0
+        scores[has_norm] = np.minimum(brut[has_norm] / norms[has_norm] * 100, 100)
+        return np.round(scores, 2)
+
+    def score_text(self, stagiaire_competences: List[str], offre_competences: Optional[str],
+                   db: Optional[Session] = None) -> float:
+        """Score (0-100) d'un texte de compétences quelconque, avec les IDF du corpus.
+
+        L'appelant synchronise la table une fois par lot (ensure_fresh) ; elle
+        n'est synchronisée ici que si elle ne l'a jamais été ou a été invalidée.
+        """
+        query = self.query_tokens(stagiaire_competences)
+        tokens = tokenize_competences(offre_competences)
+        if not query or not tokens:
+            return 0.0
+
+        if self._signature is None:
+            self.ensure_fresh(db)
+        with self._lock:
+            brut, norm = self._score_tokens(query, tokens)
+        return round(min(brut / norm * 100, 100), 2) if norm > 0 else 0.0
+
+
+# Instance globale partagée par les requêtes du processus
+competence_relevance_model = CompetenceRelevanceModel()
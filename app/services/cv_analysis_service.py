@@ -205,6 +205,8 @@ class CVAnalysisService:
     def update_stagiaire_competences(cls, db: Session, stagiaire_id: int, cv_analysis: Dict):
         """Mettre à jour les compétences extraites du stagiaire."""
         from app.models.stagiaire import Stagiaire
+        from app.services.competence_catalogue_service import CompetenceCatalogueService
+        from app.services.cohort_aggregates import cohort_aggregates
         
         if not cv_analysis.get("success"):
             return False
@@ -217,7 +219,9 @@ class CVAnalysisService:
         stagiaire.competences_extraites = cv_analysis.get("competences_text", "")
         
         try:
+            CompetenceCatalogueService.sync_stagiaire(db, stagiaire)
             db.commit()
+            cohort_aggregates.update_stagiaire(stagiaire)
             print(f"📊 Compétences mises à jour pour stagiaire {stagiaire_id}")
             return True
         except Exception as e:
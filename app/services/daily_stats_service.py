@@ -0,0 +1,231 @@
+# app/services/daily_stats_service.py
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, func, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.candidature import Candidature, StatusCandidature
+from app.models.daily_platform_stats import DailyPlatformStats
+from app.models.evaluation import Certificat, Evaluation
+from app.models.offre import Offre
+from app.models.stage import Stage
+from app.models.utilisateur import Utilisateur
+from app.services.admin_stats_service import AdminStatsService
+
+# Colonne du rollup par statut de candidature
+COLONNES_STATUT = {
+    StatusCandidature.EN_ATTENTE: "candidatures_en_attente",
+    StatusCandidature.EN_COURS: "candidatures_en_cours",
+    StatusCandidature.ACCEPTEE: "candidatures_acceptees",
+    StatusCandidature.REFUSEE: "candidatures_refusees",
+    StatusCandidature.RETIREE: "candidatures_retirees",
+}
+
+COLONNES_COMPTEURS = [
+    "nouvelles_inscriptions", "nouvelles_offres", "nouvelles_candidatures", *COLONNES_STATUT.values(),
+    "stages_commences", "stages_termines", "nouvelles_evaluations", "evaluations_notees",
+    "somme_notes_evaluations", "nouveaux_certificats",
+]
+
+# Derniers jours toujours recalculés par le rattrapage (activité en cours)
+JOURS_RECALCULES = 2
+
+# Taille des tranches du backfill
+JOURS_PAR_TRANCHE = 92
+
+# Colonne du rollup -> colonne datée des lignes qu'elle compte (contrôle des suppressions)
+SOURCES_COMPTEURS = {
+    "nouvelles_inscriptions": Utilisateur.created_at,
+    "nouvelles_offres": Offre.created_at,
+    "nouvelles_candidatures": Candidature.created_at,
+    "stages_commences": Stage.date_debut_reel,
+    "stages_termines": Stage.date_fin_reel,
+    "nouvelles_evaluations": Evaluation.created_at,
+    "nouveaux_certificats": Certificat.created_at,
+}
+
+
+def _jour(colonne):
+    return func.date_trunc(literal_column("'day'"), colonne, type_=DateTime)
+
+
+def _as_date(valeur) -> date:
+    return valeur.date() if isinstance(valeur, datetime) else valeur
+
+
+def _plages(jours: Iterable[date]) -> List[Tuple[date, date]]:
+    """Regrouper des jours en plages contiguës [debut, fin]."""
+    plages: List[List[date]] = []
+    for jour in sorted(set(jours)):
+        if plages and jour - plages[-1][1] == timedelta(days=1):
+            plages[-1][1] = jour
+        else:
+            plages.append([jour, jour])
+    return [(debut, fin) for debut, fin in plages]
+
+
+class DailyStatsService:
+    """Rollup journalier daily_platform_stats, lu par les séries temporelles admin.
+
+    Un jour est toujours recalculé entièrement depuis les tables brutes (une
+    requête groupée par jour et par table), ce qui rend le recalcul idempotent.
+    Le rattrapage reprend les jours depuis le dernier calcul, plus les jours de
+    création des candidatures et évaluations modifiées depuis (changement de
+    statut, note) : les candidatures sont comptées selon leur statut actuel.
+    Les suppressions ne laissent pas de trace datée : si les totaux des jours
+    passés divergent des tables, tout l'historique est recalculé.
+
+    Le rattrapage s'exécute hors des requêtes de lecture (refresh_daily_stats.py
+    en cron, ou POST /admin/stats/daily/refresh) ; les lectures ne font que lire.
+    """
+
+    @classmethod
+    def recalculer(cls, db: Session, debut: date, fin: date) -> int:
+        """Recalculer les jours [debut, fin] (sans commit)."""
+        fin_exclue = fin + timedelta(days=1)
+        lignes: Dict[date, Dict] = {
+            debut + timedelta(days=i): dict.fromkeys(COLONNES_COMPTEURS, 0)
+            for i in range((fin - debut).days + 1)
+        }
+
+        for nom in ("nouvelles_inscriptions", "nouvelles_offres", "stages_commences",
+                    "stages_termines", "nouveaux_certificats"):
+            colonne = SOURCES_COMPTEURS[nom]
+            for jour, count in AdminStatsService.compter_par_periode(db, colonne, "day", debut, fin_exclue).items():
+                if jour in lignes:
+                    lignes[jour][nom] = count
+
+        bucket = _jour(Candidature.created_at)
+        for row in db.query(bucket.label("jour"), Candidature.status, func.count(Candidature.id).label("count")).filter(
+            Candidature.created_at >= debut,
+            Candidature.created_at < fin_exclue
+        ).group_by(bucket, Candidature.status):
+            ligne = lignes.get(_as_date(row.jour))
+            if ligne is None:
+                continue
+            ligne["nouvelles_candidatures"] += row.count
+            colonne_statut = COLONNES_STATUT.get(row.status)
+            if colonne_statut:
+                ligne[colonne_statut] += row.count
+
+        bucket = _jour(Evaluation.created_at)
+        for row in db.query(
+            bucket.label("jour"),
+            func.count(Evaluation.id).label("total"),
+            func.count(Evaluation.note_globale).label("notees"),
+            func.coalesce(func.sum(Evaluation.note_globale), 0).label("somme")
+        ).filter(
+            Evaluation.created_at >= debut,
+            Evaluation.created_at < fin_exclue
+        ).group_by(bucket):
+            ligne = lignes.get(_as_date(row.jour))
+            if ligne is None:
+                continue
+            ligne["nouvelles_evaluations"] = row.total
+            ligne["evaluations_notees"] = row.notees
+            ligne["somme_notes_evaluations"] = float(row.somme)
+
+        calcule_le = datetime.now(timezone.utc)
+        db.query(DailyPlatformStats).filter(
+            DailyPlatformStats.jour >= debut,
+            DailyPlatformStats.jour <= fin
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(DailyPlatformStats, [
+            {"jour": jour, "calcule_le": calcule_le, **compteurs} for jour, compteurs in lignes.items()
+        ])
+        return len(lignes)
+
+    @staticmethod
+    def dernier_calcul(db: Session) -> Optional[datetime]:
+        calcule_le = db.query(func.max(DailyPlatformStats.calcule_le)).scalar()
+        if calcule_le is not None and calcule_le.tzinfo is None:
+            calcule_le = calcule_le.replace(tzinfo=timezone.utc)
+        return calcule_le
+
+    @classmethod
+    def backfill(cls, db: Session, debut: Optional[date] = None) -> int:
+        """Recalculer tout l'historique (ou depuis `debut`) par tranches, avec un commit par tranche."""
+        if debut is None:
+            premiers = db.query(*[
+                select(func.min(colonne)).scalar_subquery() for colonne in SOURCES_COMPTEURS.values()
+            ]).one()
+            premiers = [_as_date(premier) for premier in premiers if premier is not None]
+            debut = min(premiers) if premiers else date.today()
+            # Jours antérieurs aux plus anciennes lignes restantes (lignes supprimées)
+            db.query(DailyPlatformStats).filter(DailyPlatformStats.jour < debut).delete(synchronize_session=False)
+
+        aujourd_hui = date.today()
+        total = 0
+        while debut <= aujourd_hui:
+            fin = min(debut + timedelta(days=JOURS_PAR_TRANCHE - 1), aujourd_hui)
+            total += cls.recalculer(db, debut, fin)
+            db.commit()
+            debut = fin + timedelta(days=1)
+        print(f"📅 Rollup journalier: {total} jours recalculés (backfill)")
+        return total
+
+    @classmethod
+    def rattraper(cls, db: Session) -> int:
+        """Recalculer les jours récents et ceux touchés depuis le dernier calcul, puis commit."""
+        dernier_calcul = cls.dernier_calcul(db)
+        if dernier_calcul is None:
+            return cls.backfill(db)
+
+        aujourd_hui = date.today()
+        depuis = min(dernier_calcul.astimezone().date(), aujourd_hui - timedelta(days=JOURS_RECALCULES))
+        jours = {depuis + timedelta(days=i) for i in range((aujourd_hui - depuis).days + 1)}
+
+        for modele in (Candidature, Evaluation):
+            bucket = _jour(modele.created_at)
+            jours |= {
+                _as_date(jour) for jour, in db.query(bucket).filter(
+                    modele.updated_at >= dernier_calcul
+                ).distinct()
+                if jour is not None
+            }
+
+        total = 0
+        for debut, fin in _plages(jours):
+            total += cls.recalculer(db, debut, fin)
+        db.commit()
+        print(f"📅 Rollup journalier: {total} jours recalculés")
+
+        divergentes = cls.colonnes_divergentes(db)
+        if divergentes:
+            print(f"🧹 Totaux divergents ({', '.join(divergentes)}) : suppressions probables, recalcul complet")
+            return cls.backfill(db)
+        return total
+
+    @staticmethod
+    def colonnes_divergentes(db: Session) -> List[str]:
+        """Colonnes dont la somme sur les jours passés diffère du nombre de lignes datées d'avant aujourd'hui.
+
+        Les jours passés sont à jour après le rattrapage : un écart vient d'une
+        ligne supprimée (ou antidatée). La journée en cours est exclue pour ne
+        pas confondre un écart avec une insertion concurrente.
+        """
+        aujourd_hui = date.today()
+        rollup = select(*[
+            func.coalesce(func.sum(getattr(DailyPlatformStats, nom)), 0).label(nom) for nom in SOURCES_COMPTEURS
+        ]).where(DailyPlatformStats.jour < aujourd_hui).subquery()
+        ligne = db.execute(select(
+            *[rollup.c[nom] for nom in SOURCES_COMPTEURS],
+            *[
+                select(func.count()).where(colonne < aujourd_hui).scalar_subquery().label(f"{nom}_reel")
+                for nom, colonne in SOURCES_COMPTEURS.items()
+            ]
+        )).one()._mapping
+        return [nom for nom in SOURCES_COMPTEURS if ligne[nom] != ligne[f"{nom}_reel"]]
+
+    @classmethod
+    def etat(cls, db: Session) -> Dict:
+        """Dernier calcul du rollup et son âge, pour signaler un rollup périmé aux lecteurs."""
+        calcule_le = cls.dernier_calcul(db)
+        age = (datetime.now(timezone.utc) - calcule_le).total_seconds() if calcule_le else None
+        return {
+            "calcule_le": calcule_le.isoformat() if calcule_le else None,
+            "age_secondes": round(age, 1) if age is not None else None,
+            "perime": age is None or age > settings.DAILY_STATS_MAX_AGE_SECONDS
+        }
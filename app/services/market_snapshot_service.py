@@ -0,0 +1,96 @@
+# app/services/market_snapshot_service.py
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.recommendation_stats import RecommendationStatsService
+
+
+class MarketSnapshot:
+    """Parties globales de /stagiaires/market-insights, servies depuis la mémoire.
+
+    Le premier appel calcule l'instantané ; ensuite il est recalculé dans un
+    thread quand il dépasse `max_age` secondes ou qu'un changement (offre ou
+    candidature) l'a marqué périmé. Pendant le recalcul, l'instantané précédent
+    reste servi.
+    """
+
+    def __init__(self, max_age: float = 600):
+        self.max_age = max_age
+
+        self._lock = threading.Lock()  # Un seul calcul à la fois
+        self._state_lock = threading.Lock()
+        self._data: Optional[Dict] = None
+        self._computed_at: Optional[float] = None
+        self._stale = False
+        self._refreshing = False
+
+    @staticmethod
+    def compute(db: Session) -> Dict:
+        return {
+            "market_overview": RecommendationStatsService.get_market_insights(db),
+            "competences_demand": RecommendationStatsService.compute_competences_demand_analysis(db),
+            "success_insights": RecommendationStatsService.get_success_patterns(db),
+            "generated_at": datetime.now().isoformat()
+        }
+
+    def refresh(self, db: Optional[Session] = None) -> Dict:
+        """Recalculer l'instantané (avec sa propre session si aucune n'est fournie)."""
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            with self._lock:
+                debut = time.monotonic()
+                data = self.compute(db)
+                self._data, self._computed_at = data, time.monotonic()
+            print(f"📸 Instantané marché recalculé en {time.monotonic() - debut:.2f}s")
+            return data
+        finally:
+            if own_session:
+                db.close()
+
+    def mark_stale(self) -> None:
+        """Signaler un changement : le prochain appel déclenche un recalcul."""
+        self._stale = True
+
+    def get(self, db: Session) -> Dict:
+        if self._data is None:
+            return self._get_or_compute(db)
+
+        if self._stale or time.monotonic() - self._computed_at > self.max_age:
+            self.refresh_in_background()
+        return self._data
+
+    def _get_or_compute(self, db: Session) -> Dict:
+        # Premier appel : les requêtes concurrentes attendent le même calcul
+        with self._lock:
+            if self._data is None:
+                self._data, self._computed_at = self.compute(db), time.monotonic()
+            return self._data
+
+    def refresh_in_background(self) -> None:
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._stale = False
+        threading.Thread(target=self._run_refresh, name="market-snapshot", daemon=True).start()
+
+    def _run_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"❌ Erreur recalcul instantané marché: {e}")
+        finally:
+            with self._state_lock:
+                self._refreshing = False
+
+
+# Instance globale partagée par les requêtes du processus
+market_snapshot = MarketSnapshot(max_age=settings.MARKET_SNAPSHOT_MAX_AGE_SECONDS)
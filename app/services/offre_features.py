@@ -0,0 +1,210 @@
+# app/services/offre_features.py
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+
+# Jetons de compétences : garde "c++", "c#", "node.js", "asp.net"...
+TOKEN_PATTERN = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+
+# Mots trop fréquents pour être discriminants
+MOTS_VIDES = {
+    "et", "ou", "de", "des", "du", "la", "le", "les", "en", "un", "une",
+    "avec", "pour", "sur", "au", "aux", "dans", "par",
+    "and", "or", "of", "the", "to", "in", "with",
+}
+
+# Indicateurs de niveau dans la description d'une offre
+JUNIOR_INDICATORS = ["junior", "débutant", "stage", "étudiant", "apprenti", "première expérience"]
+SENIOR_INDICATORS = ["senior", "expérimenté", "confirmé", "expert", "lead", "chef"]
+
+# Grands domaines utilisés pour rapprocher spécialité et secteur
+SECTEUR_DOMAINS = {
+    "tech": ["informatique", "développement", "programmation", "logiciel", "numérique", "digital"],
+    "business": ["commerce", "marketing", "vente", "business", "gestion", "management"],
+    "design": ["design", "graphisme", "créatif", "ux", "ui", "web design"],
+}
+
+# Mots-clés de localisation signalant une offre à distance
+REMOTE_KEYWORDS = ("remote", "télétravail", "distance")
+
+# Grandes villes et villes proches (logique simplifiée, relation lue dans les deux sens)
+VILLES_PROCHES = {
+    "casablanca": ["rabat", "mohammedia"],
+    "rabat": ["casablanca", "salé"],
+    "marrakech": ["casablanca"],
+    "fès": ["meknes"],
+    "tanger": ["tétouan"],
+}
+
+
+def compile_keywords(mots: Iterable[str]) -> Pattern:
+    """Une seule alternance regex : `pattern.search(texte)` équivaut à `any(mot in texte ...)`."""
+    return re.compile("|".join(re.escape(mot) for mot in sorted(set(mots), key=len, reverse=True)))
+
+
+class KeywordScanner:
+    """Tous les mots-clés présents (sous-chaînes, chevauchements compris) d'un texte, en une passe.
+
+    Une anticipation `(?=(...))` essaie l'alternance (la plus longue d'abord) à
+    chaque position : un mot-clé plus court trouvé à la même position est
+    forcément préfixe du plus long, et il est rajouté via la table des préfixes.
+    """
+
+    def __init__(self, mots: Iterable[str]):
+        self.mots = list(dict.fromkeys(mots))
+        self._rangs = {mot: rang for rang, mot in enumerate(self.mots)}
+        self._pattern = re.compile(f"(?=({compile_keywords(self.mots).pattern}))")
+        self._prefixes = {
+            mot: frozenset(autre for autre in self.mots if mot.startswith(autre))
+            for mot in self.mots
+        }
+
+    def scan(self, texte: Optional[str]) -> List[str]:
+        """Mots-clés trouvés, dans l'ordre de la liste d'origine."""
+        trouves: Set[str] = set()
+        for match in self._pattern.finditer(texte or ""):
+            trouves |= self._prefixes[match.group(1)]
+        return sorted(trouves, key=self._rangs.__getitem__)
+
+
+# Automates compilés une fois au chargement du module
+JUNIOR_PATTERN = compile_keywords(JUNIOR_INDICATORS)
+SENIOR_PATTERN = compile_keywords(SENIOR_INDICATORS)
+SECTEUR_DOMAIN_PATTERNS = {groupe: compile_keywords(domaines) for groupe, domaines in SECTEUR_DOMAINS.items()}
+REMOTE_PATTERN = compile_keywords(REMOTE_KEYWORDS)
+
+
+def _build_villes_proches_index() -> Dict[str, Pattern]:
+    """Ville -> motif des villes considérées proches (voisins déclarés et villes qui la déclarent)."""
+    voisins: Dict[str, Set[str]] = {}
+    for ville, villes_proches in VILLES_PROCHES.items():
+        voisins.setdefault(ville, set()).update(villes_proches)
+        for proche in villes_proches:
+            voisins.setdefault(proche, set()).add(ville)
+    return {ville: compile_keywords(proches) for ville, proches in voisins.items()}
+
+
+VILLES_PROCHES_INDEX = _build_villes_proches_index()
+
+
+def tokenize_competences(texte: Optional[str]) -> Set[str]:
+    """Découper un texte de compétences en jetons normalisés (minuscules, sans mots vides)."""
+    if not texte:
+        return set()
+
+    return {
+        token for token in TOKEN_PATTERN.findall(texte.lower())
+        if len(token) > 1 and token not in MOTS_VIDES
+    }
+
+
+def parse_offre_competences(offre_competences: Optional[str]) -> List[str]:
+    """Découper les compétences requises d'une offre (virgules/points-virgules, sinon espaces)."""
+    offre_comp_text = (offre_competences or "").lower()
+
+    # Séparer par virgules, puis nettoyer
+    offre_comp_list = [comp.strip() for comp in re.split(r'[,;]', offre_comp_text) if comp.strip()]
+
+    # Si pas de virgules, séparer par espaces pour les mots individuels
+    if len(offre_comp_list) <= 1:
+        offre_comp_list = [comp.strip() for comp in offre_comp_text.split() if comp.strip()]
+
+    return offre_comp_list
+
+
+def detect_offre_level(offre_description: Optional[str]) -> Tuple[bool, bool]:
+    """Détecter si la description vise un profil junior et/ou senior."""
+    description_clean = (offre_description or "").lower()
+
+    is_junior_offre = JUNIOR_PATTERN.search(description_clean) is not None
+    is_senior_offre = SENIOR_PATTERN.search(description_clean) is not None
+    return is_junior_offre, is_senior_offre
+
+
+@lru_cache(maxsize=4096)
+def secteur_domain_groups(texte: Optional[str]) -> FrozenSet[str]:
+    """Grands domaines (tech, business, design) évoqués par un secteur ou une spécialité."""
+    texte_clean = (texte or "").lower()
+    return frozenset(
+        groupe for groupe, pattern in SECTEUR_DOMAIN_PATTERNS.items()
+        if pattern.search(texte_clean)
+    )
+
+
+def is_remote_localisation(localisation_clean: str) -> bool:
+    return REMOTE_PATTERN.search(localisation_clean) is not None
+
+
+def are_villes_proches(ville_clean: str, localisation_clean: str) -> bool:
+    """La localisation mentionne-t-elle une ville proche de `ville_clean` ?"""
+    pattern = VILLES_PROCHES_INDEX.get(ville_clean)
+    return pattern is not None and pattern.search(localisation_clean) is not None
+
+
+class OffreFeatures:
+    """Caractéristiques pré-calculées d'une version d'offre."""
+
+    __slots__ = (
+        "offre_id", "version", "competences", "tokens", "secteur", "secteur_groups",
+        "localisation", "ville", "ville_id", "has_description", "is_junior", "is_senior",
+    )
+
+    def __init__(self, offre):
+        self.offre_id = offre.id
+        self.version = offre.updated_at
+
+        self.competences = parse_offre_competences(offre.competences_requises)
+        self.tokens = frozenset(tokenize_competences(offre.competences_requises))
+
+        self.secteur = (offre.secteur or "").lower()
+        self.secteur_groups = secteur_domain_groups(offre.secteur)
+
+        self.localisation = (offre.localisation or "").lower()
+        self.ville = self.localisation.strip()
+        self.ville_id = offre.ville_id  # Résolue à l'écriture de l'offre
+
+        self.has_description = bool(offre.description)
+        self.is_junior, self.is_senior = detect_offre_level(offre.description)
+
+
+class OffreFeatureCache:
+    """Cache des caractéristiques d'offres, indexé par id et validé par updated_at.
+
+    Une offre n'est analysée qu'une fois par version ; les handlers d'écriture
+    des offres appellent invalidate() pour libérer l'entrée immédiatement.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, OffreFeatures] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, offre) -> OffreFeatures:
+        """Caractéristiques de l'offre (objet ORM ou ligne avec les mêmes colonnes)."""
+        features = self._entries.get(offre.id)
+        if features is not None and features.version == offre.updated_at:
+            self.hits += 1
+            return features
+
+        self.misses += 1
+        features = OffreFeatures(offre)
+        with self._lock:
+            self._entries[offre.id] = features
+        return features
+
+    def invalidate(self, offre_id: int) -> None:
+        with self._lock:
+            self._entries.pop(offre_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Instance globale partagée par les requêtes du processus
+offre_feature_cache = OffreFeatureCache()
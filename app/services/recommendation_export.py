@@ -0,0 +1,170 @@
+# app/services/recommendation_export.py
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.entreprise import Entreprise
+from app.models.offre import Offre
+from app.services.competence_relevance import competence_relevance_model
+from app.services.scoring_engine import OFFRE_SCORING_COLUMNS, OffreScoringMatrix, SCORE_COLUMNS
+
+# Lignes lues par aller-retour du curseur serveur (et scorées par lot)
+EXPORT_BATCH_SIZE = 500
+
+CSV_COLUMNS = [
+    "type", "offre_id", "titre", "entreprise", "secteur", "localisation",
+    "score_global", "score_competences", "score_secteur", "score_experience", "score_localisation",
+    "ranking", "urgency", "competition_level", "details",
+]
+
+
+def analysis_item(offre_id: int, titre: str, entreprise: Optional[str], secteur: str,
+                  localisation: Optional[str], date_fin: date, scores: Dict[str, float]) -> Dict:
+    """Ligne d'analyse détaillée d'une offre (format de /recommendations/bulk-analyze)."""
+    overall_score = scores["overall"]
+    return {
+        "offre_id": offre_id,
+        "titre": titre,
+        "entreprise": entreprise or "N/A",
+        "secteur": secteur,
+        "localisation": localisation,
+        "scores": {
+            "global": overall_score,
+            "competences": scores["competence"],
+            "secteur": scores["secteur"],
+            "experience": scores["experience"],
+            "localisation": scores["location"]
+        },
+        "ranking": "A" if overall_score >= 80 else "B" if overall_score >= 60 else "C",
+        "urgency": "High" if date_fin <= (datetime.now().date() + timedelta(days=7)) else "Medium",
+        "competition_level": "High" if overall_score >= 70 else "Medium"  # Estimation simple
+    }
+
+
+class AnalysisStats:
+    """Statistiques de l'analyse cumulées au fil du flux (sans garder les lignes)."""
+
+    def __init__(self):
+        self.total_analyzed = 0
+        self.matching = 0
+        self.score_sum = 0.0
+        self.tiers = {"A": 0, "B": 0, "C": 0}
+
+    def add(self, item: Dict) -> None:
+        self.matching += 1
+        self.score_sum += item["scores"]["global"]
+        self.tiers[item["ranking"]] += 1
+
+    def as_dict(self) -> Dict:
+        return {
+            "total_offers_analyzed": self.total_analyzed,
+            "matching_offers": self.matching,
+            "match_rate": round((self.matching / self.total_analyzed) * 100, 2) if self.total_analyzed > 0 else 0,
+            "average_score": round(self.score_sum / self.matching, 2) if self.matching else 0,
+            "ranking_distribution": {
+                "A_tier": self.tiers["A"],
+                "B_tier": self.tiers["B"],
+                "C_tier": self.tiers["C"]
+            }
+        }
+
+
+def iter_bulk_analysis(profil: Tuple, limit: int, min_score: float,
+                       batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """Scorer les offres actives par lots et produire ("offre", ligne) puis ("summary", stats).
+
+    Les offres sont lues via un curseur côté serveur (yield_per) dans l'ordre des
+    ids, et non par score ; seules celles au-dessus de `min_score` sont émises,
+    au plus `limit` (0 = sans limite). Le curseur est toujours parcouru en
+    entier : la synthèse porte sur tout le catalogue actif et toutes les offres
+    au-dessus de `min_score`, quelle que soit la limite. La session est propre
+    au flux : celle de la requête est fermée avant l'envoi de la réponse.
+    """
+    stats = AnalysisStats()
+    db = SessionLocal()
+    try:
+        # Table des IDF synchronisée une fois pour tout le flux, avant d'ouvrir le curseur
+        if settings.COMPETENCE_SCORER == "tfidf":
+            competence_relevance_model.ensure_fresh(db)
+
+        query = db.query(
+            *OFFRE_SCORING_COLUMNS, Offre.titre, Offre.date_fin, Entreprise.raison_social
+        ).outerjoin(Entreprise, Entreprise.id == Offre.entreprise_id).filter(
+            Offre.est_active == True,
+            Offre.date_fin >= datetime.now().date()
+        ).order_by(Offre.id).yield_per(batch_size)
+
+        emises = 0
+        for lot in _batches(query, batch_size):
+            for item in _score_batch(lot, profil, min_score, stats):
+                if not limit or emises < limit:
+                    emises += 1
+                    yield "offre", item
+
+        yield "summary", {
+            "analysis_statistics": stats.as_dict(),
+            "generated_at": datetime.now().isoformat()
+        }
+    finally:
+        db.close()
+
+
+def _batches(rows: Iterator, size: int) -> Iterator[List]:
+    lot: List = []
+    for row in rows:
+        lot.append(row)
+        if len(lot) == size:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def _score_batch(lot: List, profil: Tuple, min_score: float, stats: AnalysisStats) -> Iterator[Dict]:
+    matrix = OffreScoringMatrix(lot)
+    scores = matrix.score(*profil)
+    for row, ligne in zip(lot, scores.tolist()):
+        stats.total_analyzed += 1
+        if ligne[0] < min_score:
+            continue
+        item = analysis_item(row.id, row.titre, row.raison_social, row.secteur, row.localisation,
+                             row.date_fin, dict(zip(SCORE_COLUMNS, ligne)))
+        stats.add(item)
+        yield item
+
+
+def to_ndjson(records: Iterator[Tuple[str, Dict]]) -> Iterator[str]:
+    for type_record, record in records:
+        yield json.dumps({"type": type_record, **record}, ensure_ascii=False) + "\n"
+
+
+def to_csv(records: Iterator[Tuple[str, Dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        contenu = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return contenu
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    for type_record, record in records:
+        if type_record == "offre":
+            scores = record["scores"]
+            writer.writerow([
+                type_record, record["offre_id"], record["titre"], record["entreprise"], record["secteur"],
+                record["localisation"] or "", scores["global"], scores["competences"], scores["secteur"],
+                scores["experience"], scores["localisation"], record["ranking"], record["urgency"],
+                record["competition_level"], ""
+            ])
+        else:
+            # Ligne de synthèse : statistiques en JSON dans la dernière colonne
+            writer.writerow([type_record] + [""] * (len(CSV_COLUMNS) - 2) + [json.dumps(record, ensure_ascii=False)])
+        yield flush()
@@ -0,0 +1,107 @@
+# app/services/recommendation_index.py
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.offre import Offre
+from app.services.offre_features import offre_feature_cache, tokenize_competences
+
+
+class OffreSkillIndex:
+    """Index inversé en mémoire : jeton de compétence -> ids des offres actives.
+
+    L'index est reconstruit dès que la signature du catalogue (nombre d'offres
+    actives, plus grand id, dernière mise à jour) change, ce qui coûte une seule
+    requête d'agrégat par appel au lieu d'un chargement complet des offres.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._offres_par_token: Dict[str, Set[int]] = {}
+        self._offres_par_secteur: Dict[str, Set[int]] = {}
+        self._offres_par_localisation: Dict[str, Set[int]] = {}
+
+    @staticmethod
+    def _catalogue_signature(db: Session) -> Tuple:
+        return tuple(db.query(
+            func.count(Offre.id),
+            func.max(Offre.id),
+            func.max(Offre.updated_at)
+        ).filter(Offre.est_active == True).one())
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Reconstruire l'index si le catalogue des offres actives a changé."""
+        signature = self._catalogue_signature(db)
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            if signature != self._signature:
+                self._rebuild(db)
+                self._signature = signature
+
+    def invalidate(self) -> None:
+        """Forcer la reconstruction au prochain appel."""
+        with self._lock:
+            self._signature = None
+
+    def _rebuild(self, db: Session) -> None:
+        offres = db.query(
+            Offre.id,
+            Offre.updated_at,
+            Offre.competences_requises,
+            Offre.secteur,
+            Offre.description,
+            Offre.localisation,
+            Offre.ville_id
+        ).filter(Offre.est_active == True).all()
+
+        offres_par_token: Dict[str, Set[int]] = {}
+        offres_par_secteur: Dict[str, Set[int]] = {}
+        offres_par_localisation: Dict[str, Set[int]] = {}
+
+        for offre in offres:
+            features = offre_feature_cache.get(offre)
+            for token in features.tokens:
+                offres_par_token.setdefault(token, set()).add(offre.id)
+
+            if features.secteur.strip():
+                offres_par_secteur.setdefault(features.secteur.strip(), set()).add(offre.id)
+
+            if features.ville:
+                offres_par_localisation.setdefault(features.ville, set()).add(offre.id)
+
+        self._offres_par_token = offres_par_token
+        self._offres_par_secteur = offres_par_secteur
+        self._offres_par_localisation = offres_par_localisation
+
+        print(f"🗂️ Index compétences reconstruit: {len(offres)} offres, {len(offres_par_token)} jetons")
+
+    def offres_for_competences(self, competences: Iterable[str]) -> Set[int]:
+        """Offres partageant au moins un jeton avec les compétences données."""
+        offre_ids: Set[int] = set()
+        for competence in competences:
+            for token in tokenize_competences(competence):
+                offre_ids |= self._offres_par_token.get(token, set())
+        return offre_ids
+
+    def secteurs(self) -> List[str]:
+        """Secteurs distincts (normalisés) présents dans l'index."""
+        return list(self._offres_par_secteur.keys())
+
+    def localisations(self) -> List[str]:
+        """Localisations distinctes (normalisées) présentes dans l'index."""
+        return list(self._offres_par_localisation.keys())
+
+    def offres_for_secteur(self, secteur: str) -> Set[int]:
+        return self._offres_par_secteur.get(secteur, set())
+
+    def offres_for_localisation(self, localisation: str) -> Set[int]:
+        return self._offres_par_localisation.get(localisation, set())
+
+
+# Instance globale partagée par les requêtes du processus
+offre_skill_index = OffreSkillIndex()
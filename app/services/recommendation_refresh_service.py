@@ -0,0 +1,457 @@
+# app/services/recommendation_refresh_service.py
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload, load_only
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.candidature import Candidature
+from app.models.offre import Offre
+from app.models.recommandation import RecommandationOffre, RecommandationEtat, ExecutionRecommandations
+from app.models.stagiaire import Stagiaire
+from app.services.competence_relevance import competence_relevance_model
+from app.services.recommendation_service import RecommendationService
+from app.services.scoring_engine import OFFRE_SCORING_COLUMNS, OffreScoringMatrix
+
+
+class RecommendationRefreshService:
+    """Recommandations pré-calculées : job de rafraîchissement et lecture rapide."""
+
+    @classmethod
+    def profile_fingerprint(cls, stagiaire: Stagiaire, stagiaire_competences: Optional[List[str]] = None) -> str:
+        """Empreinte des données du profil utilisées par le scoring."""
+        if stagiaire_competences is None:
+            stagiaire_competences = stagiaire.get_all_competences()
+
+        payload = json.dumps([
+            sorted(comp.lower().strip() for comp in stagiaire_competences),
+            stagiaire.specialite or "",
+            stagiaire.niveau_etudes or "",
+            stagiaire.ville or "",
+            settings.COMPETENCE_SCORER,  # Changer de modèle invalide les listes
+            settings.LOCATION_SCORER
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _active_offres_filter(cls):
+        return (Offre.est_active == True, Offre.date_fin >= datetime.now().date())
+
+    @classmethod
+    def _score_rows(cls, stagiaire_id: int, offre_ids: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        return [
+            {
+                "stagiaire_id": stagiaire_id,
+                "offre_id": int(offre_id),
+                "match_score": row[0],
+                "competence_match": row[1],
+                "secteur_match": row[2],
+                "experience_match": row[3],
+                "location_match": row[4],
+            }
+            for offre_id, row in zip(offre_ids.tolist(), scores.tolist())
+        ]
+
+    @classmethod
+    def _top_n(cls, offre_ids: np.ndarray, scores: np.ndarray, exclus: Set[int], top_n: int):
+        """Sélectionner les N meilleures offres (hors offres déjà candidatées)."""
+        overall = scores[:, 0].copy()
+        if exclus:
+            overall[np.isin(offre_ids, list(exclus))] = -np.inf
+
+        ordre = np.argsort(-overall, kind="stable")[:top_n]
+        ordre = ordre[np.isfinite(overall[ordre])]
+        return offre_ids[ordre], scores[ordre]
+
+    @classmethod
+    def refresh(cls, db: Session, full: bool = False, top_n: Optional[int] = None) -> Dict:
+        """Recalculer le top-N des recommandations de chaque stagiaire.
+
+        Seuls les profils dont l'empreinte a changé sont recalculés sur tout le
+        catalogue ; les autres ne sont rescorés que sur les offres créées ou
+        modifiées depuis la dernière exécution. Exception : une liste pleine
+        (tronquée à top_n) qui perd une offre ou voit baisser le score d'une
+        offre stockée est recalculée entièrement, car des offres jamais
+        stockées peuvent alors y entrer. Avec le scorer tfidf, tout changement
+        du corpus modifie les IDF, donc tous les scores stockés : l'exécution
+        est alors complète.
+        """
+        top_n = top_n or settings.RECOMMANDATION_TOP_N
+        debut = db.query(func.now()).scalar()
+
+        derniere_execution = db.query(ExecutionRecommandations).filter(
+            ExecutionRecommandations.fin.isnot(None)
+        ).order_by(ExecutionRecommandations.debut.desc()).first()
+        full = full or derniere_execution is None
+
+        signature_corpus = None
+        if settings.COMPETENCE_SCORER == "tfidf":
+            competence_relevance_model.ensure_fresh(db)
+            signature_corpus = competence_relevance_model.corpus_signature()
+            if not full and derniere_execution.signature_corpus != signature_corpus:
+                print("📚 Table IDF modifiée depuis la dernière exécution : recalcul complet")
+                full = True
+
+        print(f"🔄 Rafraîchissement des recommandations ({'complet' if full else 'incrémental'})...")
+
+        # 1. Retirer les offres fermées ou expirées des listes existantes
+        offres_inactives = db.query(Offre.id).filter(
+            or_(Offre.est_active == False, Offre.date_fin < datetime.now().date())
+        )
+        listes_ecourtees = {
+            stagiaire_id for (stagiaire_id,) in db.query(RecommandationOffre.stagiaire_id).filter(
+                RecommandationOffre.offre_id.in_(offres_inactives)
+            ).distinct()
+        }
+        db.query(RecommandationOffre).filter(
+            RecommandationOffre.offre_id.in_(offres_inactives)
+        ).delete(synchronize_session=False)
+
+        # 2. Encoder une seule fois le catalogue des offres actives
+        offres = db.query(*OFFRE_SCORING_COLUMNS).filter(*cls._active_offres_filter()).all()
+        matrix = OffreScoringMatrix(offres, db)
+
+        offres_modifiees: List = []
+        if not full:
+            seuil = derniere_execution.debut
+            ids_modifies = {
+                row.id for row in db.query(Offre.id).filter(
+                    *cls._active_offres_filter(),
+                    or_(Offre.created_at >= seuil, Offre.updated_at >= seuil)
+                )
+            }
+            offres_modifiees = [offre for offre in offres if offre.id in ids_modifies]
+        matrix_modifiees = OffreScoringMatrix(offres_modifiees) if offres_modifiees else None
+
+        # 3. Données de travail : états, candidatures, listes existantes
+        etats = {etat.stagiaire_id: etat for etat in db.query(RecommandationEtat).all()}
+
+        candidatures: Dict[int, Set[int]] = {}
+        for stagiaire_id, offre_id in db.query(Candidature.stagiaire_id, Candidature.offre_id):
+            candidatures.setdefault(stagiaire_id, set()).add(offre_id)
+
+        existantes: Dict[int, List] = {}
+        if matrix_modifiees is not None:
+            for row in db.query(
+                RecommandationOffre.id, RecommandationOffre.stagiaire_id,
+                RecommandationOffre.offre_id, RecommandationOffre.match_score
+            ):
+                existantes.setdefault(row.stagiaire_id, []).append(row)
+
+        stagiaires = db.query(Stagiaire).options(load_only(
+            Stagiaire.id, Stagiaire.specialite, Stagiaire.niveau_etudes, Stagiaire.ville, Stagiaire.ville_id,
+            Stagiaire.competences_manuelles, Stagiaire.competences_extraites
+        )).all()
+
+        a_recalculer: List[int] = []
+        lignes_a_supprimer: List[int] = []
+        nouvelles_lignes: List[Dict] = []
+        recalcules = 0
+
+        for stagiaire in stagiaires:
+            competences = stagiaire.get_all_competences()
+            empreinte = cls.profile_fingerprint(stagiaire, competences)
+            etat = etats.get(stagiaire.id)
+            exclus = candidatures.get(stagiaire.id, set())
+
+            recalcul_complet = full or etat is None or etat.profil_hash != empreinte
+            liste_pleine = etat is not None and (etat.nombre_recommandations or 0) >= top_n
+            if not recalcul_complet and liste_pleine and stagiaire.id in listes_ecourtees:
+                recalcul_complet = True
+
+            scores = None
+            if not recalcul_complet and matrix_modifiees is not None:
+                scores = matrix_modifiees.score(competences, stagiaire.specialite, stagiaire.niveau_etudes,
+                                                stagiaire.ville, stagiaire.ville_id)
+                if liste_pleine:
+                    nouveaux_scores = dict(zip(matrix_modifiees.offre_ids.tolist(), scores[:, 0].tolist()))
+                    # Offre stockée en baisse ou désormais candidatée : une offre non stockée peut la remplacer
+                    recalcul_complet = any(
+                        row.offre_id in exclus or nouveaux_scores[row.offre_id] < row.match_score
+                        for row in existantes.get(stagiaire.id, [])
+                        if row.offre_id in nouveaux_scores
+                    )
+
+            if recalcul_complet:
+                # Profil nouveau ou modifié (ou liste pleine écourtée) : tout le catalogue
+                scores = matrix.score(competences, stagiaire.specialite, stagiaire.niveau_etudes,
+                                      stagiaire.ville, stagiaire.ville_id)
+                ids, top = cls._top_n(matrix.offre_ids, scores, exclus, top_n)
+                a_recalculer.append(stagiaire.id)
+                nouvelles_lignes.extend(cls._score_rows(stagiaire.id, ids, top))
+                nombre = len(ids)
+                recalcules += 1
+
+            elif matrix_modifiees is not None:
+                # Profil inchangé : fusionner uniquement les offres modifiées
+                ids_modifies = set(matrix_modifiees.offre_ids.tolist())
+
+                conservees = []
+                for row in existantes.get(stagiaire.id, []):
+                    if row.offre_id in ids_modifies:
+                        lignes_a_supprimer.append(row.id)  # sera réinséré si toujours dans le top
+                    else:
+                        conservees.append(row)
+
+                ids, top = cls._top_n(matrix_modifiees.offre_ids, scores, exclus, top_n)
+                candidates = [(row.match_score, 0, row) for row in conservees] + \
+                    [(score_row[0], 1, (offre_id, score_row)) for offre_id, score_row in zip(ids.tolist(), top.tolist())]
+                candidates.sort(key=lambda item: item[0], reverse=True)
+
+                gardees = candidates[:top_n]
+                for _, origine, item in candidates[top_n:]:
+                    if origine == 0:
+                        lignes_a_supprimer.append(item.id)
+                nouvelles = [item for _, origine, item in gardees if origine == 1]
+                if nouvelles:
+                    nouvelles_lignes.extend(cls._score_rows(
+                        stagiaire.id,
+                        np.array([offre_id for offre_id, _ in nouvelles], dtype=np.int64),
+                        np.array([score_row for _, score_row in nouvelles])
+                    ))
+                nombre = len(gardees)
+
+            else:
+                nombre = etat.nombre_recommandations
+
+            if etat is None:
+                etat = RecommandationEtat(stagiaire_id=stagiaire.id)
+                db.add(etat)
+            etat.profil_hash = empreinte
+            etat.nombre_recommandations = nombre
+            etat.calcule_le = debut
+
+        # 4. Écriture groupée
+        if a_recalculer:
+            db.query(RecommandationOffre).filter(
+                RecommandationOffre.stagiaire_id.in_(a_recalculer)
+            ).delete(synchronize_session=False)
+        if lignes_a_supprimer:
+            db.query(RecommandationOffre).filter(
+                RecommandationOffre.id.in_(lignes_a_supprimer)
+            ).delete(synchronize_session=False)
+        if nouvelles_lignes:
+            for ligne in nouvelles_lignes:
+                ligne["calcule_le"] = debut
+            db.bulk_insert_mappings(RecommandationOffre, nouvelles_lignes)
+
+        execution = ExecutionRecommandations(
+            debut=debut,
+            fin=db.query(func.now()).scalar(),
+            complet=full,
+            stagiaires_recalcules=recalcules,
+            offres_modifiees=len(offres) if full else len(offres_modifiees),
+            signature_corpus=signature_corpus
+        )
+        db.add(execution)
+        db.commit()
+
+        stats = {
+            "complet": full,
+            "stagiaires": len(stagiaires),
+            "stagiaires_recalcules": recalcules,
+            "offres_actives": len(offres),
+            "offres_modifiees": execution.offres_modifiees,
+            "lignes_ecrites": len(nouvelles_lignes)
+        }
+        print(f"✅ Recommandations rafraîchies: {stats}")
+        return stats
+
+    @staticmethod
+    def _liste_ecourtee(etat: RecommandationEtat, nombre: int, top_n: int) -> None:
+        """Une liste a perdu une ligne sans remplaçante : recaler son compte.
+
+        Une liste pleine (tronquée à top_n) ne peut pas être complétée sans
+        rescorer tout le catalogue : son empreinte est vidée (aucun profil ne
+        correspond), elle est donc servie en direct puis entièrement
+        recalculée par le prochain job.
+        """
+        if (etat.nombre_recommandations or 0) >= top_n:
+            etat.profil_hash = ""
+        etat.nombre_recommandations = nombre
+
+    @classmethod
+    def apply_offre_change(cls, db: Session, offre_id: int, top_n: Optional[int] = None) -> Dict:
+        """Répercuter une seule offre (créée, publiée, modifiée, fermée ou supprimée) sur les listes.
+
+        Une offre active est scorée contre tous les profils et fusionnée dans leur
+        top-N ; une offre fermée, expirée ou supprimée en est simplement retirée.
+        Une liste pleine qui perd l'offre sans la récupérer est marquée à recalculer.
+        """
+        top_n = top_n or settings.RECOMMANDATION_TOP_N
+
+        # L'ancienne version de l'offre sort des listes dans tous les cas
+        contenaient = {
+            stagiaire_id for (stagiaire_id,) in db.query(RecommandationOffre.stagiaire_id).filter(
+                RecommandationOffre.offre_id == offre_id
+            )
+        }
+        supprimees = db.query(RecommandationOffre).filter(
+            RecommandationOffre.offre_id == offre_id
+        ).delete(synchronize_session=False)
+
+        # Taille et score minimum actuels de chaque liste (une seule requête)
+        listes = {
+            row.stagiaire_id: (row.nombre, row.score_min)
+            for row in db.query(
+                RecommandationOffre.stagiaire_id,
+                func.count(RecommandationOffre.id).label("nombre"),
+                func.min(RecommandationOffre.match_score).label("score_min")
+            ).group_by(RecommandationOffre.stagiaire_id)
+        }
+        etats = {etat.stagiaire_id: etat for etat in db.query(RecommandationEtat).all()}
+
+        offre = db.query(*OFFRE_SCORING_COLUMNS).filter(Offre.id == offre_id, *cls._active_offres_filter()).first()
+
+        if offre is None:
+            for stagiaire_id in contenaient & etats.keys():
+                cls._liste_ecourtee(etats[stagiaire_id], listes.get(stagiaire_id, (0, None))[0], top_n)
+            db.commit()
+            return {"offre_id": offre_id, "retiree": True, "lignes_supprimees": supprimees, "lignes_ajoutees": 0}
+
+        matrix = OffreScoringMatrix([offre], db)
+        candidats = {
+            stagiaire_id for (stagiaire_id,) in db.query(Candidature.stagiaire_id).filter(
+                Candidature.offre_id == offre_id
+            )
+        }
+
+        stagiaires = db.query(Stagiaire).options(load_only(
+            Stagiaire.id, Stagiaire.specialite, Stagiaire.niveau_etudes, Stagiaire.ville, Stagiaire.ville_id,
+            Stagiaire.competences_manuelles, Stagiaire.competences_extraites
+        )).filter(Stagiaire.id.in_(list(etats.keys()))).all() if etats else []
+
+        nouvelles_lignes: List[Dict] = []
+        a_evincer: List[int] = []
+        ajoutees: Set[int] = set()
+
+        for stagiaire in stagiaires:
+            etat = etats[stagiaire.id]
+            if stagiaire.id in candidats:
+                continue
+
+            competences = stagiaire.get_all_competences()
+            # Liste obsolète : elle sera entièrement recalculée par le prochain job
+            if etat.profil_hash != cls.profile_fingerprint(stagiaire, competences):
+                continue
+
+            scores = matrix.score(competences, stagiaire.specialite, stagiaire.niveau_etudes,
+                                  stagiaire.ville, stagiaire.ville_id)
+            nombre, score_min = listes.get(stagiaire.id, (0, None))
+            tronquee = (etat.nombre_recommandations or 0) >= top_n
+
+            # Liste tronquée : les offres non stockées sont toutes sous le minimum stocké
+            if tronquee and score_min is not None and scores[0, 0] <= score_min:
+                continue
+
+            nouvelles_lignes.extend(cls._score_rows(stagiaire.id, matrix.offre_ids, scores))
+            ajoutees.add(stagiaire.id)
+            if nombre >= top_n:
+                a_evincer.append(stagiaire.id)
+                etat.nombre_recommandations = nombre
+            else:
+                etat.nombre_recommandations = nombre + 1
+
+        # Listes qui ont perdu l'ancienne version sans la récupérer (candidature, score en baisse)
+        for stagiaire_id in (contenaient - ajoutees) & etats.keys():
+            cls._liste_ecourtee(etats[stagiaire_id], listes.get(stagiaire_id, (0, None))[0], top_n)
+
+        # Évincer la dernière recommandation des listes pleines
+        if a_evincer:
+            derniers: Dict[int, Tuple[float, int]] = {}
+            for row in db.query(
+                RecommandationOffre.id, RecommandationOffre.stagiaire_id, RecommandationOffre.match_score
+            ).filter(RecommandationOffre.stagiaire_id.in_(a_evincer)):
+                courant = derniers.get(row.stagiaire_id)
+                if courant is None or row.match_score < courant[0]:
+                    derniers[row.stagiaire_id] = (row.match_score, row.id)
+
+            db.query(RecommandationOffre).filter(
+                RecommandationOffre.id.in_([row_id for _, row_id in derniers.values()])
+            ).delete(synchronize_session=False)
+
+        if nouvelles_lignes:
+            db.bulk_insert_mappings(RecommandationOffre, nouvelles_lignes)
+        db.commit()
+
+        return {
+            "offre_id": offre_id,
+            "retiree": False,
+            "lignes_supprimees": supprimees + len(a_evincer),
+            "lignes_ajoutees": len(nouvelles_lignes)
+        }
+
+    @classmethod
+    def run_offre_change(cls, offre_id: int) -> None:
+        """Version tâche de fond de apply_offre_change, avec sa propre session."""
+        db = SessionLocal()
+        try:
+            stats = cls.apply_offre_change(db, offre_id)
+            print(f"🔁 Recommandations mises à jour pour l'offre {offre_id}: {stats}")
+        except Exception as e:
+            print(f"❌ Erreur mise à jour recommandations (offre {offre_id}): {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    @classmethod
+    def get_fresh_recommendations(
+        cls,
+        db: Session,
+        stagiaire: Stagiaire,
+        stagiaire_competences: List[str],
+        limit: int,
+        min_score: float
+    ) -> Optional[List[Dict]]:
+        """Lire les recommandations pré-calculées, ou None si elles ne sont pas à jour."""
+        if limit > settings.RECOMMANDATION_TOP_N:
+            return None
+
+        etat = db.query(RecommandationEtat).filter(
+            RecommandationEtat.stagiaire_id == stagiaire.id
+        ).first()
+        if not etat or not etat.calcule_le:
+            return None
+
+        # Profil modifié depuis le dernier calcul
+        if etat.profil_hash != cls.profile_fingerprint(stagiaire, stagiaire_competences):
+            return None
+
+        calcule_le = etat.calcule_le
+        if calcule_le.tzinfo is None:
+            calcule_le = calcule_le.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - calcule_le > timedelta(hours=settings.RECOMMANDATION_MAX_AGE_HOURS):
+            return None
+
+        candidatures_existantes = db.query(Candidature.offre_id).filter(
+            Candidature.stagiaire_id == stagiaire.id
+        )
+
+        rows = db.query(RecommandationOffre, Offre).join(
+            Offre, Offre.id == RecommandationOffre.offre_id
+        ).options(joinedload(Offre.entreprise)).filter(
+            RecommandationOffre.stagiaire_id == stagiaire.id,
+            RecommandationOffre.match_score >= min_score,
+            *cls._active_offres_filter(),
+            ~Offre.id.in_(candidatures_existantes)
+        ).order_by(RecommandationOffre.match_score.desc()).limit(limit).all()
+
+        # Liste tronquée (top-N plein) mais pas assez de résultats : recalcul en direct
+        if len(rows) < limit and etat.nombre_recommandations >= settings.RECOMMANDATION_TOP_N:
+            return None
+
+        return [
+            RecommendationService.build_recommendation(offre, {
+                "overall": reco.match_score,
+                "competence": reco.competence_match,
+                "secteur": reco.secteur_match,
+                "experience": reco.experience_match,
+                "location": reco.location_match,
+            })
+            for reco, offre in rows
+        ]
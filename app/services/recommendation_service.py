@@ -1,55 +1,79 @@
 # app/services/recommendation_service.py - NOUVEAU FICHIER
+from sqlalchemy import and_, func, literal, or_
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Dict, Optional, Tuple
 from app.models.stagiaire import Stagiaire
 from app.models.offre import Offre
 from app.models.candidature import Candidature
+from app.models.recommandation import RecommandationOffre, RecommandationEtat
 from app.models.entreprise import Entreprise
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.gazetteer import bounding_box, distance_km, resolve_ville_id
+from app.services.competence_relevance import competence_relevance_model
+from app.services.recommendation_index import offre_skill_index
+from app.services.offre_features import (
+    offre_feature_cache, parse_offre_competences, detect_offre_level, secteur_domain_groups,
+    tokenize_competences, are_villes_proches, is_remote_localisation, REMOTE_KEYWORDS
+)
 import re
+import math
+import hashlib
 from datetime import datetime, timedelta
 
+# Résultats de get_personalized_recommendations, par empreinte du profil et signature du catalogue.
+# Cache propre à chaque processus : la signature est lue en base, donc une écriture faite
+# par un autre worker invalide aussi les entrées de celui-ci.
+recommendation_cache = TTLCache(
+    maxsize=settings.RECOMMANDATION_CACHE_MAX_ENTRIES,
+    ttl=settings.RECOMMANDATION_CACHE_TTL_SECONDS
+)
+
 class RecommendationService:
     """Service pour recommander des offres personnalisées aux stagiaires."""
     
+    # Pondération des critères
+    MATCH_WEIGHTS = {
+        "competences": 0.4,    # 40% - Le plus important
+        "secteur": 0.25,       # 25%
+        "experience": 0.20,    # 20%
+        "location": 0.15       # 15%
+    }
+    
+    # Seuils du repli secteur/localisation pour les offres sans compétence commune
+    SECTEUR_FALLBACK_MIN_SCORE = 75.0
+    LOCATION_FALLBACK_MIN_SCORE = 80.0
+    
     @classmethod
-    def calculate_competence_match_score(cls, stagiaire_competences: List[str], offre_competences: str) -> float:
-        """Calculer le score de correspondance des compétences (0-100)."""
-        if not stagiaire_competences or not offre_competences:
-            return 0.0
-        
-        # Nettoyer et normaliser les compétences
-        stagiaire_comp_clean = [comp.lower().strip() for comp in stagiaire_competences if comp.strip()]
-        
-        # Extraire les compétences de l'offre
-        offre_comp_text = offre_competences.lower()
-        offre_comp_words = re.findall(r'\b\w+\b', offre_comp_text)
-        
-        if not stagiaire_comp_clean or not offre_comp_words:
-            return 0.0
-        
-        # Compter les correspondances
-        matches = 0
-        total_offre_competences = 0
+    def parse_offre_competences(cls, offre_competences: str) -> List[str]:
+        """Découper les compétences requises d'une offre (virgules/points-virgules, sinon espaces)."""
+        return parse_offre_competences(offre_competences)
+    
+    @classmethod
+    def competence_match_points(cls, offre_comp: str, stagiaire_comp_clean: List[str]) -> Tuple[int, Optional[str]]:
+        """Points (0-3) obtenus par une compétence demandée face aux compétences du stagiaire."""
+        offre_comp_clean = offre_comp.lower().strip()
         
-        # Créer des variations de mots-clés pour une meilleure correspondance
         for stagiaire_comp in stagiaire_comp_clean:
-            # Recherche exacte
-            if stagiaire_comp in offre_comp_text:
-                matches += 2  # Correspondance exacte vaut plus
-            # Recherche partielle (mots contenus)
-            elif any(word in stagiaire_comp or stagiaire_comp in word for word in offre_comp_words):
-                matches += 1
-        
-        # Estimer le nombre total de compétences demandées
-        # (approximation basée sur la longueur du texte)
-        total_offre_competences = max(len(offre_comp_words) // 3, 1)
-        
-        # Calculer le score (plafonné à 100)
-        score = min((matches / total_offre_competences) * 100, 100)
-        return round(score, 2)
-
+            # 1. Correspondance exacte
+            if stagiaire_comp == offre_comp_clean:
+                return 3, f"{stagiaire_comp} (exact)"
+            
+            # 2. Correspondance partielle (contient)
+            if (len(offre_comp_clean) > 3 and offre_comp_clean in stagiaire_comp) or \
+                (len(stagiaire_comp) > 3 and stagiaire_comp in offre_comp_clean):
+                return 2, f"{stagiaire_comp} ≈ {offre_comp_clean}"
+            
+            # 3. Correspondance de mots-clés
+            if any(word in stagiaire_comp for word in offre_comp_clean.split()) or \
+                any(word in offre_comp_clean for word in stagiaire_comp.split()):
+                return 1, f"{stagiaire_comp} ~ {offre_comp_clean}"
+        
+        return 0, None
+    
     @classmethod
-    def calculate_competence_match_score(cls, stagiaire_competences: List[str], offre_competences: str) -> float:
+    def calculate_competence_match_score(cls, stagiaire_competences: List[str], offre_competences: str,
+                                         db: Optional[Session] = None) -> float:
         """Calculer le score de correspondance des compétences (0-100) - VERSION CORRIGÉE."""
         if not stagiaire_competences or not offre_competences:
             return 0.0
@@ -57,65 +81,32 @@ class RecommendationService:
         # Nettoyer et normaliser les compétences
         stagiaire_comp_clean = [comp.lower().strip() for comp in stagiaire_competences if comp.strip()]
     
-        # Extraire les compétences de l'offre - CORRECTION ICI
-        offre_comp_text = offre_competences.lower()
+        # Modèle TF-IDF (table des IDF du corpus des offres actives)
+        if settings.COMPETENCE_SCORER == "tfidf":
+            return competence_relevance_model.score_text(stagiaire_comp_clean, offre_competences, db)
     
         # ✅ NOUVELLE LOGIQUE : Diviser par virgules ET espaces
-        import re
-        # Séparer par virgules, puis nettoyer
-        offre_comp_list = [comp.strip() for comp in re.split(r'[,;]', offre_comp_text) if comp.strip()]
-    
-        # Si pas de virgules, séparer par espaces pour les mots individuels
-        if len(offre_comp_list) <= 1:
-            offre_comp_list = [comp.strip() for comp in offre_comp_text.split() if comp.strip()]
+        offre_comp_list = cls.parse_offre_competences(offre_competences)
     
         print(f"🔍 DEBUG Compétences:")
         print(f"  Stagiaire: {stagiaire_comp_clean[:5]}... (total: {len(stagiaire_comp_clean)})")
-        print(f"  Offre brute: {offre_comp_text}")
         print(f"  Offre parsée: {offre_comp_list}")
     
         if not stagiaire_comp_clean or not offre_comp_list:
             return 0.0
     
-        # Compter les correspondances - LOGIQUE AMÉLIORÉE
+        # Compter les correspondances - 3 points exact, 2 partiel, 1 mot-clé
         matches = 0
-        total_offre_competences = len(offre_comp_list)
         matched_skills = []
     
         for offre_comp in offre_comp_list:
-            offre_comp_clean = offre_comp.lower().strip()
-        
-            # Recherche de correspondance
-            found_match = False
-        
-            for stagiaire_comp in stagiaire_comp_clean:
-                stagiaire_comp_clean = stagiaire_comp.lower().strip()
-            
-                # 1. Correspondance exacte
-                if stagiaire_comp_clean == offre_comp_clean:
-                    matches += 3  # Correspondance exacte = 3 points
-                    matched_skills.append(f"{stagiaire_comp_clean} (exact)")
-                    found_match = True
-                    break
-                
-                # 2. Correspondance partielle (contient)
-                elif (len(offre_comp_clean) > 3 and offre_comp_clean in stagiaire_comp_clean) or \
-                    (len(stagiaire_comp_clean) > 3 and stagiaire_comp_clean in offre_comp_clean):
-                    matches += 2  # Correspondance partielle = 2 points
-                    matched_skills.append(f"{stagiaire_comp_clean} ≈ {offre_comp_clean}")
-                    found_match = True
-                    break
-                
-                # 3. Correspondance de mots-clés
-                elif any(word in stagiaire_comp_clean for word in offre_comp_clean.split()) or \
-                    any(word in offre_comp_clean for word in stagiaire_comp_clean.split()):
-                    matches += 1  # Correspondance de mots = 1 point
-                    matched_skills.append(f"{stagiaire_comp_clean} ~ {offre_comp_clean}")
-                    found_match = True
-                    break
+            points, detail = cls.competence_match_points(offre_comp, stagiaire_comp_clean)
+            matches += points
+            if detail:
+                matched_skills.append(detail)
     
         # Calculer le score sur base 100
-        max_possible_score = total_offre_competences * 3  # Si tout était exact
+        max_possible_score = len(offre_comp_list) * 3  # Si tout était exact
         score = min((matches / max_possible_score) * 100, 100) if max_possible_score > 0 else 0
     
         print(f"  Matches trouvés: {matches}/{max_possible_score} = {score:.1f}%")
@@ -140,18 +131,9 @@ class RecommendationService:
         if specialite_clean in secteur_clean or secteur_clean in specialite_clean:
             return 75.0
         
-        # Correspondances par domaines
-        tech_domains = ["informatique", "développement", "programmation", "logiciel", "numérique", "digital"]
-        business_domains = ["commerce", "marketing", "vente", "business", "gestion", "management"]
-        design_domains = ["design", "graphisme", "créatif", "ux", "ui", "web design"]
-        
-        def is_in_domain(text, domains):
-            return any(domain in text for domain in domains)
-        
-        # Si les deux sont dans le même domaine général
-        for domain_group in [tech_domains, business_domains, design_domains]:
-            if is_in_domain(specialite_clean, domain_group) and is_in_domain(secteur_clean, domain_group):
-                return 50.0
+        # Si les deux sont dans le même domaine général (tech, business, design)
+        if secteur_domain_groups(specialite_clean) & secteur_domain_groups(secteur_clean):
+            return 50.0
         
         return 0.0
     
@@ -161,15 +143,18 @@ class RecommendationService:
         if not stagiaire_niveau or not offre_description:
             return 50.0  # Score neutre si pas d'info
         
+        is_junior_offre, is_senior_offre = cls.detect_offre_level(offre_description)
+        return cls.experience_score_for_level(stagiaire_niveau, is_junior_offre, is_senior_offre)
+    
+    @classmethod
+    def detect_offre_level(cls, offre_description: str) -> Tuple[bool, bool]:
+        """Détecter si la description vise un profil junior et/ou senior."""
+        return detect_offre_level(offre_description)
+    
+    @classmethod
+    def experience_score_for_level(cls, stagiaire_niveau: str, is_junior_offre: bool, is_senior_offre: bool) -> float:
+        """Score d'expérience d'un niveau d'études face au niveau visé par l'offre."""
         niveau_clean = stagiaire_niveau.lower()
-        description_clean = offre_description.lower()
-        
-        # Indicateurs de niveau dans l'offre
-        junior_indicators = ["junior", "débutant", "stage", "étudiant", "apprenti", "première expérience"]
-        senior_indicators = ["senior", "expérimenté", "confirmé", "expert", "lead", "chef"]
-        
-        is_junior_offre = any(indicator in description_clean for indicator in junior_indicators)
-        is_senior_offre = any(indicator in description_clean for indicator in senior_indicators)
         
         # Correspondance niveau stagiaire vs offre
         if "bac" in niveau_clean or "licence" in niveau_clean:
@@ -185,11 +170,28 @@ class RecommendationService:
         return 50.0  # Score par défaut
     
     @classmethod
-    def calculate_location_match_score(cls, stagiaire_ville: str, offre_localisation: str) -> float:
-        """Calculer le score de correspondance géographique (0-100)."""
+    def calculate_location_match_score(cls, stagiaire_ville: str, offre_localisation: str,
+                                       stagiaire_ville_id: Optional[int] = None,
+                                       offre_ville_id: Optional[int] = None) -> float:
+        """Calculer le score de correspondance géographique (0-100).
+        
+        Les ids de villes (gazetteer) résolus à l'écriture peuvent être fournis
+        pour éviter de re-normaliser les textes en mode "distance".
+        """
         if not stagiaire_ville or not offre_localisation:
             return 50.0  # Score neutre
         
+        # Décroissance avec la distance quand les deux villes sont connues du gazetteer
+        if settings.LOCATION_SCORER == "distance":
+            score = cls.distance_location_score(
+                stagiaire_ville_id or resolve_ville_id(stagiaire_ville),
+                offre_ville_id or resolve_ville_id(offre_localisation)
+            )
+            if score is not None:
+                if is_remote_localisation(offre_localisation.lower()):
+                    return max(score, 90.0)
+                return score
+        
         ville_clean = stagiaire_ville.lower().strip()
         localisation_clean = offre_localisation.lower().strip()
         
@@ -201,38 +203,46 @@ class RecommendationService:
         if ville_clean in localisation_clean or localisation_clean in ville_clean:
             return 80.0
         
-        # Grandes villes proches (logique simplifiée)
-        grandes_villes_maroc = {
-            "casablanca": ["rabat", "mohammedia"],
-            "rabat": ["casablanca", "salé"],
-            "marrakech": ["casablanca"],
-            "fès": ["meknes"],
-            "tanger": ["tétouan"]
-        }
-        
-        for ville, villes_proches in grandes_villes_maroc.items():
-            if ville_clean == ville and any(v in localisation_clean for v in villes_proches):
-                return 60.0
-            if any(v == ville_clean for v in villes_proches) and ville in localisation_clean:
-                return 60.0
+        # Grandes villes proches (index précalculé)
+        if are_villes_proches(ville_clean, localisation_clean):
+            return 60.0
         
         # Remote/télétravail
-        if "remote" in localisation_clean or "télétravail" in localisation_clean or "distance" in localisation_clean:
+        if is_remote_localisation(localisation_clean):
             return 90.0
         
         return 20.0  # Villes éloignées
     
+    @classmethod
+    def distance_location_score(cls, ville_id: Optional[int], offre_ville_id: Optional[int]) -> Optional[float]:
+        """100 sur place, puis demi-vie de LOCATION_DISTANCE_HALF_LIFE_KM vers le plancher de 20."""
+        if ville_id is None or offre_ville_id is None:
+            return None
+        
+        distance = distance_km(ville_id, offre_ville_id)
+        return round(20.0 + 80.0 * 0.5 ** (distance / settings.LOCATION_DISTANCE_HALF_LIFE_KM), 2)
+    
+    @classmethod
+    def location_radius_km(cls, min_score: float) -> float:
+        """Distance maximale pour un score de distance >= min_score."""
+        if min_score <= 20.0:
+            return float("inf")
+        return settings.LOCATION_DISTANCE_HALF_LIFE_KM * math.log2(80.0 / (min(min_score, 100.0) - 20.0))
+    
+    @classmethod
+    def within_km_condition(cls, ville_id: int, rayon_km: float):
+        """Offres dans le rectangle englobant le cercle de `rayon_km` (index latitude/longitude)."""
+        lat_min, lat_max, lon_min, lon_max = bounding_box(ville_id, rayon_km)
+        return and_(
+            Offre.latitude.between(lat_min, lat_max),
+            Offre.longitude.between(lon_min, lon_max)
+        )
+    
     @classmethod
     def calculate_overall_match_score(cls, competence_score: float, secteur_score: float, 
                                     experience_score: float, location_score: float) -> float:
         """Calculer le score global de correspondance avec pondération."""
-        # Pondération des critères
-        weights = {
-            "competences": 0.4,    # 40% - Le plus important
-            "secteur": 0.25,       # 25%
-            "experience": 0.20,    # 20%
-            "location": 0.15       # 15%
-        }
+        weights = cls.MATCH_WEIGHTS
         
         overall_score = (
             competence_score * weights["competences"] +
@@ -249,9 +259,19 @@ class RecommendationService:
         db: Session, 
         stagiaire_id: int, 
         limit: int = 10,
-        min_score: float = 20.0
+        min_score: float = 20.0,
+        prefilter: Optional[str] = None,
+        use_materialized: bool = True,
+        use_cache: bool = True
     ) -> List[Dict]:
-        """Obtenir des recommandations personnalisées pour un stagiaire."""
+        """Obtenir des recommandations personnalisées pour un stagiaire.
+        
+        prefilter : "index" (index inversé en mémoire), "sql" (prédicats poussés
+        dans la requête) ou "none" ; par défaut settings.RECOMMANDATION_PREFILTER.
+        Les préfiltres écartent les offres sans compétence commune ni secteur ou
+        ville proche, même si leurs autres sous-scores atteignent min_score :
+        seul "none" est exhaustif.
+        """
         
         # Récupérer le stagiaire avec ses compétences
         stagiaire = db.query(Stagiaire).filter(Stagiaire.id == stagiaire_id).first()
@@ -261,89 +281,144 @@ class RecommendationService:
         
         # Récupérer toutes les compétences du stagiaire
         stagiaire_competences = stagiaire.get_all_competences()
+        prefilter = prefilter or settings.RECOMMANDATION_PREFILTER
+        
+        if not use_cache:
+            return cls._compute_personalized_recommendations(
+                db, stagiaire, stagiaire_competences, limit, min_score, prefilter, use_materialized
+            )
+        
+        cache_key = cls._recommendation_cache_key(
+            db, stagiaire, stagiaire_competences, limit, min_score, prefilter, use_materialized
+        )
+        cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            print(f"⚡ {len(cached)} recommandations servies depuis le cache")
+            return [dict(recommendation) for recommendation in cached]
+        
+        recommendations = cls._compute_personalized_recommendations(
+            db, stagiaire, stagiaire_competences, limit, min_score, prefilter, use_materialized
+        )
+        recommendation_cache.set(cache_key, recommendations)
+        return [dict(recommendation) for recommendation in recommendations]
+    
+    @classmethod
+    def _recommendation_cache_key(
+        cls,
+        db: Session,
+        stagiaire: Stagiaire,
+        stagiaire_competences: List[str],
+        limit: int,
+        min_score: float,
+        prefilter: str,
+        use_materialized: bool
+    ) -> Tuple[str, Tuple]:
+        """Clé de cache : empreinte des entrées du scoring + signature du catalogue."""
+        from app.services.recommendation_refresh_service import RecommendationRefreshService
+        
+        offres_candidatees = sorted(
+            offre_id for (offre_id,) in db.query(Candidature.offre_id).filter(
+                Candidature.stagiaire_id == stagiaire.id
+            )
+        )
+        
+        empreinte = "|".join([
+            str(stagiaire.id),
+            RecommendationRefreshService.profile_fingerprint(stagiaire, stagiaire_competences),
+            ",".join(str(offre_id) for offre_id in offres_candidatees),
+            str(limit), str(min_score), prefilter, str(use_materialized),
+            datetime.now().date().isoformat()  # Les offres expirent au changement de jour
+        ])
+        return hashlib.sha256(empreinte.encode("utf-8")).hexdigest(), cls._catalogue_signature(db)
+    
+    @staticmethod
+    def _catalogue_signature(db: Session) -> Tuple:
+        """Signature partagée entre processus des offres et des listes pré-calculées (une requête).
+        
+        Toute écriture sur une offre change son updated_at (ou le nombre d'offres) ;
+        le job et les mises à jour par offre insèrent de nouvelles lignes de
+        recommandations ou changent calcule_le.
+        """
+        return tuple(db.query(
+            db.query(func.count(Offre.id)).scalar_subquery(),
+            db.query(func.max(Offre.id)).scalar_subquery(),
+            db.query(func.max(Offre.updated_at)).scalar_subquery(),
+            db.query(func.max(RecommandationOffre.id)).scalar_subquery(),
+            db.query(func.max(RecommandationEtat.calcule_le)).scalar_subquery(),
+        ).one())
+    
+    @classmethod
+    def _compute_personalized_recommendations(
+        cls,
+        db: Session,
+        stagiaire: Stagiaire,
+        stagiaire_competences: List[str],
+        limit: int,
+        min_score: float,
+        prefilter: str,
+        use_materialized: bool
+    ) -> List[Dict]:
+        """Calcul des recommandations (table pré-calculée, sinon scoring en direct)."""
+        stagiaire_id = stagiaire.id
+        
+        # Servir depuis la table pré-calculée si elle est à jour pour ce profil
+        if use_materialized:
+            from app.services.recommendation_refresh_service import RecommendationRefreshService
+            materialized = RecommendationRefreshService.get_fresh_recommendations(
+                db, stagiaire, stagiaire_competences, limit, min_score
+            )
+            if materialized is not None:
+                print(f"⚡ {len(materialized)} recommandations servies depuis la table pré-calculée")
+                return materialized
         
         # Récupérer les candidatures déjà soumises pour les exclure
         candidatures_existantes = db.query(Candidature.offre_id).filter(
             Candidature.stagiaire_id == stagiaire_id
         ).subquery()
         
-        # Récupérer les offres actives (pas encore candidaté)
-        offres_query = db.query(Offre).options(
-            joinedload(Offre.entreprise)
-        ).filter(
+        from app.services.scoring_engine import OFFRE_SCORING_COLUMNS, select_top_offres
+        
+        # Récupérer les offres actives (pas encore candidaté) : colonnes de scoring uniquement
+        offres_query = db.query(*OFFRE_SCORING_COLUMNS).filter(
             Offre.est_active == True,
             Offre.date_fin >= datetime.now().date(),  # Offres non expirées
             ~Offre.id.in_(candidatures_existantes)     # Pas déjà candidaté
         )
         
+        # Ne scorer que les offres candidates issues de l'index inversé
+        if prefilter == "index":
+            candidate_ids = cls._select_candidate_offre_ids(db, stagiaire, stagiaire_competences)
+            if not candidate_ids:
+                return []
+            offres_query = offres_query.filter(Offre.id.in_(candidate_ids))
+        
+        # Ou laisser PostgreSQL écarter les offres sans aucun point commun
+        elif prefilter == "sql":
+            prefilter_condition = cls._sql_prefilter_condition(stagiaire, stagiaire_competences)
+            if prefilter_condition is None:
+                return []
+            offres_query = offres_query.filter(prefilter_condition)
+        
         offres = offres_query.all()
         
         print(f"🔍 Analyse de {len(offres)} offres pour stagiaire {stagiaire_id}")
         print(f"📊 Compétences stagiaire: {stagiaire_competences}")
         
-        recommendations = []
-        
-        for offre in offres:
-            # Calculer les scores de correspondance
-            competence_score = cls.calculate_competence_match_score(
-                stagiaire_competences, 
-                offre.competences_requises or ""
-            )
-            
-            secteur_score = cls.calculate_secteur_match_score(
-                stagiaire.specialite or "", 
-                offre.secteur
-            )
-            
-            experience_score = cls.calculate_experience_match_score(
-                stagiaire.niveau_etudes or "", 
-                offre.description
-            )
-            
-            location_score = cls.calculate_location_match_score(
-                stagiaire.ville or "", 
-                offre.localisation or ""
-            )
-            
-            # Score global
-            overall_score = cls.calculate_overall_match_score(
-                competence_score, secteur_score, experience_score, location_score
-            )
-            
-            # Garder seulement les offres avec un score minimum
-            if overall_score >= min_score:
-                recommendation = {
-                    "offre_id": offre.id,
-                    "titre": offre.titre,
-                    "entreprise_nom": offre.entreprise.raison_social if offre.entreprise else "N/A",
-                    "secteur": offre.secteur,
-                    "localisation": offre.localisation,
-                    "type_stage": offre.type_stage,
-                    "date_debut": offre.date_debut.isoformat(),
-                    "date_fin": offre.date_fin.isoformat(),
-                    "description": offre.description[:200] + "..." if len(offre.description) > 200 else offre.description,
-                    
-                    # Scores détaillés
-                    "match_score": overall_score,
-                    "competence_match": competence_score,
-                    "secteur_match": secteur_score,
-                    "experience_match": experience_score,
-                    "location_match": location_score,
-                    
-                    # Métadonnées
-                    "recommendation_reasons": cls._get_recommendation_reasons(
-                        competence_score, secteur_score, experience_score, location_score
-                    ),
-                    "created_at": offre.created_at.isoformat() if offre.created_at else None
-                }
-                
-                recommendations.append(recommendation)
+        # Scoring vectorisé puis sélection top-K par tas borné (score >= min_score)
+        gagnants = select_top_offres(stagiaire, offres, limit, min_score, stagiaire_competences, db)
         
-        # Trier par score décroissant
-        recommendations.sort(key=lambda x: x["match_score"], reverse=True)
+        # Charger et construire les réponses uniquement pour les K gagnantes
+        offres_gagnantes = {
+            offre.id: offre for offre in db.query(Offre).options(
+                joinedload(Offre.entreprise)
+            ).filter(Offre.id.in_([offre_id for offre_id, _ in gagnants]))
+        } if gagnants else {}
         
-        # Limiter le nombre de résultats
-        recommendations = recommendations[:limit]
+        recommendations = [
+            cls.build_recommendation(offres_gagnantes[offre_id], scores)
+            for offre_id, scores in gagnants
+            if offre_id in offres_gagnantes
+        ]
         
         print(f"✅ {len(recommendations)} recommandations générées")
         if recommendations:
@@ -351,6 +426,115 @@ class RecommendationService:
         
         return recommendations
     
+    @classmethod
+    def build_recommendation(cls, offre: Offre, scores: Dict[str, float]) -> Dict:
+        """Construire le dictionnaire de recommandation d'une offre à partir de ses scores."""
+        return {
+            "offre_id": offre.id,
+            "titre": offre.titre,
+            "entreprise_nom": offre.entreprise.raison_social if offre.entreprise else "N/A",
+            "secteur": offre.secteur,
+            "localisation": offre.localisation,
+            "type_stage": offre.type_stage,
+            "date_debut": offre.date_debut.isoformat(),
+            "date_fin": offre.date_fin.isoformat(),
+            "description": offre.description[:200] + "..." if len(offre.description) > 200 else offre.description,
+            
+            # Scores détaillés
+            "match_score": scores["overall"],
+            "competence_match": scores["competence"],
+            "secteur_match": scores["secteur"],
+            "experience_match": scores["experience"],
+            "location_match": scores["location"],
+            
+            # Métadonnées
+            "recommendation_reasons": cls._get_recommendation_reasons(
+                scores["competence"], scores["secteur"], scores["experience"], scores["location"]
+            ),
+            "created_at": offre.created_at.isoformat() if offre.created_at else None
+        }
+    
+    @classmethod
+    def notify_offre_changed(cls, offre_id: int) -> None:
+        """À appeler après toute écriture sur une offre (création, modification, publication, fermeture, suppression)."""
+        offre_feature_cache.invalidate(offre_id)
+        offre_skill_index.invalidate()
+        competence_relevance_model.invalidate()
+    
+    @classmethod
+    def _select_candidate_offre_ids(cls, db: Session, stagiaire: Stagiaire, 
+                                    stagiaire_competences: List[str]) -> set:
+        """Sélectionner via l'index les offres partageant une compétence, plus un repli secteur/localisation.
+        
+        Préfiltre avec perte assumée : les autres offres ne sont pas scorées.
+        """
+        offre_skill_index.ensure_fresh(db)
+        
+        candidate_ids = offre_skill_index.offres_for_competences(stagiaire_competences)
+        
+        # Repli : secteurs proches de la spécialité (scorés une fois par secteur distinct)
+        if stagiaire.specialite:
+            for secteur in offre_skill_index.secteurs():
+                if cls.calculate_secteur_match_score(stagiaire.specialite, secteur) >= cls.SECTEUR_FALLBACK_MIN_SCORE:
+                    candidate_ids |= offre_skill_index.offres_for_secteur(secteur)
+        
+        # Repli : même ville ou télétravail
+        if stagiaire.ville:
+            for localisation in offre_skill_index.localisations():
+                if cls.calculate_location_match_score(stagiaire.ville, localisation, stagiaire.ville_id) >= cls.LOCATION_FALLBACK_MIN_SCORE:
+                    candidate_ids |= offre_skill_index.offres_for_localisation(localisation)
+        
+        return candidate_ids
+    
+    @classmethod
+    def _sql_prefilter_condition(cls, stagiaire: Stagiaire, stagiaire_competences: List[str]):
+        """Mêmes critères que l'index inversé, exprimés en SQL (None si aucun critère possible).
+        
+        - un jeton de compétence commun (colonne competences_normalisees) ;
+        - un secteur égal ou contenant la spécialité (score >= SECTEUR_FALLBACK_MIN_SCORE) ;
+        - même ville ou télétravail (score >= LOCATION_FALLBACK_MIN_SCORE) ; en mode
+          "distance", rectangle englobant du rayon correspondant à ce score.
+        """
+        conditions = []
+        
+        tokens = set()
+        for competence in stagiaire_competences:
+            tokens |= tokenize_competences(competence)
+        if tokens:
+            conditions.extend(
+                Offre.competences_normalisees.contains(f" {token} ", autoescape=True)
+                for token in sorted(tokens)
+            )
+            # Offres pas encore normalisées (avant migration) : gardées par prudence
+            conditions.append(Offre.competences_normalisees.is_(None))
+        
+        specialite = (stagiaire.specialite or "").lower().strip()
+        if specialite:
+            secteur = func.lower(func.trim(Offre.secteur))
+            conditions.append(and_(
+                secteur != "",
+                or_(secteur.contains(specialite, autoescape=True), literal(specialite).contains(secteur))
+            ))
+        
+        ville = (stagiaire.ville or "").lower().strip()
+        if ville:
+            localisation = func.lower(func.trim(Offre.localisation))
+            conditions.append(and_(
+                localisation != "",
+                or_(
+                    localisation.contains(ville, autoescape=True),
+                    literal(ville).contains(localisation),
+                    *(localisation.contains(mot) for mot in REMOTE_KEYWORDS)
+                )
+            ))
+            
+            ville_id = stagiaire.ville_id or resolve_ville_id(stagiaire.ville)
+            if settings.LOCATION_SCORER == "distance" and ville_id is not None:
+                rayon = cls.location_radius_km(cls.LOCATION_FALLBACK_MIN_SCORE)
+                conditions.append(cls.within_km_condition(ville_id, rayon))
+        
+        return or_(*conditions) if conditions else None
+    
     @classmethod
     def _get_recommendation_reasons(cls, comp_score: float, sect_score: float, 
                                   exp_score: float, loc_score: float) -> List[str]:
@@ -382,42 +566,68 @@ class RecommendationService:
     
     @classmethod
     def get_similar_profiles_recommendations(cls, db: Session, stagiaire_id: int, limit: int = 5) -> List[Dict]:
-        """Recommandations basées sur des profils similaires (collaborative filtering simple)."""
+        """Recommandations basées sur des profils similaires (filtrage collaboratif item-item)."""
         
         # Récupérer le stagiaire actuel
         stagiaire = db.query(Stagiaire).filter(Stagiaire.id == stagiaire_id).first()
         if not stagiaire:
             return []
         
-        # Trouver des stagiaires avec des profils similaires
-        stagiaires_similaires = db.query(Stagiaire).filter(
-            Stagiaire.id != stagiaire_id,
-            Stagiaire.specialite == stagiaire.specialite,
-            Stagiaire.niveau_etudes == stagiaire.niveau_etudes
-        ).limit(10).all()
+        from app.services.collaborative_filtering import co_application_matrix
+        co_application_matrix.ensure_fresh(db)
         
-        if not stagiaires_similaires:
-            return []
+        # Offres déjà candidatées (tous statuts) : jamais recommandées
+        deja_candidatees = {
+            offre_id for (offre_id,) in db.query(Candidature.offre_id).filter(
+                Candidature.stagiaire_id == stagiaire_id
+            )
+        }
         
-        # Récupérer les offres auxquelles ces stagiaires ont candidaté avec succès
-        from app.models.candidature import StatusCandidature
+        # Marge pour compenser les offres fermées ou expirées écartées ensuite
+        nb_candidats = limit * 4
+        
+        # Filtrage item-item : offres co-candidatées avec celles du stagiaire
+        candidats = co_application_matrix.recommend_for_stagiaire(stagiaire_id, deja_candidatees, nb_candidats)
+        reason = "Candidatures similaires aux vôtres"
+        
+        # Démarrage à froid : offres plébiscitées par les profils similaires
+        if not candidats:
+            profils_similaires = [
+                peer_id for (peer_id,) in db.query(Stagiaire.id).filter(
+                    Stagiaire.id != stagiaire_id,
+                    Stagiaire.specialite == stagiaire.specialite,
+                    Stagiaire.niveau_etudes == stagiaire.niveau_etudes
+                )
+            ]
+            candidats = co_application_matrix.recommend_from_peers(profils_similaires, deja_candidatees, nb_candidats)
+            reason = "Recommandé par des profils similaires"
+        
+        if not candidats:
+            return []
         
-        offres_similaires = db.query(Offre).join(Candidature).filter(
-            Candidature.stagiaire_id.in_([s.id for s in stagiaires_similaires]),
-            Candidature.status == StatusCandidature.ACCEPTEE,
-            Offre.est_active == True,
-            Offre.date_fin >= datetime.now().date()
-        ).distinct().limit(limit).all()
+        offres_actives = {
+            offre.id: offre for offre in db.query(Offre).options(joinedload(Offre.entreprise)).filter(
+                Offre.id.in_([offre_id for offre_id, _ in candidats]),
+                Offre.est_active == True,
+                Offre.date_fin >= datetime.now().date()
+            )
+        }
         
         recommendations = []
-        for offre in offres_similaires:
+        for offre_id, score in candidats:
+            offre = offres_actives.get(offre_id)
+            if offre is None:
+                continue
             recommendations.append({
                 "offre_id": offre.id,
                 "titre": offre.titre,
                 "entreprise_nom": offre.entreprise.raison_social if offre.entreprise else "N/A",
                 "secteur": offre.secteur,
-                "reason": "Recommandé par des profils similaires"
+                "reason": reason,
+                "similarity_score": round(score, 4)
             })
+            if len(recommendations) >= limit:
+                break
         
         return recommendations
     
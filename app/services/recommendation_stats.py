@@ -1,57 +1,79 @@
 # app/services/recommendation_stats.py - NOUVEAU FICHIER
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc , case  
-from typing import Dict, List
+from sqlalchemy import func, desc , case, literal, literal_column, select, union_all
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+import threading
+import time
+from app.core.config import settings
 from app.models.offre import Offre
 from app.models.candidature import Candidature, StatusCandidature
 from app.models.stagiaire import Stagiaire
+from app.services.cohort_aggregates import cohort_aggregates
+from app.services.competence_catalogue_service import CompetenceCatalogueService
+from app.services.offre_features import KeywordScanner
 from datetime import datetime, timedelta
+# Compétences techniques populaires à rechercher
+TECH_KEYWORDS = [
+    "python", "javascript", "java", "react", "node.js", "sql", "html", "css",
+    "angular", "vue", "php", "c++", "c#", "django", "flask", "spring",
+    "mysql", "postgresql", "mongodb", "git", "docker", "aws", "azure",
+    "machine learning", "data science", "artificial intelligence", "ai",
+    "mobile", "android", "ios", "flutter", "react native"
+]
+TECH_KEYWORD_SCANNER = KeywordScanner(TECH_KEYWORDS)
+
 class RecommendationStatsService:
     """Service pour les statistiques des recommandations."""
     
+    # Instantané de la demande en compétences : (instant de calcul, résultat)
+    _demand_snapshot: Optional[Tuple[float, Dict]] = None
+    _demand_lock = threading.Lock()
+    
     @classmethod
     def get_competences_demand_analysis(cls, db: Session) -> Dict:
-        """Analyser la demande en compétences sur le marché."""
+        """Analyser la demande en compétences sur le marché.
+        
+        Le résultat est un instantané partagé, recalculé au plus toutes les
+        COMPETENCE_DEMAND_REFRESH_SECONDS (à ne pas modifier par l'appelant).
+        """
+        snapshot = cls._demand_snapshot
+        if snapshot is None or time.monotonic() - snapshot[0] > settings.COMPETENCE_DEMAND_REFRESH_SECONDS:
+            with cls._demand_lock:
+                snapshot = cls._demand_snapshot
+                if snapshot is None or time.monotonic() - snapshot[0] > settings.COMPETENCE_DEMAND_REFRESH_SECONDS:
+                    snapshot = (time.monotonic(), cls.compute_competences_demand_analysis(db))
+                    cls._demand_snapshot = snapshot
+        return snapshot[1]
+    
+    @classmethod
+    def invalidate_competences_demand(cls) -> None:
+        """À appeler après une écriture sur les offres : le prochain appel recalcule l'instantané."""
+        cls._demand_snapshot = None
+    
+    @classmethod
+    def compute_competences_demand_analysis(cls, db: Session) -> Dict:
+        """Compter les offres actives demandant chaque compétence technique.
         
-        # Récupérer toutes les offres actives avec leurs compétences
-        offres = db.query(Offre.competences_requises).filter(
+        Jointure entière sur le catalogue (offre_competence) : les mots-clés sont
+        cherchés dans les libellés distincts du catalogue, pas dans le texte de
+        chaque offre.
+        """
+        
+        total_offres = db.query(func.count(Offre.id)).filter(
             Offre.est_active == True,
             Offre.date_fin >= datetime.now().date(),
             Offre.competences_requises.isnot(None)
-        ).all()
-        
-        # Compter les compétences les plus demandées
-        competences_count = {}
-        
-        # Compétences techniques populaires à rechercher
-        tech_keywords = [
-            "python", "javascript", "java", "react", "node.js", "sql", "html", "css",
-            "angular", "vue", "php", "c++", "c#", "django", "flask", "spring",
-            "mysql", "postgresql", "mongodb", "git", "docker", "aws", "azure",
-            "machine learning", "data science", "artificial intelligence", "ai",
-            "mobile", "android", "ios", "flutter", "react native"
-        ]
+        ).scalar()
         
-        for offre in offres:
-            if offre.competences_requises:
-                text = offre.competences_requises.lower()
-                for keyword in tech_keywords:
-                    if keyword in text:
-                        competences_count[keyword] = competences_count.get(keyword, 0) + 1
-        
-        # Trier par popularité
-        top_competences = sorted(
-            competences_count.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )[:15]
+        top_competences = CompetenceCatalogueService.keyword_demand_counts(db, TECH_KEYWORD_SCANNER, limit=15)
         
         return {
             "competences_les_plus_demandees": [
-                {"competence": comp, "nombre_offres": count, "popularite": round((count/len(offres))*100, 1)}
+                {"competence": comp, "nombre_offres": count, "popularite": round((count/total_offres)*100, 1)}
                 for comp, count in top_competences
             ],
-            "total_offres_analysees": len(offres),
+            "total_offres_analysees": total_offres,
             "recommandation": "Développez ces compétences pour maximiser vos opportunités"
         }
     
@@ -59,11 +81,11 @@ class RecommendationStatsService:
     def get_success_patterns(cls, db: Session) -> Dict:
         """Analyser les patterns de succès des candidatures."""
         
-        # Candidatures acceptées vs total
-        total_candidatures = db.query(Candidature).count()
-        candidatures_acceptees = db.query(Candidature).filter(
-            Candidature.status == StatusCandidature.ACCEPTEE
-        ).count()
+        # Candidatures acceptées vs total (un seul agrégat conditionnel)
+        total_candidatures, candidatures_acceptees = db.query(
+            func.count(Candidature.id),
+            func.coalesce(func.sum(case((Candidature.status == StatusCandidature.ACCEPTEE, 1), else_=0)), 0)
+        ).one()
         
         taux_succes_global = round((candidatures_acceptees / total_candidatures) * 100, 2) if total_candidatures > 0 else 0
         
@@ -92,26 +114,36 @@ class RecommendationStatsService:
         # Trier par taux de succès
         secteurs_analysis.sort(key=lambda x: x["taux_succes"], reverse=True)
         
-        # Analyse des profils gagnants
-        stagiaires_succes = db.query(Stagiaire).join(Candidature).filter(
+        # Analyse des profils gagnants : stagiaires ayant au moins une candidature acceptée,
+        # comptés en base par spécialité et par niveau dans une seule requête (UNION ALL)
+        a_ete_accepte = db.query(Candidature.id).filter(
+            Candidature.stagiaire_id == Stagiaire.id,
             Candidature.status == StatusCandidature.ACCEPTEE
-        ).distinct().all()
+        ).exists()
+        gagnants = select(Stagiaire.specialite, Stagiaire.niveau_etudes).where(a_ete_accepte).cte("gagnants")
         
-        # Spécialités les plus réussies
-        specialites_count = {}
-        niveaux_count = {}
+        comptages = [
+            select(
+                literal(dimension).label("dimension"), colonne.label("valeur"), func.count().label("count")
+            ).where(colonne.isnot(None), colonne != "").group_by(colonne)
+            for dimension, colonne in (("specialite", gagnants.c.specialite), ("niveau_etudes", gagnants.c.niveau_etudes))
+        ]
+        profils_gagnants = db.execute(
+            union_all(*comptages).order_by(desc("count"), literal_column("valeur"))
+        ).all()
         
-        for stagiaire in stagiaires_succes:
-            if stagiaire.specialite:
-                specialites_count[stagiaire.specialite] = specialites_count.get(stagiaire.specialite, 0) + 1
-            if stagiaire.niveau_etudes:
-                niveaux_count[stagiaire.niveau_etudes] = niveaux_count.get(stagiaire.niveau_etudes, 0) + 1
+        specialites_gagnantes = [
+            (row.valeur, row.count) for row in profils_gagnants if row.dimension == "specialite"
+        ][:5]
+        niveaux_etudes_succes = [
+            (row.valeur, row.count) for row in profils_gagnants if row.dimension == "niveau_etudes"
+        ]
         
         return {
             "taux_succes_global": taux_succes_global,
             "secteurs_plus_accessibles": secteurs_analysis[:5],
-            "specialites_gagnantes": sorted(specialites_count.items(), key=lambda x: x[1], reverse=True)[:5],
-            "niveaux_etudes_succes": sorted(niveaux_count.items(), key=lambda x: x[1], reverse=True),
+            "specialites_gagnantes": specialites_gagnantes,
+            "niveaux_etudes_succes": niveaux_etudes_succes,
             "conseils": [
                 f"Le secteur '{secteurs_analysis[0]['secteur']}' a le meilleur taux de succès" if secteurs_analysis else "Variez vos candidatures",
                 "Complétez votre profil pour augmenter vos chances",
@@ -127,26 +159,17 @@ class RecommendationStatsService:
         if not stagiaire:
             return {"error": "Stagiaire non trouvé"}
         
-        # Comparer avec des profils similaires
-        profils_similaires = db.query(Stagiaire).filter(
-            Stagiaire.id != stagiaire_id,
-            Stagiaire.specialite == stagiaire.specialite,
-            Stagiaire.niveau_etudes == stagiaire.niveau_etudes
-        ).all()
+        # Comparer avec des profils similaires (agrégats de la cohorte specialite/niveau)
+        cohort_aggregates.ensure_fresh(db)
+        position = cohort_aggregates.position_of(stagiaire)
+        profils_similaires_count = position["profils_similaires"]
         
         # Analyser la concurrence
-        if profils_similaires:
-            # Compétences moyennes des profils similaires
-            competences_autres = []
-            for profil in profils_similaires:
-                competences_autres.extend(profil.get_all_competences())
-            
-            competences_stagiaire = stagiaire.get_all_competences()
-            
-            # Avantages concurrentiels
+        if profils_similaires_count:
+            # Avantages concurrentiels : compétences qu'aucun profil similaire ne possède
             competences_uniques = [
-                comp for comp in competences_stagiaire 
-                if competences_stagiaire.count(comp) > competences_autres.count(comp)
+                comp for comp, autres in position["competences_autres"].items()
+                if autres < 1
             ]
             
             # Analyse du marché pour son profil
@@ -156,24 +179,19 @@ class RecommendationStatsService:
                 Offre.secteur.ilike(f"%{stagiaire.specialite}%") if stagiaire.specialite else True
             ).count()
             
-            candidatures_concurrentes = db.query(Candidature).join(Offre).join(Stagiaire).filter(
-                Offre.est_active == True,
-                Stagiaire.specialite == stagiaire.specialite,
-                Stagiaire.niveau_etudes == stagiaire.niveau_etudes,
-                Stagiaire.id != stagiaire_id
-            ).count()
+            candidatures_concurrentes = position["candidatures_concurrentes"]
             
             ratio_concurrence = round(candidatures_concurrentes / offres_compatibles, 2) if offres_compatibles > 0 else 0
             
             return {
-                "profils_similaires_count": len(profils_similaires),
+                "profils_similaires_count": profils_similaires_count,
                 "offres_compatibles": offres_compatibles,
                 "niveau_concurrence": "Élevé" if ratio_concurrence > 2 else "Modéré" if ratio_concurrence > 1 else "Faible",
                 "competences_uniques": competences_uniques[:5],
                 "recommandations_strategiques": [
                     "Mettez en avant vos compétences uniques" if competences_uniques else "Développez des compétences distinctives",
                     f"Il y a {offres_compatibles} offres compatibles avec votre profil",
-                    f"Vous êtes en concurrence avec {len(profils_similaires)} profils similaires"
+                    f"Vous êtes en concurrence avec {profils_similaires_count} profils similaires"
                 ],
                 "score_competitivite": min(100, max(0, 100 - (ratio_concurrence * 20)))
             }
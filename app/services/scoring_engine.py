@@ -0,0 +1,322 @@
+# app/services/scoring_engine.py
+import heapq
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.offre import Offre
+from app.services.competence_relevance import competence_relevance_model
+from app.services.offre_features import offre_feature_cache
+from app.services.recommendation_service import RecommendationService
+
+# Ordre des colonnes de la matrice de scores
+SCORE_COLUMNS = ("overall", "competence", "secteur", "experience", "location")
+
+# Colonnes d'une offre nécessaires au scoring (évite de charger les objets complets)
+OFFRE_SCORING_COLUMNS = (
+    Offre.id, Offre.updated_at, Offre.competences_requises,
+    Offre.secteur, Offre.description, Offre.localisation, Offre.ville_id
+)
+
+# Instantané d'une offre transmis aux processus de scoring (mêmes attributs que les colonnes)
+OffreSnapshot = namedtuple(
+    "OffreSnapshot", ["id", "updated_at", "competences_requises", "secteur", "description", "localisation", "ville_id"]
+)
+
+
+class OffreScoringMatrix:
+    """Encodage matriciel d'un lot d'offres pour le scoring vectorisé.
+
+    - compétences : matrice creuse offres x compétences distinctes (format COO),
+      le score d'un stagiaire devient un produit matrice-vecteur ;
+    - secteur / localisation : index vers les valeurs distinctes, scorées une
+      seule fois par valeur puis diffusées sur toutes les offres ;
+    - expérience : drapeaux junior/senior par offre.
+
+    Avec le modèle TF-IDF, `db` (session de l'appelant) sert à synchroniser la
+    table des IDF une fois pour le lot ; sans session, l'appelant l'a déjà
+    synchronisée pour son traitement (flux par lots, job de rafraîchissement).
+    """
+
+    def __init__(self, offres: Sequence, db: Optional[Session] = None):
+        self.offre_ids = np.array([offre.id for offre in offres], dtype=np.int64)
+        self.size = len(offres)
+
+        vocabulaire: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        nb_competences = np.zeros(self.size, dtype=np.int64)
+
+        secteurs: Dict[str, int] = {}
+        secteur_idx = np.zeros(self.size, dtype=np.int64)
+        localisations: Dict[str, int] = {}
+        localisation_idx = np.zeros(self.size, dtype=np.int64)
+
+        is_junior = np.zeros(self.size, dtype=bool)
+        is_senior = np.zeros(self.size, dtype=bool)
+        has_description = np.zeros(self.size, dtype=bool)
+        tokens: List = []
+
+        for i, offre in enumerate(offres):
+            # Analyse textuelle de l'offre : une fois par version, via le cache
+            features = offre_feature_cache.get(offre)
+
+            # Compétences : une entrée par compétence demandée (doublons compris)
+            nb_competences[i] = len(features.competences)
+            for competence in features.competences:
+                rows.append(i)
+                cols.append(vocabulaire.setdefault(competence, len(vocabulaire)))
+
+            secteur_idx[i] = secteurs.setdefault(features.secteur, len(secteurs))
+            localisation_idx[i] = localisations.setdefault(
+                (features.localisation, features.ville_id), len(localisations)
+            )
+
+            has_description[i] = features.has_description
+            is_junior[i], is_senior[i] = features.is_junior, features.is_senior
+            tokens.append(features.tokens)
+
+        self.competences = list(vocabulaire.keys())
+        self.competence_tokens = tokens
+        self.competence_rows = np.array(rows, dtype=np.int64)
+        self.competence_cols = np.array(cols, dtype=np.int64)
+        self.nb_competences = nb_competences
+
+        self.secteurs = list(secteurs.keys())
+        self.secteur_idx = secteur_idx
+        self.localisations = list(localisations.keys())
+        self.localisation_idx = localisation_idx
+
+        # 0 = neutre, 1 = senior, 2 = junior, 3 = junior + senior
+        self.level_idx = is_junior.astype(np.int64) * 2 + is_senior.astype(np.int64)
+        self.has_description = has_description
+
+        # Modèle TF-IDF : table des IDF synchronisée une fois par lot, sur la session de l'appelant
+        self.use_tfidf = settings.COMPETENCE_SCORER == "tfidf"
+        if self.use_tfidf and self.size and db is not None:
+            competence_relevance_model.ensure_fresh(db)
+
+    def _competence_scores(self, stagiaire_competences: List[str]) -> np.ndarray:
+        stagiaire_comp_clean = [comp.lower().strip() for comp in stagiaire_competences if comp.strip()]
+        if not stagiaire_comp_clean or self.competence_rows.size == 0:
+            return np.zeros(self.size)
+
+        if self.use_tfidf:
+            return competence_relevance_model.score_offres(stagiaire_comp_clean, self.offre_ids, self.competence_tokens)
+
+        # Points de chaque compétence distincte, calculés une seule fois
+        points = np.array([
+            RecommendationService.competence_match_points(competence, stagiaire_comp_clean)[0]
+            for competence in self.competences
+        ], dtype=np.float64)
+
+        # Produit matrice creuse x vecteur
+        matches = np.bincount(
+            self.competence_rows,
+            weights=points[self.competence_cols],
+            minlength=self.size
+        )
+
+        max_possible = self.nb_competences * 3
+        scores = np.zeros(self.size)
+        has_competences = max_possible > 0
+        scores[has_competences] = np.minimum(
+            (matches[has_competences] / max_possible[has_competences]) * 100, 100
+        )
+        return np.round(scores, 2)
+
+    def _secteur_scores(self, specialite: str) -> np.ndarray:
+        par_secteur = np.array([
+            RecommendationService.calculate_secteur_match_score(specialite, secteur)
+            for secteur in self.secteurs
+        ], dtype=np.float64)
+        return par_secteur[self.secteur_idx] if self.size else np.zeros(0)
+
+    def _experience_scores(self, niveau_etudes: str) -> np.ndarray:
+        if not niveau_etudes:
+            return np.full(self.size, 50.0)
+
+        par_niveau = np.array([
+            RecommendationService.experience_score_for_level(niveau_etudes, False, False),
+            RecommendationService.experience_score_for_level(niveau_etudes, False, True),
+            RecommendationService.experience_score_for_level(niveau_etudes, True, False),
+            RecommendationService.experience_score_for_level(niveau_etudes, True, True),
+        ])
+        return np.where(self.has_description, par_niveau[self.level_idx], 50.0)
+
+    def _location_scores(self, ville: str, ville_id: Optional[int]) -> np.ndarray:
+        par_localisation = np.array([
+            RecommendationService.calculate_location_match_score(ville, localisation, ville_id, offre_ville_id)
+            for localisation, offre_ville_id in self.localisations
+        ], dtype=np.float64)
+        return par_localisation[self.localisation_idx] if self.size else np.zeros(0)
+
+    def score(self, stagiaire_competences: List[str], specialite: Optional[str],
+              niveau_etudes: Optional[str], ville: Optional[str],
+              ville_id: Optional[int] = None) -> np.ndarray:
+        """Scorer toutes les offres pour un profil : matrice (offres x SCORE_COLUMNS)."""
+        sub_scores = np.column_stack([
+            self._competence_scores(stagiaire_competences or []),
+            self._secteur_scores(specialite or ""),
+            self._experience_scores(niveau_etudes or ""),
+            self._location_scores(ville or "", ville_id),
+        ]) if self.size else np.zeros((0, 4))
+
+        weights = RecommendationService.MATCH_WEIGHTS
+        overall = (
+            sub_scores[:, 0] * weights["competences"] +
+            sub_scores[:, 1] * weights["secteur"] +
+            sub_scores[:, 2] * weights["experience"] +
+            sub_scores[:, 3] * weights["location"]
+        )
+
+        return np.column_stack([np.round(overall, 2), sub_scores])
+
+
+def score_offres_for_stagiaire(stagiaire, offres: Sequence,
+                               stagiaire_competences: Optional[List[str]] = None,
+                               db: Optional[Session] = None) -> List[Dict[str, float]]:
+    """Scorer un lot d'offres pour un stagiaire, dans l'ordre des offres."""
+    if stagiaire_competences is None:
+        stagiaire_competences = stagiaire.get_all_competences()
+
+    matrix = OffreScoringMatrix(offres, db)
+    scores = matrix.score(
+        stagiaire_competences,
+        stagiaire.specialite,
+        stagiaire.niveau_etudes,
+        stagiaire.ville,
+        stagiaire.ville_id
+    )
+
+    return [dict(zip(SCORE_COLUMNS, row)) for row in scores.tolist()]
+
+
+def _top_k(scores: np.ndarray, limit: int, min_score: float) -> List[int]:
+    """Indices des `limit` meilleures lignes au-dessus de `min_score`, à égalité dans l'ordre."""
+    overall = scores[:, 0].tolist()
+    eligibles = (i for i, score in enumerate(overall) if score >= min_score)
+    return heapq.nlargest(limit, eligibles, key=overall.__getitem__)
+
+
+def select_top_offres(stagiaire, offres: Sequence, limit: int, min_score: float,
+                      stagiaire_competences: Optional[List[str]] = None,
+                      db: Optional[Session] = None) -> List[Tuple[int, Dict[str, float]]]:
+    """Sélectionner les `limit` meilleures offres au-dessus de `min_score`.
+
+    Un tas borné garde les (score, index) gagnants ; seuls ces K gagnants sont
+    convertis en dictionnaires de scores. Retourne des (offre_id, scores) par
+    score décroissant, à égalité dans l'ordre des offres. Si
+    RECOMMANDATION_PARALLEL_WORKERS est activé (désactivé par défaut), le
+    scoring est réparti sur un pool de processus au-delà de
+    RECOMMANDATION_PARALLEL_THRESHOLD offres.
+    """
+    if stagiaire_competences is None:
+        stagiaire_competences = stagiaire.get_all_competences()
+
+    profil = (list(stagiaire_competences), stagiaire.specialite, stagiaire.niveau_etudes,
+              stagiaire.ville, stagiaire.ville_id)
+
+    if _parallel_enabled(len(offres)):
+        try:
+            return _select_top_offres_parallel(offres, profil, limit, min_score)
+        except BrokenProcessPool as e:
+            print(f"⚠️ Pool de scoring interrompu, repli séquentiel: {e}")
+            shutdown_scoring_pool()
+
+    matrix = OffreScoringMatrix(offres, db)
+    scores = matrix.score(*profil)
+
+    return [
+        (int(matrix.offre_ids[i]), dict(zip(SCORE_COLUMNS, scores[i].tolist())))
+        for i in _top_k(scores, limit, min_score)
+    ]
+
+
+# ----------------------------------------------------------------------
+# Scoring parallèle (pool de processus)
+# ----------------------------------------------------------------------
+
+_scoring_pool: Optional[ProcessPoolExecutor] = None
+_scoring_pool_lock = threading.Lock()
+
+
+def _parallel_workers() -> int:
+    return settings.RECOMMANDATION_PARALLEL_WORKERS or os.cpu_count() or 1
+
+
+def _parallel_enabled(nb_offres: int) -> bool:
+    # Le modèle TF-IDF vit dans le processus principal (synchronisé avec la base)
+    return (
+        nb_offres >= settings.RECOMMANDATION_PARALLEL_THRESHOLD
+        and _parallel_workers() > 1
+        and settings.COMPETENCE_SCORER != "tfidf"
+    )
+
+
+def _get_scoring_pool() -> ProcessPoolExecutor:
+    global _scoring_pool
+    if _scoring_pool is None:
+        with _scoring_pool_lock:
+            if _scoring_pool is None:
+                # "spawn" : pas de fork d'un processus serveur multi-threadé
+                _scoring_pool = ProcessPoolExecutor(
+                    max_workers=_parallel_workers(),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _scoring_pool
+
+
+def shutdown_scoring_pool() -> None:
+    global _scoring_pool
+    with _scoring_pool_lock:
+        if _scoring_pool is not None:
+            _scoring_pool.shutdown(wait=False, cancel_futures=True)
+            _scoring_pool = None
+
+
+def _score_chunk(offres: List[tuple], debut: int, profil: tuple,
+                 limit: int, min_score: float) -> List[Tuple[float, int, int, List[float]]]:
+    """Tâche d'un processus : top-K local d'un lot d'offres (tuples simples).
+
+    Retourne des (score, position globale, offre_id, scores) ; le cache de
+    caractéristiques du processus est réutilisé d'un appel à l'autre.
+    """
+    matrix = OffreScoringMatrix([OffreSnapshot._make(offre) for offre in offres])
+    scores = matrix.score(*profil)
+    return [
+        (scores[i, 0].item(), debut + i, int(matrix.offre_ids[i]), scores[i].tolist())
+        for i in _top_k(scores, limit, min_score)
+    ]
+
+
+def _select_top_offres_parallel(offres: Sequence, profil: tuple, limit: int,
+                                min_score: float) -> List[Tuple[int, Dict[str, float]]]:
+    # Instantanés en tuples simples : sérialisation légère, aucun objet ORM
+    snapshots = [
+        (offre.id, offre.updated_at, offre.competences_requises,
+         offre.secteur, offre.description, offre.localisation, offre.ville_id)
+        for offre in offres
+    ]
+    workers = _parallel_workers()
+    taille = -(-len(snapshots) // workers)
+
+    pool = _get_scoring_pool()
+    futures = [
+        pool.submit(_score_chunk, snapshots[debut:debut + taille], debut, profil, limit, min_score)
+        for debut in range(0, len(snapshots), taille)
+    ]
+
+    # Fusion des top-K locaux : score décroissant, puis ordre d'origine des offres
+    candidats = [resultat for future in futures for resultat in future.result()]
+    gagnants = heapq.nsmallest(limit, candidats, key=lambda c: (-c[0], c[1]))
+
+    return [(offre_id, dict(zip(SCORE_COLUMNS, scores))) for _, _, offre_id, scores in gagnants]
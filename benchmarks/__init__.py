@@ -0,0 +1 @@
+# Benchmarks du moteur de recommandation (voir recommendation_benchmark.py)
@@ -0,0 +1,172 @@
+# Générateur de catalogue synthétique pour les benchmarks de recommandation
+import random
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.models.candidature import Candidature, StatusCandidature
+from app.models.entreprise import Entreprise
+from app.models.offre import Offre
+from app.models.recruteur import Recruteur
+from app.models.stagiaire import Stagiaire
+
+# Secteurs (poids relatif) et compétences typiques de chacun
+SECTEURS: Dict[str, Dict] = {
+    "Informatique": {"poids": 30, "competences": [
+        "python", "java", "javascript", "sql", "git", "docker", "linux", "c++", "c#", "aws", "azure",
+        "spring", "django", "postgresql", "mongodb", "kubernetes", "machine learning", "data science"]},
+    "Développement web": {"poids": 20, "competences": [
+        "javascript", "typescript", "react", "angular", "vue.js", "node.js", "html", "css", "php",
+        "laravel", "symfony", "mysql", "git", "rest api", "figma"]},
+    "Marketing digital": {"poids": 12, "competences": [
+        "seo", "sem", "google analytics", "réseaux sociaux", "marketing digital", "content marketing",
+        "emailing", "canva", "communication", "anglais"]},
+    "Commerce": {"poids": 10, "competences": [
+        "négociation", "prospection", "crm", "salesforce", "excel", "communication", "anglais",
+        "relation client", "vente"]},
+    "Design graphique": {"poids": 8, "competences": [
+        "photoshop", "illustrator", "figma", "indesign", "ux", "ui", "after effects", "créativité"]},
+    "Finance": {"poids": 10, "competences": [
+        "excel", "comptabilité", "analyse financière", "sage", "power bi", "audit", "fiscalité", "vba"]},
+    "Gestion": {"poids": 10, "competences": [
+        "gestion de projet", "excel", "communication", "organisation", "ms project", "anglais",
+        "reporting", "power bi"]},
+}
+
+# Compétences transverses présentes dans tous les secteurs
+COMPETENCES_TRANSVERSES = ["anglais", "français", "travail en équipe", "excel", "communication"]
+
+# Villes (poids relatif, Casablanca et Rabat concentrent l'essentiel des offres)
+VILLES = {
+    "Casablanca": 35, "Rabat": 18, "Marrakech": 8, "Tanger": 8, "Fès": 6, "Agadir": 4,
+    "Meknès": 3, "Salé": 3, "Mohammedia": 3, "Kénitra": 2, "Tétouan": 2, "Oujda": 2,
+    "Télétravail": 4, "Remote": 2,
+}
+
+NIVEAUX = {"Bac+2": 10, "Bac+3": 20, "Licence": 20, "Master": 30, "Ingénieur": 15, None: 5}
+
+DESCRIPTIONS = [
+    "Stage de fin d'études ouvert aux étudiants, première expérience bienvenue.",
+    "Rejoignez une équipe dynamique sur des projets variés.",
+    "Profil junior accepté, encadrement par un tuteur dédié.",
+    "Mission exigeante pour un profil confirmé, autonomie attendue.",
+    "Stage au sein d'une équipe senior, montée en compétences rapide.",
+    "Participation aux projets clients et à la vie de l'équipe.",
+]
+
+TYPES_STAGE = {"Présentiel": 60, "Hybride": 30, "Télétravail": 10}
+
+STATUTS_CANDIDATURE = {
+    StatusCandidature.EN_ATTENTE: 50, StatusCandidature.EN_COURS: 15, StatusCandidature.ACCEPTEE: 10,
+    StatusCandidature.REFUSEE: 20, StatusCandidature.RETIREE: 5,
+}
+
+EMAIL_DOMAIN = "benchmark.local"
+
+
+def _weighted(rng: random.Random, choix: Dict):
+    return rng.choices(list(choix.keys()), weights=list(choix.values()), k=1)[0]
+
+
+def _competences(rng: random.Random, secteur: str, minimum: int, maximum: int) -> List[str]:
+    pool = SECTEURS[secteur]["competences"]
+    nombre = min(rng.randint(minimum, maximum), len(pool))
+    # Tirage pondéré sans remise : les premières compétences du secteur sont les plus demandées
+    competences = sorted(pool, key=lambda c: rng.random() ** (pool.index(c) + 1), reverse=True)[:nombre]
+    if rng.random() < 0.4:
+        transverse = rng.choice(COMPETENCES_TRANSVERSES)
+        if transverse not in competences:
+            competences.append(transverse)
+    return competences
+
+
+def generate_catalogue(db: Session, nb_entreprises: int, nb_offres: int, nb_stagiaires: int,
+                       candidatures_par_stagiaire: int = 5, seed: int = 42) -> Dict[str, int]:
+    """Insérer un catalogue synthétique (entreprises, recruteurs, offres, stagiaires, candidatures)."""
+    rng = random.Random(seed)
+    aujourd_hui = date.today()
+
+    entreprises = []
+    for i in range(nb_entreprises):
+        secteur = _weighted(rng, {nom: info["poids"] for nom, info in SECTEURS.items()})
+        entreprises.append(Entreprise(
+            raison_social=f"Entreprise Benchmark {i}", secteur_activite=secteur,
+            ville=_weighted(rng, VILLES), pays="Maroc"
+        ))
+    db.add_all(entreprises)
+    db.flush()
+
+    recruteurs = [
+        Recruteur(email=f"recruteur{i}@{EMAIL_DOMAIN}", mot_de_passe="benchmark", nom="Recruteur",
+                  prenom=str(i), poste="RH", entreprise_id=entreprise.id)
+        for i, entreprise in enumerate(entreprises)
+    ]
+    db.add_all(recruteurs)
+    db.flush()
+
+    secteurs_entreprises = {entreprise.id: entreprise.secteur_activite for entreprise in entreprises}
+    offres = []
+    for i in range(nb_offres):
+        recruteur = rng.choice(recruteurs)
+        # La plupart des offres relèvent du secteur de l'entreprise
+        secteur = secteurs_entreprises[recruteur.entreprise_id] if rng.random() < 0.8 else \
+            _weighted(rng, {nom: info["poids"] for nom, info in SECTEURS.items()})
+        separateur = rng.choice([", ", ", ", ", ", "; ", " "])
+        offres.append(Offre(
+            titre=f"Stage {secteur} #{i}",
+            description=rng.choice(DESCRIPTIONS),
+            type_stage=_weighted(rng, TYPES_STAGE),
+            remuneration=rng.choice([None, 1500, 2000, 2500, 3000, 4000]),
+            localisation=_weighted(rng, VILLES) if rng.random() > 0.05 else None,
+            secteur=secteur,
+            date_debut=aujourd_hui + timedelta(days=rng.randint(0, 60)),
+            date_fin=aujourd_hui + timedelta(days=rng.randint(-30, 180)),
+            competences_requises=separateur.join(_competences(rng, secteur, 2, 8)) if rng.random() > 0.05 else None,
+            est_active=rng.random() > 0.1,
+            entreprise_id=recruteur.entreprise_id,
+            recruteur_id=recruteur.id,
+        ))
+    db.add_all(offres)
+    db.flush()
+
+    stagiaires = []
+    for i in range(nb_stagiaires):
+        secteur = _weighted(rng, {nom: info["poids"] for nom, info in SECTEURS.items()})
+        stagiaires.append(Stagiaire(
+            email=f"stagiaire{i}@{EMAIL_DOMAIN}", mot_de_passe="benchmark", nom="Stagiaire", prenom=str(i),
+            specialite=secteur if rng.random() > 0.1 else None,
+            niveau_etudes=_weighted(rng, NIVEAUX),
+            ville=_weighted(rng, VILLES) if rng.random() > 0.1 else None,
+            competences_manuelles=", ".join(_competences(rng, secteur, 0, 8)),
+            competences_extraites=", ".join(_competences(rng, secteur, 0, 5)) if rng.random() > 0.4 else None,
+        ))
+    db.add_all(stagiaires)
+    db.flush()
+
+    # Candidatures, de préférence dans le secteur du stagiaire
+    offres_par_secteur: Dict[str, List[Offre]] = {}
+    for offre in offres:
+        offres_par_secteur.setdefault(offre.secteur, []).append(offre)
+
+    candidatures = 0
+    for stagiaire in stagiaires:
+        pool = offres_par_secteur.get(stagiaire.specialite) or offres
+        choisies = set()
+        for _ in range(rng.randint(0, candidatures_par_stagiaire * 2)):
+            offre = rng.choice(pool if rng.random() < 0.8 else offres)
+            if offre.id in choisies:
+                continue
+            choisies.add(offre.id)
+            db.add(Candidature(
+                stagiaire_id=stagiaire.id, offre_id=offre.id, recruteur_id=offre.recruteur_id,
+                status=_weighted(rng, STATUTS_CANDIDATURE), niveau_etudes=stagiaire.niveau_etudes,
+                competences=stagiaire.competences_manuelles,
+            ))
+            candidatures += 1
+
+    db.commit()
+    return {
+        "entreprises": len(entreprises), "offres": len(offres),
+        "stagiaires": len(stagiaires), "candidatures": candidatures,
+    }
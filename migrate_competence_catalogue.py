@@ -0,0 +1,67 @@
+# Migration: catalogue normalisé des compétences (competence, competence_alias, offre_competence, stagiaire_competence)
+# Idempotente : remplit les tables depuis les champs texte existants ; les écritures (offres, profil, CV) les tiennent ensuite à jour
+from app.core.database import Base, SessionLocal, engine
+from app.models.competence import Competence, CompetenceAlias, offre_competence, stagiaire_competence
+from app.models.offre import Offre
+from app.models.stagiaire import Stagiaire
+from app.services.competence_catalogue_service import CompetenceCatalogueService, DEFAULT_ALIASES
+
+def migrate_competence_catalogue(batch_size: int = 500):
+    """Créer les tables du catalogue puis le remplir depuis les champs texte existants."""
+
+    Base.metadata.create_all(bind=engine, tables=[
+        Competence.__table__, CompetenceAlias.__table__, offre_competence, stagiaire_competence
+    ])
+    print("✅ Tables du catalogue de compétences prêtes")
+
+    db = SessionLocal()
+    try:
+        print("🔄 Migration du catalogue de compétences...")
+
+        # Alias usuels d'abord, pour que "nodejs" et "node.js" tombent sur la même compétence
+        CompetenceCatalogueService.resolve_ids(db, list(DEFAULT_ALIASES) + list(DEFAULT_ALIASES.values()))
+        db.commit()
+
+        # Offres, par lots (pagination par id)
+        total, dernier_id = 0, 0
+        while True:
+            offres = db.query(Offre.id, Offre.competences_requises).filter(
+                Offre.id > dernier_id
+            ).order_by(Offre.id).limit(batch_size).all()
+            if not offres:
+                break
+
+            for offre in offres:
+                CompetenceCatalogueService.sync_offre(db, offre)
+            db.commit()
+            total += len(offres)
+            dernier_id = offres[-1].id
+        print(f"✅ {total} offres rattachées au catalogue")
+
+        # Stagiaires (compétences manuelles et extraites du CV)
+        total, dernier_id = 0, 0
+        while True:
+            stagiaires = db.query(
+                Stagiaire.id, Stagiaire.competences_manuelles, Stagiaire.competences_extraites
+            ).filter(Stagiaire.id > dernier_id).order_by(Stagiaire.id).limit(batch_size).all()
+            if not stagiaires:
+                break
+
+            for stagiaire in stagiaires:
+                CompetenceCatalogueService.sync_stagiaire(db, stagiaire)
+            db.commit()
+            total += len(stagiaires)
+            dernier_id = stagiaires[-1].id
+        print(f"✅ {total} stagiaires rattachés au catalogue")
+
+        print(f"📚 {db.query(Competence).count()} compétences au catalogue")
+        print("🎉 Migration terminée!")
+
+    except Exception as e:
+        print(f"❌ Erreur générale: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_competence_catalogue()
@@ -0,0 +1,65 @@
+# Migration: colonne offre.competences_normalisees (préfiltrage SQL des recommandations)
+from sqlalchemy import text
+from app.core.database import SessionLocal
+from app.models.offre import Offre
+
+def migrate_competences_normalisees(batch_size: int = 500):
+    """Ajouter la colonne, son index trigramme et remplir les offres existantes."""
+
+    db = SessionLocal()
+    try:
+        print("🔄 Migration competences_normalisees...")
+
+        check_sql = """
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'offre'
+        AND column_name = 'competences_normalisees';
+        """
+        if db.execute(text(check_sql)).fetchone():
+            print("✅ competences_normalisees existe déjà")
+        else:
+            db.execute(text("ALTER TABLE offre ADD COLUMN competences_normalisees TEXT;"))
+            db.commit()
+            print("✅ competences_normalisees ajoutée")
+
+        # Index trigramme pour les tests LIKE '% jeton %' (extension pg_trgm)
+        try:
+            db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+            db.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_offre_competences_normalisees "
+                "ON offre USING gin (competences_normalisees gin_trgm_ops);"
+            ))
+            db.commit()
+            print("✅ Index trigramme ajouté")
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Index trigramme non créé (pg_trgm indisponible ?): {e}")
+
+        # Remplissage par lots des offres existantes
+        total = 0
+        while True:
+            offres = db.query(Offre.id, Offre.competences_requises).filter(
+                Offre.competences_normalisees.is_(None)
+            ).limit(batch_size).all()
+            if not offres:
+                break
+
+            db.bulk_update_mappings(Offre, [
+                {"id": offre.id, "competences_normalisees": Offre.normaliser_competences(offre.competences_requises)}
+                for offre in offres
+            ])
+            db.commit()
+            total += len(offres)
+
+        print(f"✅ {total} offres normalisées")
+        print("🎉 Migration terminée!")
+
+    except Exception as e:
+        print(f"❌ Erreur générale: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_competences_normalisees()
@@ -0,0 +1,95 @@
+# Migration: villes du gazetteer sur les offres (ville_id, latitude, longitude) et les stagiaires (ville_id)
+from sqlalchemy import text
+from app.core.database import SessionLocal
+from app.core.gazetteer import get_ville, resolve_ville_id
+from app.models.offre import Offre
+from app.models.stagiaire import Stagiaire
+
+def migrate_geolocalisation(batch_size: int = 500):
+    """Ajouter les colonnes, l'index latitude/longitude et résoudre les villes existantes."""
+
+    db = SessionLocal()
+    try:
+        print("🔄 Migration géolocalisation...")
+
+        migrations = [
+            ("offre", "ville_id", "ALTER TABLE offre ADD COLUMN ville_id INTEGER;"),
+            ("offre", "latitude", "ALTER TABLE offre ADD COLUMN latitude DOUBLE PRECISION;"),
+            ("offre", "longitude", "ALTER TABLE offre ADD COLUMN longitude DOUBLE PRECISION;"),
+            ("stagiaire", "ville_id", "ALTER TABLE stagiaire ADD COLUMN ville_id INTEGER;"),
+        ]
+
+        check_sql = """
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = :table_name
+        AND column_name = :column_name;
+        """
+        for table_name, column_name, migration_sql in migrations:
+            if db.execute(text(check_sql), {"table_name": table_name, "column_name": column_name}).fetchone():
+                print(f"✅ {table_name}.{column_name} existe déjà")
+            else:
+                db.execute(text(migration_sql))
+                print(f"✅ {table_name}.{column_name} ajoutée")
+
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_offre_ville_id ON offre(ville_id);"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_offre_latitude_longitude ON offre(latitude, longitude);"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_stagiaire_ville_id ON stagiaire(ville_id);"))
+        db.commit()
+        print("✅ Index ajoutés")
+
+        # Offres : résolution de la localisation, par lots (pagination par id)
+        total, resolues, dernier_id = 0, 0, 0
+        while True:
+            offres = db.query(Offre.id, Offre.localisation).filter(
+                Offre.id > dernier_id
+            ).order_by(Offre.id).limit(batch_size).all()
+            if not offres:
+                break
+
+            mappings = []
+            for offre in offres:
+                ville = get_ville(resolve_ville_id(offre.localisation))
+                mappings.append({
+                    "id": offre.id,
+                    "ville_id": ville.id if ville else None,
+                    "latitude": ville.latitude if ville else None,
+                    "longitude": ville.longitude if ville else None,
+                })
+                resolues += ville is not None
+            db.bulk_update_mappings(Offre, mappings)
+            db.commit()
+            total += len(offres)
+            dernier_id = offres[-1].id
+        print(f"✅ {resolues}/{total} offres géolocalisées")
+
+        # Stagiaires
+        total, resolus, dernier_id = 0, 0, 0
+        while True:
+            stagiaires = db.query(Stagiaire.id, Stagiaire.ville).filter(
+                Stagiaire.id > dernier_id
+            ).order_by(Stagiaire.id).limit(batch_size).all()
+            if not stagiaires:
+                break
+
+            mappings = [
+                {"id": stagiaire.id, "ville_id": resolve_ville_id(stagiaire.ville)}
+                for stagiaire in stagiaires
+            ]
+            resolus += sum(1 for mapping in mappings if mapping["ville_id"] is not None)
+            db.bulk_update_mappings(Stagiaire, mappings)
+            db.commit()
+            total += len(stagiaires)
+            dernier_id = stagiaires[-1].id
+        print(f"✅ {resolus}/{total} stagiaires géolocalisés")
+
+        print("🎉 Migration terminée!")
+
+    except Exception as e:
+        print(f"❌ Erreur générale: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_geolocalisation()
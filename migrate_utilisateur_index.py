@@ -0,0 +1,25 @@
+# Migration: index (created_at, id) pour la pagination par clé de la liste admin des utilisateurs
+from sqlalchemy import text
+from app.core.database import SessionLocal
+
+def migrate_utilisateur_index():
+    """Créer l'index utilisé par /admin/utilisateurs (apres_created_at/apres_id)."""
+
+    db = SessionLocal()
+    try:
+        print("🔄 Migration index utilisateur...")
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_utilisateur_created_at_id ON utilisateur(created_at, id);"
+        ))
+        db.commit()
+        print("✅ Index idx_utilisateur_created_at_id créé")
+        print("🎉 Migration terminée!")
+
+    except Exception as e:
+        print(f"❌ Erreur générale: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_utilisateur_index()
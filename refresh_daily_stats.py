@@ -0,0 +1,29 @@
+# Job de rattrapage du rollup journalier daily_platform_stats (à planifier via cron)
+# Usage: python refresh_daily_stats.py [--backfill]
+import sys
+
+import app.models  # noqa: F401 - enregistrer tous les modèles
+from app.core.database import Base, SessionLocal, engine
+from app.models.daily_platform_stats import DailyPlatformStats
+from app.services.daily_stats_service import DailyStatsService
+
+def refresh_daily_stats(backfill: bool = False):
+    """Recalculer les jours récents et modifiés, ou tout l'historique avec --backfill."""
+
+    # Créer la table si elle n'existe pas encore
+    Base.metadata.create_all(bind=engine, tables=[DailyPlatformStats.__table__])
+
+    db = SessionLocal()
+    try:
+        if backfill:
+            DailyStatsService.backfill(db)
+        else:
+            DailyStatsService.rattraper(db)
+    except Exception as e:
+        print(f"❌ Erreur générale: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    refresh_daily_stats(backfill="--backfill" in sys.argv)
@@ -0,0 +1,22 @@
+# Job de rafraîchissement des recommandations pré-calculées (à planifier via cron)
+# Usage: python refresh_recommendations.py [--full]
+import sys
+
+import app.models  # noqa: F401 - enregistrer tous les modèles
+from app.core.database import SessionLocal
+from app.services.recommendation_refresh_service import RecommendationRefreshService
+
+def refresh_recommendations(full: bool = False):
+    """Recalculer le top-N des recommandations de chaque stagiaire."""
+
+    db = SessionLocal()
+    try:
+        RecommendationRefreshService.refresh(db, full=full)
+    except Exception as e:
+        print(f"❌ Erreur générale: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    refresh_recommendations(full="--full" in sys.argv)